@@ -0,0 +1,216 @@
+"""
+Application Configuration
+Environment-driven settings shared across the backend.
+"""
+import os
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+DATA_DIR = APP_DIR / "data"
+
+
+def _env_str(name: str, default: str) -> str:
+    return os.environ.get(name, default)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# --- Food catalog ---
+
+# Compiled, memory-mapped snapshot of foods_extended.json
+# (build with: python -m app.core.catalog_snapshot)
+FOOD_CATALOG_SNAPSHOT = Path(_env_str("FOOD_CATALOG_SNAPSHOT", str(DATA_DIR / "foods_catalog.snap")))
+FOOD_CATALOG_USE_SNAPSHOT = _env_bool("FOOD_CATALOG_USE_SNAPSHOT", True)
+# Names that miss every exact/partial lookup are matched by character-trigram
+# similarity against catalog and synonym names. A match is used only when it
+# scores >= MIN_SCORE and has the same words up to typos/plurals ("jolof rice"
+# -> "jollof rice", but not "ice cream" -> "mint ice cream"); otherwise unknown
+FOOD_FUZZY_MATCH = _env_bool("FOOD_FUZZY_MATCH", True)
+FOOD_FUZZY_MIN_SCORE = _env_float("FOOD_FUZZY_MIN_SCORE", 0.5)
+
+
+# --- Scan result cache ---
+
+# Complete responses keyed by image SHA-256 + endpoint parameters + model version
+# memory: per-process LRU/TTL; sqlite: shared on-disk table; off: disabled
+SCAN_CACHE_BACKEND = _env_str("SCAN_CACHE_BACKEND", "memory").strip().lower()
+SCAN_CACHE_PATH = Path(_env_str("SCAN_CACHE_PATH", str(APP_DIR.parent / ".cache" / "scan_cache.sqlite3")))
+SCAN_CACHE_MAX_ENTRIES = _env_int("SCAN_CACHE_MAX_ENTRIES", 1024)
+SCAN_CACHE_TTL_SECONDS = _env_float("SCAN_CACHE_TTL_SECONDS", 6 * 3600)
+# Bump to invalidate cached responses after pipeline/heuristics changes
+SCAN_CACHE_VERSION = _env_str("SCAN_CACHE_VERSION", "1")
+
+
+# --- Mistral HTTP client ---
+
+# Long-lived pooled keep-alive client; HTTP/2 needs the h2 package (httpx[http2]).
+# Point MISTRAL_API_URL at tools/fake_mistral_server.py for offline load tests
+MISTRAL_API_URL = _env_str("MISTRAL_API_URL", "https://api.mistral.ai/v1/chat/completions")
+MISTRAL_TIMEOUT_SECONDS = _env_float("MISTRAL_TIMEOUT_SECONDS", 30.0)
+MISTRAL_MAX_CONNECTIONS = _env_int("MISTRAL_MAX_CONNECTIONS", 20)
+MISTRAL_HTTP2 = _env_bool("MISTRAL_HTTP2", False)
+
+
+# --- Mistral resilience ---
+
+# At most MAX_CONCURRENCY calls in flight (extra callers wait up to
+# CONCURRENCY_WAIT_SECONDS, then skip the LLM); 429/5xx are retried with
+# full-jitter backoff. The breaker opens when FAILURE_RATIO of at least
+# MIN_CALLS calls in WINDOW_SECONDS failed, and skips calls for OPEN_SECONDS
+MISTRAL_MAX_CONCURRENCY = _env_int("MISTRAL_MAX_CONCURRENCY", 8)
+MISTRAL_CONCURRENCY_WAIT_SECONDS = _env_float("MISTRAL_CONCURRENCY_WAIT_SECONDS", 2.0)
+MISTRAL_MAX_RETRIES = _env_int("MISTRAL_MAX_RETRIES", 2)
+MISTRAL_RETRY_BACKOFF_SECONDS = _env_float("MISTRAL_RETRY_BACKOFF_SECONDS", 0.5)
+MISTRAL_RETRY_BACKOFF_MAX_SECONDS = _env_float("MISTRAL_RETRY_BACKOFF_MAX_SECONDS", 4.0)
+MISTRAL_BREAKER_WINDOW_SECONDS = _env_float("MISTRAL_BREAKER_WINDOW_SECONDS", 60.0)
+MISTRAL_BREAKER_MIN_CALLS = _env_int("MISTRAL_BREAKER_MIN_CALLS", 5)
+MISTRAL_BREAKER_FAILURE_RATIO = _env_float("MISTRAL_BREAKER_FAILURE_RATIO", 0.5)
+MISTRAL_BREAKER_OPEN_SECONDS = _env_float("MISTRAL_BREAKER_OPEN_SECONDS", 30.0)
+
+
+# --- Mistral image payload ---
+
+# Images sent to the LLM are capped at MAX_SIDE pixels and MAX_BYTES (pre-base64);
+# an uploaded JPEG already within both is forwarded as-is without re-encoding
+MISTRAL_IMAGE_MAX_SIDE = _env_int("MISTRAL_IMAGE_MAX_SIDE", 1024)
+MISTRAL_IMAGE_QUALITY = _env_int("MISTRAL_IMAGE_QUALITY", 85)
+MISTRAL_IMAGE_MAX_BYTES = _env_int("MISTRAL_IMAGE_MAX_BYTES", 1_000_000)
+
+
+# --- Mistral pipeline mode ---
+
+# "sequential": YOLO first, then Mistral validates the YOLO names (latency = YOLO + LLM)
+# "parallel": an open-ended Mistral detection starts alongside YOLO and fusion
+# reconciles both lists (latency = max(YOLO, LLM))
+MISTRAL_PIPELINE_MODE = _env_str("MISTRAL_PIPELINE_MODE", "sequential").strip().lower()
+
+
+# --- Scan latency budget ---
+
+# End-to-end deadline for /scan-food-yolo-mistral/ (0 disables). Mistral may use
+# whatever is left after YOLO minus the enrichment reserve; past that the scan
+# returns fused YOLO-only results marked partial, and the late LLM answer still
+# lands in the Mistral response cache for the next identical request
+SCAN_DEADLINE_SECONDS = _env_float("SCAN_DEADLINE_SECONDS", 8.0)
+SCAN_ENRICHMENT_RESERVE_SECONDS = _env_float("SCAN_ENRICHMENT_RESERVE_SECONDS", 0.5)
+
+
+# --- Detection fusion ---
+
+# "name": one item per food name (duplicate boxes collapse into one serving)
+# "spatial": YOLO boxes are reduced by IoU so separate servings of the same
+# food stay separate items; same-name boxes overlapping >= SAME_CLASS_IOU are
+# one instance, different-name boxes overlapping >= CROSS_CLASS_IOU keep only
+# the more confident label
+FUSION_MODE = _env_str("FUSION_MODE", "name").strip().lower()
+FUSION_SAME_CLASS_IOU = _env_float("FUSION_SAME_CLASS_IOU", 0.5)
+FUSION_CROSS_CLASS_IOU = _env_float("FUSION_CROSS_CLASS_IOU", 0.7)
+
+
+# --- Mistral response cache ---
+
+# Parsed validation/detection responses persisted in sqlite (shared by workers, survives
+# restarts), keyed on image pixels, prompt inputs, model and prompt version
+MISTRAL_CACHE_ENABLED = _env_bool("MISTRAL_CACHE_ENABLED", True)
+MISTRAL_CACHE_PATH = Path(_env_str("MISTRAL_CACHE_PATH", str(APP_DIR.parent / ".cache" / "mistral_cache.sqlite3")))
+MISTRAL_CACHE_MAX_ENTRIES = _env_int("MISTRAL_CACHE_MAX_ENTRIES", 20000)
+MISTRAL_CACHE_TTL_SECONDS = _env_float("MISTRAL_CACHE_TTL_SECONDS", 7 * 24 * 3600)
+
+
+# --- Near-duplicate reuse ---
+
+# Re-encoded/resized/slightly cropped copies of a recent photo (64-bit dHash
+# within MAX_DISTANCE bits) reuse its detections, with bboxes rescaled to the
+# new photo's size; enrichment still runs fresh
+NEAR_DUPLICATE_REUSE = _env_bool("NEAR_DUPLICATE_REUSE", True)
+NEAR_DUPLICATE_MAX_DISTANCE = _env_int("NEAR_DUPLICATE_MAX_DISTANCE", 6)
+NEAR_DUPLICATE_INDEX_SIZE = _env_int("NEAR_DUPLICATE_INDEX_SIZE", 2048)
+# Flat/low-contrast photos hash with fewer than this many set (or clear) bits
+# of 64 and are never reused
+NEAR_DUPLICATE_MIN_HASH_BITS = _env_int("NEAR_DUPLICATE_MIN_HASH_BITS", 8)
+
+
+# --- Upload ingestion ---
+
+# Uploads are streamed and validated (size, magic bytes, header dimensions)
+# before any pixel decode
+UPLOAD_MAX_BYTES = _env_int("UPLOAD_MAX_BYTES", 15 * 1024 * 1024)
+IMAGE_MAX_PIXELS = _env_int("IMAGE_MAX_PIXELS", 50_000_000)
+
+
+# --- Image decoding ---
+
+# Decode uploads directly near the inference size (JPEG DCT scaling) instead
+# of at full resolution; bboxes are scaled back to original coordinates
+IMAGE_REDUCED_DECODE = _env_bool("IMAGE_REDUCED_DECODE", True)
+IMAGE_DECODE_TARGET_SIZE = _env_int("IMAGE_DECODE_TARGET_SIZE", 640)
+
+
+# --- Detection model backend ---
+
+# "ultralytics" runs best.onnx through the Ultralytics predictor; "onnxruntime"
+# uses a bare InferenceSession with numpy letterboxing, decoding and NMS
+YOLO_BACKEND = _env_str("YOLO_BACKEND", "ultralytics").strip().lower()
+# onnxruntime session options (0 threads = onnxruntime default)
+YOLO_ORT_INTRA_OP_THREADS = _env_int("YOLO_ORT_INTRA_OP_THREADS", 0)
+YOLO_ORT_INTER_OP_THREADS = _env_int("YOLO_ORT_INTER_OP_THREADS", 0)
+# disable | basic | extended | all
+YOLO_ORT_GRAPH_OPTIMIZATION = _env_str("YOLO_ORT_GRAPH_OPTIMIZATION", "all").strip().lower()
+
+
+# --- Detection micro-batching ---
+
+# Concurrent scan requests are grouped into one batched YOLO inference
+YOLO_MICRO_BATCHING = _env_bool("YOLO_MICRO_BATCHING", True)
+YOLO_BATCH_WINDOW_MS = _env_float("YOLO_BATCH_WINDOW_MS", 10.0)
+YOLO_MAX_BATCH_SIZE = _env_int("YOLO_MAX_BATCH_SIZE", 8)
+# Requests waiting for or in a batch before new detections get 503 + Retry-After
+YOLO_BATCH_MAX_QUEUE = _env_int("YOLO_BATCH_MAX_QUEUE", 64)
+
+
+# --- Detection inference mode ---
+
+# "thread": one in-process detector (micro-batched as above)
+# "process": YOLO_PROCESS_WORKERS detector processes, each with its own ONNX
+# session, fed through shared memory (micro-batching is bypassed)
+YOLO_INFERENCE_MODE = _env_str("YOLO_INFERENCE_MODE", "thread").strip().lower()
+YOLO_PROCESS_WORKERS = _env_int("YOLO_PROCESS_WORKERS", os.cpu_count() or 1)
+YOLO_PROCESS_JOB_TIMEOUT = _env_float("YOLO_PROCESS_JOB_TIMEOUT", 60.0)
+# A worker that dies before loading its model is restarted after
+# YOLO_PROCESS_RESTART_BACKOFF seconds, doubling per consecutive failure (capped
+# at YOLO_PROCESS_RESTART_BACKOFF_MAX); after YOLO_PROCESS_MAX_INIT_FAILURES in a
+# row it is given up on, and with every worker given up on detection falls back
+# to the in-process detector
+YOLO_PROCESS_RESTART_BACKOFF = _env_float("YOLO_PROCESS_RESTART_BACKOFF", 0.5)
+YOLO_PROCESS_RESTART_BACKOFF_MAX = _env_float("YOLO_PROCESS_RESTART_BACKOFF_MAX", 30.0)
+YOLO_PROCESS_MAX_INIT_FAILURES = _env_int("YOLO_PROCESS_MAX_INIT_FAILURES", 5)
+# Images in flight across the pool before new detections get 503 + Retry-After
+YOLO_PROCESS_MAX_PENDING = _env_int("YOLO_PROCESS_MAX_PENDING", 32)
+
+
+# --- Blocking work executor ---
+
+# Image decode, model inference and LLM HTTP calls run on this bounded pool;
+# requests beyond workers + queue are rejected with 503 + Retry-After
+INFERENCE_EXECUTOR_WORKERS = _env_int("INFERENCE_EXECUTOR_WORKERS", min(4, os.cpu_count() or 1))
+INFERENCE_EXECUTOR_QUEUE = _env_int("INFERENCE_EXECUTOR_QUEUE", 32)
+INFERENCE_RETRY_AFTER_SECONDS = _env_int("INFERENCE_RETRY_AFTER_SECONDS", 1)
@@ -0,0 +1,426 @@
+"""
+Compiled Food Catalog Snapshot
+Binary, memory-mapped form of foods_extended.json shared across workers.
+
+The compile step turns the extended dataset into:
+- a numpy structured array of macros / GI (one row per food)
+- a UTF-8 string table (names and list fields)
+- a prebuilt open-addressing hash index over normalized names
+
+At runtime the file is opened with np.memmap, so every uvicorn worker maps
+the same read-only pages from the page cache instead of holding its own
+json.load()-ed dict copy. Entries are only materialized as dicts on lookup.
+
+Usage:
+    python -m app.core.catalog_snapshot [--source foods_extended.json] [--output foods_catalog.snap]
+"""
+import argparse
+import hashlib
+import json
+import logging
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+from app.config import DATA_DIR, FOOD_CATALOG_SNAPSHOT
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"NSCAT001"
+FORMAT_VERSION = 1
+
+LIST_SEPARATOR = "\x1f"
+GI_MISSING = -1
+GI_CATEGORIES = ("low", "medium", "high")
+MACRO_FIELDS = ("calories", "carbs", "protein", "fat", "fiber")
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("row_count", "<u4"),
+    ("slot_count", "<u4"),
+    ("reserved", "<u4"),
+    ("rows_offset", "<u8"),
+    ("slots_offset", "<u8"),
+    ("hashes_offset", "<u8"),
+    ("strings_offset", "<u8"),
+    ("strings_size", "<u8"),
+    ("source_digest", "S32"),
+])
+
+ROW_DTYPE = np.dtype([
+    ("calories", "<f8"),
+    ("carbs", "<f8"),
+    ("protein", "<f8"),
+    ("fat", "<f8"),
+    ("fiber", "<f8"),
+    ("glycemic_index", "<i2"),
+    ("gi_category", "i1"),
+    ("int_mask", "u1"),  # bit i set -> MACRO_FIELDS[i] was an int in the source JSON
+    ("name", "<u4", (2,)),  # (offset, length) into the string table
+    ("key", "<u4", (2,)),
+    ("suitable_for", "<u4", (2,)),
+    ("incompatible_with", "<u4", (2,)),
+    ("common_pairings", "<u4", (2,)),
+])
+
+EMPTY_SLOT = -1
+_FNV_OFFSET = 0xCBF29CE484222325
+_FNV_PRIME = 0x100000001B3
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def normalize_key(name: str) -> str:
+    """Normalize a food name for snapshot lookups (case and whitespace only)."""
+    return name.strip().lower()
+
+
+def name_hash(key: str) -> int:
+    """Stable 64-bit FNV-1a hash of a normalized name."""
+    value = _FNV_OFFSET
+    for byte in key.encode("utf-8"):
+        value = ((value ^ byte) * _FNV_PRIME) & _MASK64
+    return value
+
+
+def source_digest(source_path: Path) -> bytes:
+    """SHA-256 of the source JSON, used to detect stale snapshots."""
+    return hashlib.sha256(Path(source_path).read_bytes()).digest()
+
+
+class _StringTable:
+    """Append-only UTF-8 string table with (offset, length) references."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._size = 0
+        self._seen: Dict[bytes, int] = {}
+
+    def add(self, text: str) -> tuple:
+        data = text.encode("utf-8")
+        offset = self._seen.get(data)
+        if offset is None:
+            offset = self._size
+            self._seen[data] = offset
+            self._chunks.append(data)
+            self._size += len(data)
+        return offset, len(data)
+
+    def to_bytes(self) -> bytes:
+        return b"".join(self._chunks)
+
+
+def compile_snapshot(
+    source_path: Optional[Path] = None,
+    output_path: Optional[Path] = None
+) -> Path:
+    """
+    Compile foods_extended.json into a binary snapshot.
+
+    Args:
+        source_path: Extended dataset JSON (defaults to app/data/foods_extended.json)
+        output_path: Snapshot file to write (defaults to FOOD_CATALOG_SNAPSHOT)
+
+    Returns:
+        Path of the written snapshot
+    """
+    source_path = Path(source_path or DATA_DIR / "foods_extended.json")
+    output_path = Path(output_path or FOOD_CATALOG_SNAPSHOT)
+
+    with open(source_path, "r") as f:
+        foods = json.load(f) or []
+
+    # Every entry keeps its row; the index points at the last entry for a
+    # duplicated normalized name, matching dict-building semantics
+    last_row: Dict[str, int] = {}
+    strings = _StringTable()
+    rows = np.zeros(len(foods), dtype=ROW_DTYPE)
+
+    for i, item in enumerate(foods):
+        key = normalize_key(item.get("name", ""))
+        last_row[key] = i
+        row = rows[i]
+        int_mask = 0
+        for bit, field in enumerate(MACRO_FIELDS):
+            value = item.get(field, 0)
+            row[field] = value
+            if isinstance(value, int):
+                int_mask |= 1 << bit
+        row["int_mask"] = int_mask
+
+        gi = item.get("glycemic_index")
+        row["glycemic_index"] = GI_MISSING if gi is None else int(gi)
+        category = item.get("GI_category")
+        row["gi_category"] = GI_CATEGORIES.index(category) if category in GI_CATEGORIES else -1
+
+        row["name"] = strings.add(item.get("name", ""))
+        row["key"] = strings.add(key)
+        for field in ("suitable_for", "incompatible_with", "common_pairings"):
+            row[field] = strings.add(LIST_SEPARATOR.join(item.get(field) or []))
+
+    # Open-addressing hash index, load factor <= 0.5
+    slot_count = 1
+    while slot_count < max(2 * len(last_row), 8):
+        slot_count <<= 1
+    slots = np.full(slot_count, EMPTY_SLOT, dtype="<i4")
+    hashes = np.zeros(slot_count, dtype="<u8")
+    mask = slot_count - 1
+    for key, i in last_row.items():
+        h = name_hash(key)
+        position = h & mask
+        while slots[position] != EMPTY_SLOT:
+            position = (position + 1) & mask
+        slots[position] = i
+        hashes[position] = h
+
+    string_bytes = strings.to_bytes()
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    offset = _align(HEADER_DTYPE.itemsize)
+    header["rows_offset"] = offset
+    offset = _align(offset + rows.nbytes)
+    header["slots_offset"] = offset
+    offset = _align(offset + slots.nbytes)
+    header["hashes_offset"] = offset
+    offset = _align(offset + hashes.nbytes)
+    header["strings_offset"] = offset
+    header["strings_size"] = len(string_bytes)
+    header["magic"] = MAGIC
+    header["version"] = FORMAT_VERSION
+    header["row_count"] = len(rows)
+    header["slot_count"] = slot_count
+    header["source_digest"] = source_digest(source_path)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        for section_offset, payload in (
+            (0, header.tobytes()),
+            (int(header["rows_offset"][0]), rows.tobytes()),
+            (int(header["slots_offset"][0]), slots.tobytes()),
+            (int(header["hashes_offset"][0]), hashes.tobytes()),
+            (int(header["strings_offset"][0]), string_bytes),
+        ):
+            f.seek(section_offset)
+            f.write(payload)
+    # Atomic swap so running workers never map a half-written file
+    tmp_path.replace(output_path)
+
+    logger.info(f"Compiled {len(rows)} foods into {output_path} ({output_path.stat().st_size} bytes)")
+    return output_path
+
+
+def _align(offset: int, alignment: int = 64) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+class CatalogSnapshot:
+    """
+    Read-only, memory-mapped view of a compiled catalog snapshot.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._buffer = np.memmap(self.path, dtype=np.uint8, mode="r")
+
+        header = self._buffer[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+        if bytes(header["magic"]) != MAGIC or int(header["version"]) != FORMAT_VERSION:
+            raise ValueError(f"Not a food catalog snapshot (or unsupported version): {self.path}")
+
+        self.row_count = int(header["row_count"])
+        self.digest = bytes(header["source_digest"])
+        slot_count = int(header["slot_count"])
+
+        self.rows = self._section(int(header["rows_offset"]), self.row_count, ROW_DTYPE)
+        self._slots = self._section(int(header["slots_offset"]), slot_count, np.dtype("<i4"))
+        self._hashes = self._section(int(header["hashes_offset"]), slot_count, np.dtype("<u8"))
+        strings_offset = int(header["strings_offset"])
+        self._strings = self._buffer[strings_offset:strings_offset + int(header["strings_size"])]
+        self._mask = slot_count - 1
+        self.key_count = int((self._slots != EMPTY_SLOT).sum())
+
+    def _section(self, offset: int, count: int, dtype: np.dtype) -> np.ndarray:
+        return self._buffer[offset:offset + count * dtype.itemsize].view(dtype)
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def is_fresh(self, source_path: Path) -> bool:
+        """True when the snapshot was compiled from the current source file."""
+        try:
+            return self.digest == source_digest(source_path)
+        except OSError:
+            return False
+
+    def _string(self, ref) -> str:
+        offset, length = int(ref[0]), int(ref[1])
+        return self._strings[offset:offset + length].tobytes().decode("utf-8")
+
+    def find(self, key: str) -> int:
+        """Row number for a normalized name, or -1 if absent."""
+        h = name_hash(key)
+        position = h & self._mask
+        while True:
+            row = int(self._slots[position])
+            if row == EMPTY_SLOT:
+                return -1
+            if int(self._hashes[position]) == h and self._string(self.rows[row]["key"]) == key:
+                return row
+            position = (position + 1) & self._mask
+
+    def entry(self, row: int) -> Dict[str, Any]:
+        """Materialize a row in the original foods_extended.json entry shape."""
+        record = self.rows[row]
+        int_mask = int(record["int_mask"])
+        entry: Dict[str, Any] = {"name": self._string(record["name"])}
+        for bit, field in enumerate(MACRO_FIELDS):
+            value = float(record[field])
+            entry[field] = int(value) if int_mask & (1 << bit) else value
+        gi = int(record["glycemic_index"])
+        entry["glycemic_index"] = None if gi == GI_MISSING else gi
+        category = int(record["gi_category"])
+        entry["GI_category"] = GI_CATEGORIES[category] if category >= 0 else None
+        for field in ("suitable_for", "incompatible_with", "common_pairings"):
+            joined = self._string(record[field])
+            entry[field] = joined.split(LIST_SEPARATOR) if joined else []
+        return entry
+
+    def entries_by_key(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Every entry keyed by normalized name (last duplicate wins), decoded in
+        one pass over the row columns. For load-time bulk builds; nothing is
+        cached on the snapshot.
+        """
+        strings = self._strings.tobytes()
+        rows = self.rows
+
+        macros = [rows[field].tolist() for field in MACRO_FIELDS]
+        int_masks = rows["int_mask"].tolist()
+        gis = rows["glycemic_index"].tolist()
+        categories = rows["gi_category"].tolist()
+        lists = [self._column(field, strings) for field in ("suitable_for", "incompatible_with", "common_pairings")]
+
+        entries: Dict[str, Dict[str, Any]] = {}
+        for i, (name, key) in enumerate(zip(self._column("name", strings), self._column("key", strings))):
+            entry: Dict[str, Any] = {"name": name}
+            for bit, field in enumerate(MACRO_FIELDS):
+                value = macros[bit][i]
+                entry[field] = int(value) if int_masks[i] & (1 << bit) else value
+            entry["glycemic_index"] = None if gis[i] == GI_MISSING else gis[i]
+            entry["GI_category"] = GI_CATEGORIES[categories[i]] if categories[i] >= 0 else None
+            for field, joined in zip(("suitable_for", "incompatible_with", "common_pairings"), lists):
+                entry[field] = joined[i].split(LIST_SEPARATOR) if joined[i] else []
+            entries[key] = entry
+        return entries
+
+    def _column(self, field: str, strings: Optional[bytes] = None) -> List[str]:
+        """Decode one string column for every row (one copy of the string table)."""
+        strings = self._strings.tobytes() if strings is None else strings
+        return [strings[offset:offset + length].decode("utf-8") for offset, length in self.rows[field].tolist()]
+
+    def names(self) -> List[str]:
+        """Display names of every food in the snapshot."""
+        return self._column("name")
+
+    def keys(self) -> List[str]:
+        """Distinct normalized names, in first-seen order."""
+        return list(dict.fromkeys(self._column("key")))
+
+    def entries(self) -> "SnapshotEntries":
+        return SnapshotEntries(self)
+
+    def index(self) -> "SnapshotIndex":
+        return SnapshotIndex(self)
+
+
+class SnapshotEntries(Sequence):
+    """Lazy sequence of snapshot entries (stand-in for the foods_extended list)."""
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self._snapshot = snapshot
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self._snapshot.entry(i) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return self._snapshot.entry(row)
+
+    def names(self) -> List[str]:
+        return self._snapshot.names()
+
+
+class SnapshotIndex(Mapping):
+    """Lazy normalized-name -> entry mapping backed by the snapshot hash index."""
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self._snapshot = snapshot
+        self._cache: Dict[str, Dict[str, Any]] = {}
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        entry = self._cache.get(key)
+        if entry is None:
+            row = self._snapshot.find(key) if isinstance(key, str) else -1
+            if row < 0:
+                raise KeyError(key)
+            entry = self._cache[key] = self._snapshot.entry(row)
+        return entry
+
+    def __contains__(self, key) -> bool:
+        return isinstance(key, str) and (key in self._cache or self._snapshot.find(key) >= 0)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._snapshot.keys())
+
+    def __len__(self) -> int:
+        return self._snapshot.key_count
+
+    def entries_by_key(self) -> Dict[str, Dict[str, Any]]:
+        """Uncached one-pass decode of every entry (see CatalogSnapshot.entries_by_key)."""
+        return self._snapshot.entries_by_key()
+
+
+def open_snapshot(
+    path: Optional[Path] = None,
+    source_path: Optional[Path] = None
+) -> Optional[CatalogSnapshot]:
+    """
+    Open a snapshot if it exists and matches the current source JSON.
+
+    Returns:
+        CatalogSnapshot, or None when missing, unreadable or stale
+    """
+    path = Path(path or FOOD_CATALOG_SNAPSHOT)
+    source_path = Path(source_path or DATA_DIR / "foods_extended.json")
+    if not path.exists():
+        return None
+    try:
+        snapshot = CatalogSnapshot(path)
+    except Exception as e:
+        logger.warning(f"Could not open catalog snapshot {path}: {e}")
+        return None
+    if source_path.exists() and not snapshot.is_fresh(source_path):
+        logger.warning(f"Catalog snapshot {path} is stale; rebuild with python -m app.core.catalog_snapshot")
+        return None
+    return snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile foods_extended.json into a memory-mapped snapshot")
+    parser.add_argument("--source", type=Path, default=DATA_DIR / "foods_extended.json")
+    parser.add_argument("--output", type=Path, default=FOOD_CATALOG_SNAPSHOT)
+    args = parser.parse_args()
+    path = compile_snapshot(args.source, args.output)
+    print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
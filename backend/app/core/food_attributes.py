@@ -0,0 +1,154 @@
+"""
+Derived Food Attributes
+Per-food values that depend only on the catalog entry (portion advice, GI
+advice, name-derived flags), computed once per catalog name when the
+catalog loads and served from a frozen table at request time.
+
+- portion_advice / gi_advice / name_flags: the derivation rules
+- FoodInfoTable: legacy /scan-food, /analyze-meal and /confirm-detections/
+  item info (nutrition, GI, advice, flags) keyed by detector/classifier name
+"""
+import threading
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+# Upper bound on memoized names outside the catalog (free-text names can be unbounded)
+MAX_CACHED_MISSES = 4096
+
+
+def portion_advice(food_data: Mapping[str, Any]) -> str:
+    """Portion advice from GI, flags, calories and fiber."""
+    advice_parts = []
+
+    # Check glycemic index
+    gi = food_data.get('glycemic_index')
+    if gi:
+        if gi >= 70:
+            advice_parts.append("High GI - limit portion for blood sugar control")
+        elif gi >= 56:
+            advice_parts.append("Moderate GI - consume in moderation")
+        else:
+            advice_parts.append("Low GI - good for steady energy")
+
+    # Check flags
+    flags = food_data.get('flags', [])
+    if 'fried' in flags:
+        advice_parts.append("Fried food - reduce portion to lower fat intake")
+    if 'carb-heavy' in flags or 'starchy' in flags:
+        advice_parts.append("High carb content - balance with protein and vegetables")
+
+    # Check macros
+    if (food_data.get('calories') or 0) > 300:
+        advice_parts.append("Calorie-dense - watch portion size")
+
+    if (food_data.get('fiber') or 0) < 2:
+        advice_parts.append("Low fiber - pair with vegetables")
+
+    return " | ".join(advice_parts) if advice_parts else "Enjoy in moderation"
+
+
+def gi_advice(gi: Optional[int]) -> str:
+    """Basic advice based on GI."""
+    if gi is None:
+        return "No GI data available"
+    elif gi < 55:
+        return "Low GI – safer for diabetes"
+    elif 55 <= gi <= 69:
+        return "Medium GI – moderate consumption advised"
+    else:
+        return "High GI – minimize for diabetes"
+
+
+def name_flags(name: str, flags: Iterable[str]) -> List[str]:
+    """Catalog flags plus flags implied by the food name."""
+    name_lower = name.lower()
+    flags = set(flags)
+    if "fried" in name_lower:
+        flags.add("fried")
+    if "pepper" in name_lower or "spicy" in name_lower:
+        flags.add("spicy")
+    if "soup" in name_lower:
+        flags.add("soup")
+    if "stew" in name_lower:
+        flags.add("stew")
+    if "rice" in name_lower or "yam" in name_lower or "fufu" in name_lower or "plantain" in name_lower:
+        flags.add("carb-heavy")
+    return list(flags)
+
+
+class FoodInfo(NamedTuple):
+    # Item fields after "name" and "confidence", in response order
+    fields: Mapping[str, Any]
+    # fields["flags"] plus name-derived flags
+    tagged_flags: Tuple[str, ...]
+
+
+def compute_food_info(knowledge_base, food_name: str) -> FoodInfo:
+    """Item info for a name from the knowledge base's get_food_data (exact keys)."""
+    nutrition, gi, gi_category, suitable_for, _, _ = knowledge_base.get_food_data(food_name)
+    flags = nutrition.get("flags", [])
+    fields = {
+        "calories": nutrition.get("calories"),
+        "carbs": nutrition.get("carbs"),
+        "protein": nutrition.get("protein"),
+        "fat": nutrition.get("fat"),
+        "fiber": nutrition.get("fiber"),
+        "glycemic_index": gi,
+        "gi_category": gi_category,
+        "suitable_for": suitable_for,
+        "advice": gi_advice(gi),
+        "flags": flags,
+        "health_warnings": nutrition.get("warnings", {}),
+    }
+    return FoodInfo(MappingProxyType(fields), tuple(name_flags(food_name, flags)))
+
+
+class FoodInfoTable:
+    """
+    Frozen name -> FoodInfo table over every catalog name (curated,
+    GI, extended and detector class names). Names outside the catalog are
+    computed on first use and memoized.
+    """
+
+    def __init__(self, knowledge_base):
+        self.knowledge_base = knowledge_base
+        names = set(knowledge_base.list_food_names())
+        names.update(knowledge_base.glycemic_index_db.keys())
+        names.update(knowledge_base.food_map.values())
+        # Bulk view: a snapshot-backed catalog is decoded once, not cached per name
+        view = knowledge_base.bulk_view()
+        self._table: Mapping[str, FoodInfo] = MappingProxyType({
+            name: compute_food_info(view, name) for name in names
+        })
+        self._misses: Dict[str, FoodInfo] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def get(self, food_name: str) -> FoodInfo:
+        info = self._table.get(food_name)
+        if info is None:
+            info = self._misses.get(food_name)
+        if info is None:
+            info = compute_food_info(self.knowledge_base, food_name)
+            with self._lock:
+                if len(self._misses) >= MAX_CACHED_MISSES:
+                    self._misses.clear()
+                self._misses[food_name] = info
+        return info
+
+    def item(self, food_name: str, confidence: float, tag_flags: bool = False) -> Dict[str, Any]:
+        """
+        Fresh item dict for one detection.
+
+        Args:
+            food_name: Detector/classifier/user name
+            confidence: Detection confidence
+            tag_flags: Replace the catalog flags with tagged_flags
+        """
+        info = self.get(food_name)
+        item = {"name": food_name, "confidence": confidence, **info.fields}
+        if tag_flags:
+            item["flags"] = list(info.tagged_flags)
+        return item
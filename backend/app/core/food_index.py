@@ -0,0 +1,89 @@
+"""
+Food Name Resolution Index
+Precomputed exact and partial-match lookup over a name-keyed food table.
+"""
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+# Upper bound on memoized lookups (free-text LLM names can be unbounded)
+MAX_CACHED_LOOKUPS = 4096
+
+
+def _substrings(text: str) -> Iterable[str]:
+    """Yield every contiguous substring of text, including the empty string."""
+    yield ""
+    length = len(text)
+    for start in range(length):
+        for end in range(start + 1, length + 1):
+            yield text[start:end]
+
+
+class FoodNameIndex:
+    """
+    Resolves a normalized food name against a table in O(len(name)^2) dict hits.
+
+    Resolution order matches the original linear scans in FoodHeuristics:
+    1. The first key (in table order) whose normalized form equals the name.
+    2. The first key (in table order) where either normalized string contains
+       the other.
+    """
+
+    def __init__(
+        self,
+        table: Mapping[str, Any],
+        normalize: Callable[[str], str]
+    ):
+        self._values = list(table.values())
+        self._keys = list(table.keys())
+
+        # normalized key -> position of the first key with that normalized form
+        self._exact: Dict[str, int] = {}
+        # substring of any normalized key -> position of the first key containing it
+        self._containing: Dict[str, int] = {}
+
+        for position, key in enumerate(self._keys):
+            normalized = normalize(key)
+            self._exact.setdefault(normalized, position)
+            for sub in _substrings(normalized):
+                self._containing.setdefault(sub, position)
+
+        self._cache: Dict[str, Optional[Tuple[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def lookup(self, normalized: str) -> Optional[Tuple[str, Any]]:
+        """
+        Resolve a normalized name to its (original key, value) pair.
+
+        Args:
+            normalized: Name already passed through the table's normalizer
+
+        Returns:
+            (key, value) of the winning entry, or None if nothing matches
+        """
+        if normalized in self._cache:
+            return self._cache[normalized]
+
+        position = self._exact.get(normalized)
+        if position is None:
+            position = self._partial_position(normalized)
+
+        match = None if position is None else (self._keys[position], self._values[position])
+        if len(self._cache) >= MAX_CACHED_LOOKUPS:
+            self._cache.clear()
+        self._cache[normalized] = match
+        return match
+
+    def exact(self, normalized: str) -> Optional[Any]:
+        """Return the value for an exact normalized match only."""
+        position = self._exact.get(normalized)
+        return None if position is None else self._values[position]
+
+    def _partial_position(self, normalized: str) -> Optional[int]:
+        """Earliest key that contains the name or is contained in it."""
+        best = self._containing.get(normalized)
+        for sub in _substrings(normalized):
+            position = self._exact.get(sub)
+            if position is not None and (best is None or position < best):
+                best = position
+        return best
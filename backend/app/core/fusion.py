@@ -1,24 +1,91 @@
 import logging
-from typing import List, Dict, Any, Set
+from collections import Counter
+from typing import List, Dict, Any, FrozenSet, Iterable, Set
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 
+def pairwise_iou(boxes: np.ndarray) -> np.ndarray:
+    """(N, N) IoU matrix for (N, 4) xyxy boxes, computed in one broadcast."""
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1).clip(0) * (y2 - y1).clip(0)
+    inter_w = (np.minimum(x2[:, None], x2[None, :]) - np.maximum(x1[:, None], x1[None, :])).clip(0)
+    inter_h = (np.minimum(y2[:, None], y2[None, :]) - np.maximum(y1[:, None], y1[None, :])).clip(0)
+    inter = inter_w * inter_h
+    return inter / (areas[:, None] + areas[None, :] - inter + 1e-9)
+
+
+class _NameIndex:
+    """
+    Fused names with cached token sets and a token -> names inverted index,
+    so duplicate checks only compare names sharing at least one token.
+    """
+    
+    def __init__(self):
+        self.tokens: Dict[str, FrozenSet[str]] = {}
+        self._postings: Dict[str, List[str]] = {}
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.tokens
+    
+    def add(self, name: str, tokens: FrozenSet[str] = None):
+        if name in self.tokens:
+            return
+        tokens = frozenset(name.split()) if tokens is None else tokens
+        self.tokens[name] = tokens
+        for token in tokens:
+            self._postings.setdefault(token, []).append(name)
+    
+    def candidates(self, tokens: Iterable[str]) -> Set[str]:
+        """Indexed names sharing at least one of `tokens`."""
+        found: Set[str] = set()
+        for token in tokens:
+            found.update(self._postings.get(token, ()))
+        return found
+
+
 class DetectionFusion:
     
     def __init__(
         self,
         llm_confidence_threshold: float = 0.3,
-        similarity_threshold: float = 0.8
+        similarity_threshold: float = 0.8,
+        spatial: bool = False,
+        same_class_iou: float = 0.5,
+        cross_class_iou: float = 0.7
     ):
+        """
+        Args:
+            llm_confidence_threshold: Minimum confidence for LLM items
+            similarity_threshold: Token Jaccard at which two names are the same food
+            spatial: Fuse YOLO boxes by IoU, keeping one item per food instance,
+                instead of one item per food name
+            same_class_iou: Same-name boxes overlapping at least this much are one instance
+            cross_class_iou: Different-name boxes overlapping at least this much are
+                one object; the lower-confidence label is dropped
+        """
         self.llm_threshold = llm_confidence_threshold
         self.similarity_threshold = similarity_threshold
+        self.spatial = spatial
+        self.same_class_iou = same_class_iou
+        self.cross_class_iou = cross_class_iou
     
     def fuse(
         self,
         yolo_results: List[Dict[str, Any]],
         llm_results: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
+        if self.spatial:
+            return self._fuse_spatial(yolo_results, llm_results)
+        return self._fuse_by_name(yolo_results, llm_results)
+    
+    def _fuse_by_name(
+        self,
+        yolo_results: List[Dict[str, Any]],
+        llm_results: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
         
         logger.info(f"Fusing results: {len(yolo_results)} YOLO + {len(llm_results)} LLM")
         
@@ -31,11 +98,13 @@ class DetectionFusion:
         
         # Step 2: Build name-to-item mapping for conflict resolution
         fused_map = {}  # normalized_name -> item
+        name_index = _NameIndex()  # tokens of every key in fused_map
         
         # Add YOLO results first (baseline)
         for item in yolo_results:
             normalized_name = self._normalize_name(item['name'])
             fused_map[normalized_name] = item
+            name_index.add(normalized_name)
         
         logger.info(f"YOLO anchor items: {sorted(fused_map.keys())}")
         
@@ -61,10 +130,12 @@ class DetectionFusion:
                     )
             else:
                 # New item - check for partial duplicates
-                is_duplicate = self._is_duplicate(normalized_name, set(fused_map.keys()))
+                name_tokens = frozenset(normalized_name.split())
+                is_duplicate = self._is_indexed_duplicate(normalized_name, name_tokens, name_index)
                 
                 if not is_duplicate:
                     fused_map[normalized_name] = llm_item
+                    name_index.add(normalized_name, name_tokens)
                     added_count += 1
                     logger.info(f"Added from LLM: {llm_item['name']} (conf={llm_item['confidence']:.2f})")
                 else:
@@ -81,6 +152,78 @@ class DetectionFusion:
         
         return fused_results
     
+    def _fuse_spatial(
+        self,
+        yolo_results: List[Dict[str, Any]],
+        llm_results: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Instance-level fusion: YOLO boxes are reduced by IoU into separate
+        servings, then LLM items (which carry no boxes) are reconciled by
+        name against one representative per localized food. Foods YOLO
+        localized keep their instances; the LLM only adds new foods.
+        """
+        boxed = [item for item in yolo_results if item.get('bbox')]
+        unboxed = [item for item in yolo_results if not item.get('bbox')]
+        
+        instances_by_name: Dict[str, List[Dict[str, Any]]] = {}
+        for item in self.reduce_instances(boxed):
+            instances_by_name.setdefault(self._normalize_name(item['name']), []).append(item)
+        
+        # reduce_instances sorts by confidence, so each group's first instance is its best
+        representatives = [group[0] for group in instances_by_name.values()]
+        named = self._fuse_by_name(representatives + unboxed, llm_results)
+        
+        fused_results = []
+        for item in named:
+            group = instances_by_name.pop(self._normalize_name(item['name']), None)
+            fused_results.extend(group if group is not None else [item])
+        fused_results.sort(key=lambda x: x['confidence'], reverse=True)
+        
+        logger.info(
+            f"Spatial fusion: {len(boxed)} boxes -> {len(fused_results)} items "
+            f"({dict(Counter(self._normalize_name(item['name']) for item in fused_results))})"
+        )
+        return fused_results
+    
+    def reduce_instances(self, detections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Collapse overlapping boxes into food instances.
+        
+        Boxes are visited in descending confidence. A kept box absorbs
+        same-name boxes with IoU >= same_class_iou (the same serving) and
+        different-name boxes with IoU >= cross_class_iou (the same object
+        under a less confident label). Non-overlapping boxes stay separate
+        instances.
+        
+        Args:
+            detections: Items with 'name', 'confidence' and xyxy 'bbox'
+            
+        Returns:
+            Kept items, highest confidence first
+        """
+        if len(detections) < 2:
+            return list(detections)
+        
+        boxes = np.asarray([item['bbox'] for item in detections], dtype=np.float64)
+        confidences = np.asarray([item['confidence'] for item in detections], dtype=np.float64)
+        _, labels = np.unique([self._normalize_name(item['name']) for item in detections], return_inverse=True)
+        
+        iou = pairwise_iou(boxes)
+        same_class = labels[:, None] == labels[None, :]
+        overlaps = np.where(same_class, iou >= self.same_class_iou, iou >= self.cross_class_iou)
+        np.fill_diagonal(overlaps, False)
+        
+        order = np.argsort(-confidences, kind="stable")
+        suppressed = np.zeros(len(detections), dtype=bool)
+        kept = []
+        for i in order:
+            if suppressed[i]:
+                continue
+            kept.append(detections[i])
+            suppressed |= overlaps[i]
+        return kept
+    
     def _normalize_name(self, name: str) -> str:
         """
         Normalize food name for comparison.
@@ -130,6 +273,24 @@ class DetectionFusion:
         
         return False
     
+    def _is_indexed_duplicate(self, name: str, name_tokens: FrozenSet[str], index: _NameIndex) -> bool:
+        """
+        Same result as _is_duplicate(name, <indexed names>), comparing only
+        names that share a token (zero overlap can never be a duplicate).
+        """
+        if name in index:
+            return True
+        
+        for existing in index.candidates(name_tokens):
+            existing_tokens = index.tokens[existing]
+            overlap = name_tokens & existing_tokens
+            similarity = len(overlap) / len(name_tokens | existing_tokens)
+            if similarity >= self.similarity_threshold:
+                logger.debug(f"Duplicate detected: '{name}' ~ '{existing}' (similarity={similarity:.2f})")
+                return True
+        
+        return False
+    
     def get_statistics(self, fused_results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Get statistics about fused results.
@@ -145,10 +306,14 @@ class DetectionFusion:
         
         avg_confidence = sum(item['confidence'] for item in fused_results) / len(fused_results) if fused_results else 0
         
-        return {
+        stats = {
             "total_items": len(fused_results),
             "yolo_items": yolo_count,
             "llm_items": llm_count,
             "average_confidence": round(avg_confidence, 3),
             "items": [item['name'] for item in fused_results]
         }
+        if self.spatial:
+            # Separate servings of the same food (e.g. 3 boiled eggs)
+            stats["instance_counts"] = dict(Counter(item['name'] for item in fused_results))
+        return stats
@@ -0,0 +1,210 @@
+"""
+Approximate Food Name Matching
+Character-trigram inverted index for names that miss every exact and
+partial lookup (misspellings, word-order and plural variants in free-text
+LLM names and classifier labels).
+
+Similarity is the trigram Jaccard (pg_trgm style): each word is padded with
+two leading and one trailing space before cutting trigrams, and
+score = shared / (query + candidate - shared). Shared counts come from a
+single numpy bincount over the query's posting lists, so a query costs a
+few array operations regardless of catalog size.
+
+Ranking is approximate; auto-resolution (best()) is strict. A candidate is
+accepted only when the two names have the same words up to small typos and
+plurals, so "jolof rice" -> "jollof rice" but never "ice cream" ->
+"mint ice cream" or "fried rice and chicken" -> "fried chicken".
+"""
+import threading
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+# Upper bound on memoized queries (free-text LLM names can be unbounded)
+MAX_CACHED_QUERIES = 4096
+
+
+def trigrams(text: str) -> frozenset:
+    """Padded character trigrams of every word in an already-normalized name."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def _edit_distance_at_most(a: str, b: str, limit: int) -> bool:
+    """Whether the Levenshtein distance of a and b is <= limit."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+
+def words_close(a: str, b: str) -> bool:
+    """Same word up to a typo or plural: 1 edit for words up to 5 letters, 2 beyond, exact up to 3."""
+    if a == b:
+        return True
+    shortest = min(len(a), len(b))
+    if shortest <= 3:
+        return False
+    return _edit_distance_at_most(a, b, 1 if shortest <= 5 else 2)
+
+
+def same_words(query: str, name: str) -> bool:
+    """Every word of each name has a close word in the other."""
+    query_words, name_words = query.split(), name.split()
+    return (
+        all(any(words_close(q, n) for n in name_words) for q in query_words)
+        and all(any(words_close(n, q) for q in query_words) for n in name_words)
+    )
+
+
+class TrigramMatcher:
+    """
+    Ranks catalog names by trigram similarity to a query.
+
+    Each indexed name can point at a different target (e.g. a synonym
+    variant at its canonical name); matches report the target.
+    """
+
+    def __init__(self, names: Mapping[str, str], min_score: float = 0.5):
+        """
+        Args:
+            names: Normalized indexed name -> target name it resolves to
+            min_score: Lowest similarity best() accepts
+        """
+        self.min_score = min_score
+        self._names: List[str] = list(names)
+        self._targets: List[str] = [names[name] for name in self._names]
+
+        postings: Dict[str, List[int]] = {}
+        sizes = []
+        for position, name in enumerate(self._names):
+            grams = trigrams(name)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+        self._postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._sizes = np.asarray(sizes, dtype=np.float64)
+
+        self._cache: Dict[Tuple[str, int], List[Tuple[int, float]]] = {}
+        self._cache_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def match(self, normalized: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """
+        Ranked (target, score) candidates sharing at least one trigram.
+
+        Ties are broken by the shorter, then alphabetically first, indexed
+        name. Each target appears once, with its best score.
+
+        Args:
+            normalized: Name already normalized like the indexed names
+            limit: Maximum candidates returned
+        """
+        return [(self._targets[position], score) for position, score in self._ranked(normalized, limit)]
+
+    def best(
+        self,
+        normalized: str,
+        accept: Optional[Callable[[str], bool]] = None,
+        limit: int = 10
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Highest-ranked (target, score) safe to resolve to, or None.
+
+        Walks the top `limit` candidates scoring at least min_score and
+        returns the first whose indexed name has the same words as the
+        query (same_words) and whose target passes `accept` (e.g. "has
+        nutrition data").
+        """
+        for position, score in self._ranked(normalized, limit):
+            if score < self.min_score:
+                break
+            target = self._targets[position]
+            if same_words(normalized, self._names[position]) and (accept is None or accept(target)):
+                return target, score
+        return None
+
+    def _ranked(self, normalized: str, limit: int) -> List[Tuple[int, float]]:
+        """Memoized (indexed position, score) ranking."""
+        key = (normalized, limit)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = self._rank(normalized, limit)
+        with self._cache_lock:
+            if len(self._cache) >= MAX_CACHED_QUERIES:
+                self._cache.clear()
+            self._cache[key] = result
+        return result
+
+    def _rank(self, normalized: str, limit: int) -> List[Tuple[int, float]]:
+        grams = trigrams(normalized)
+        lists = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not lists or limit <= 0:
+            return []
+
+        shared = np.bincount(np.concatenate(lists), minlength=len(self._names))
+        candidates = np.flatnonzero(shared)
+        scores = shared[candidates] / (len(grams) + self._sizes[candidates] - shared[candidates])
+
+        # Narrow to the top scores (keeping ties) before the Python-level tie-break sort
+        keep = limit * 4
+        if len(candidates) > keep:
+            cutoff = np.partition(scores, len(scores) - keep)[len(scores) - keep]
+            top = scores >= cutoff
+            candidates, scores = candidates[top], scores[top]
+
+        ranked = sorted(
+            zip(candidates.tolist(), scores.tolist()),
+            key=lambda item: (-item[1], len(self._names[item[0]]), self._names[item[0]])
+        )
+        result: List[Tuple[int, float]] = []
+        seen = set()
+        for position, score in ranked:
+            target = self._targets[position]
+            if target in seen:
+                continue
+            seen.add(target)
+            result.append((position, round(score, 4)))
+            if len(result) == limit:
+                break
+        return result
+
+
+def build_catalog_matcher(
+    catalog_names: Iterable[str],
+    synonyms: Mapping[str, str],
+    normalize,
+    min_score: float = 0.5
+) -> TrigramMatcher:
+    """
+    Matcher over catalog names (resolving to themselves) and synonym
+    variants (resolving to their canonical name). Variants whose canonical
+    name is not itself a catalog name are skipped: they would win matches
+    and then resolve to nothing.
+    """
+    names: Dict[str, str] = {}
+    for name in catalog_names:
+        normalized = normalize(name)
+        if normalized:
+            names.setdefault(normalized, normalized)
+    catalog = set(names)
+    for variant, canonical in synonyms.items():
+        variant = normalize(variant.replace("_", " "))
+        canonical = normalize(canonical)
+        if variant and canonical in catalog:
+            names.setdefault(variant, canonical)
+    return TrigramMatcher(names, min_score=min_score)
@@ -3,10 +3,11 @@ Heuristics Module
 Provides nutrition data, flags, glycemic info, and recommendations
 """
 import logging
-import json
-from pathlib import Path
-from typing import List, Dict, Any, Optional
+from types import MappingProxyType
+from typing import Iterable, List, Dict, Any, Mapping, Optional
 from app.core.synonyms import normalize_food_name, is_beverage, is_dessert
+from app.core.knowledge_base import FoodKnowledgeBase, get_knowledge_base
+from app.core.food_attributes import portion_advice
 
 logger = logging.getLogger(__name__)
 
@@ -21,58 +22,92 @@ class FoodHeuristics:
         nutrition_db_path: str = None,
         glycemic_index_path: str = None,
         foods_extended_path: Optional[str] = None,
+        knowledge_base: Optional[FoodKnowledgeBase] = None,
     ):
-        # Set default paths
-        if nutrition_db_path is None:
-            base_path = Path(__file__).resolve().parent.parent  # app/core/ -> app/
-            nutrition_db_path = base_path / "data" / "nutrition_db.json"
-        
-        if glycemic_index_path is None:
-            base_path = Path(__file__).resolve().parent.parent  # app/core/ -> app/
-            glycemic_index_path = base_path / "data" / "glycemic_index.json"
-
-        if foods_extended_path is None:
-            base_path = Path(__file__).resolve().parent.parent  # app/core/ -> app/
-            foods_extended_path = base_path / "data" / "foods_extended.json"
-        
-        # Load databases
-        self.nutrition_db = self._load_json(nutrition_db_path)
-        self.glycemic_index_db = self._load_json(glycemic_index_path)
-        # foods_extended.json is a list; index by normalized name for quick lookup.
-        foods_extended = self._load_json(foods_extended_path)
-        self.foods_extended_index = {
-            self._normalize_food_name(item.get("name", "")): item
-            for item in foods_extended or []
-        }
+        # Share the process-wide knowledge base unless custom datasets are requested
+        if knowledge_base is None:
+            if nutrition_db_path or glycemic_index_path or foods_extended_path:
+                knowledge_base = FoodKnowledgeBase.from_files(
+                    nutrition_db_path=nutrition_db_path,
+                    glycemic_index_path=glycemic_index_path,
+                    foods_extended_path=foods_extended_path,
+                )
+            else:
+                knowledge_base = get_knowledge_base()
+        
+        self.knowledge_base = knowledge_base
+        self.nutrition_db = knowledge_base.nutrition_db
+        self.glycemic_index_db = knowledge_base.glycemic_index_db
+        self.foods_extended_index = knowledge_base.foods_extended_index
         
         logger.info(f"Loaded {len(self.nutrition_db)} nutrition entries")
         logger.info(f"Loaded {len(self.glycemic_index_db)} glycemic index entries")
         logger.info(f"Loaded {len(self.foods_extended_index)} extended food entries")
-    
-    def _load_json(self, path: Path) -> Dict:
-        """Load JSON file."""
-        try:
-            with open(path, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.warning(f"Could not load {path}: {e}")
-            return {}
+        
+        # Per-food part of enriched items, precomputed for every catalog name
+        canonical_names = {normalize_food_name(name) for name in knowledge_base.list_food_names()}
+        canonical_names.update(normalize_food_name(name) for name in self.glycemic_index_db)
+        # Bulk view: a snapshot-backed catalog is decoded once, not cached per name
+        view = knowledge_base.bulk_view()
+        self.food_records: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+            name: self._compute_food_record(name, view) for name in canonical_names if name
+        })
+        logger.info(f"Precomputed {len(self.food_records)} food records")
     
     def enrich_food_item(self, food_item: Dict[str, Any]) -> Dict[str, Any]:
-        name = food_item['name']
+        canonical_name = normalize_food_name(food_item['name'])
+        return self._build_enriched(food_item, self._resolve_food(canonical_name))
+    
+    def enrich_many(self, food_items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Enrich a batch of items, resolving each distinct food once.
         
-        # Normalize name using synonyms
-        canonical_name = normalize_food_name(name)
+        Raw names are normalized once, and each canonical name is resolved
+        once (nutrition, GI, portion advice). Duplicates share the resolved
+        record, and only confidence and source are taken per item.
         
+        Args:
+            food_items: Items with 'name', 'confidence' and 'source'
+            
+        Returns:
+            Enriched items in input order, equal to enrich_food_item() of each
+        """
+        canonical_names: Dict[str, str] = {}
+        records: Dict[str, Mapping[str, Any]] = {}
+        
+        enriched_items = []
+        for food_item in food_items:
+            name = food_item['name']
+            canonical_name = canonical_names.get(name)
+            if canonical_name is None:
+                canonical_name = canonical_names[name] = normalize_food_name(name)
+            record = records.get(canonical_name)
+            if record is None:
+                record = records[canonical_name] = self._resolve_food(canonical_name)
+            enriched_items.append(self._build_enriched(food_item, record))
+        
+        if len(records) < len(enriched_items):
+            logger.debug(f"Enriched {len(enriched_items)} items from {len(records)} distinct foods")
+        return enriched_items
+    
+    def _resolve_food(self, canonical_name: str) -> Mapping[str, Any]:
+        """Per-food part of an enriched item (everything but confidence and source)."""
+        record = self.food_records.get(canonical_name)
+        if record is None:
+            record = self._compute_food_record(canonical_name)
+        return record
+    
+    def _compute_food_record(
+        self,
+        canonical_name: str,
+        knowledge_base: Optional[FoodKnowledgeBase] = None
+    ) -> Mapping[str, Any]:
         # Try to find exact match (case-insensitive)
-        nutrition_data = self._find_nutrition_data(canonical_name)
-        glycemic_index = self._find_glycemic_index(canonical_name)
+        nutrition_data = self._find_nutrition_data(canonical_name, knowledge_base)
+        glycemic_index = self._find_glycemic_index(canonical_name, knowledge_base)
         
-        # Build enriched item
-        enriched = {
-            "name": canonical_name,  # Use canonical name
-            "confidence": food_item['confidence'],
-            "source": food_item['source'],
+        record = {
+            "name": canonical_name,
             "calories": nutrition_data.get('calories', 0),
             "carbs": nutrition_data.get('carbs', 0),
             "protein": nutrition_data.get('protein', 0),
@@ -84,64 +119,38 @@ class FoodHeuristics:
         }
         
         # Add portion advice based on flags and GI
-        enriched['portion_advice'] = self._generate_portion_advice(enriched)
-        
-        return enriched
+        record['portion_advice'] = self._generate_portion_advice(record)
+        return MappingProxyType(record)
     
-    def _find_nutrition_data(self, food_name: str) -> Dict[str, Any]:
-        # Normalize name
-        normalized = self._normalize_food_name(food_name)
-        
-        # Try curated DB exact match first
-        for key, value in self.nutrition_db.items():
-            if self._normalize_food_name(key) == normalized:
-                return value
-        
-        # Try curated DB partial match
-        for key, value in self.nutrition_db.items():
-            if normalized in self._normalize_food_name(key) or \
-               self._normalize_food_name(key) in normalized:
-                logger.debug(f"Partial match: '{food_name}' -> '{key}'")
-                return value
-
-        # Fallback to extended dataset (contains macros & GI_category)
-        ext_entry = self.foods_extended_index.get(normalized)
-        if ext_entry:
-            return {
-                "calories": ext_entry.get("calories", 0),
-                "carbs": ext_entry.get("carbs", 0),
-                "protein": ext_entry.get("protein", 0),
-                "fat": ext_entry.get("fat", 0),
-                "fiber": ext_entry.get("fiber", 0),
-                "flags": [],
-                "warnings": {},
-            }
+    def _build_enriched(self, food_item: Dict[str, Any], record: Mapping[str, Any]) -> Dict[str, Any]:
+        return {
+            "name": record['name'],  # Use canonical name
+            "confidence": food_item['confidence'],
+            "source": food_item['source'],
+            "calories": record['calories'],
+            "carbs": record['carbs'],
+            "protein": record['protein'],
+            "fat": record['fat'],
+            "fiber": record['fiber'],
+            "glycemic_index": record['glycemic_index'],
+            "flags": record['flags'],
+            "warnings": record['warnings'],
+            "portion_advice": record['portion_advice']
+        }
+    
+    def _find_nutrition_data(self, food_name: str, knowledge_base: Optional[FoodKnowledgeBase] = None) -> Dict[str, Any]:
+        # Curated exact, curated partial, then extended dataset
+        nutrition_data = (knowledge_base or self.knowledge_base).resolve_nutrition(food_name)
+        if nutrition_data is not None:
+            return nutrition_data
         
         # No match found - return defaults
         logger.warning(f"No nutrition data found for: {food_name}")
         return self._get_default_nutrition()
     
-    def _find_glycemic_index(self, food_name: str) -> Optional[int]:
+    def _find_glycemic_index(self, food_name: str, knowledge_base: Optional[FoodKnowledgeBase] = None) -> Optional[int]:
         """Find glycemic index for food name."""
-        normalized = self._normalize_food_name(food_name)
-        
-        # Try curated GI exact match
-        for key, value in self.glycemic_index_db.items():
-            if self._normalize_food_name(key) == normalized:
-                return value
-        
-        # Try curated GI partial match
-        for key, value in self.glycemic_index_db.items():
-            if normalized in self._normalize_food_name(key) or \
-               self._normalize_food_name(key) in normalized:
-                return value
-
-        # Fallback to extended dataset
-        ext_entry = self.foods_extended_index.get(normalized)
-        if ext_entry:
-            return ext_entry.get("glycemic_index")
-        
-        return None
+        return (knowledge_base or self.knowledge_base).resolve_glycemic_index(food_name)
     
     def _normalize_food_name(self, name: str) -> str:
         """Normalize food name for matching."""
@@ -160,33 +169,7 @@ class FoodHeuristics:
         }
     
     def _generate_portion_advice(self, food_data: Dict[str, Any]) -> str:
-        advice_parts = []
-        
-        # Check glycemic index
-        gi = food_data.get('glycemic_index')
-        if gi:
-            if gi >= 70:
-                advice_parts.append("High GI - limit portion for blood sugar control")
-            elif gi >= 56:
-                advice_parts.append("Moderate GI - consume in moderation")
-            else:
-                advice_parts.append("Low GI - good for steady energy")
-        
-        # Check flags
-        flags = food_data.get('flags', [])
-        if 'fried' in flags:
-            advice_parts.append("Fried food - reduce portion to lower fat intake")
-        if 'carb-heavy' in flags or 'starchy' in flags:
-            advice_parts.append("High carb content - balance with protein and vegetables")
-        
-        # Check macros
-        if (food_data.get('calories') or 0) > 300:
-            advice_parts.append("Calorie-dense - watch portion size")
-        
-        if (food_data.get('fiber') or 0) < 2:
-            advice_parts.append("Low fiber - pair with vegetables")
-        
-        return " | ".join(advice_parts) if advice_parts else "Enjoy in moderation"
+        return portion_advice(food_data)
     
     def calculate_meal_summary(self, enriched_items: List[Dict[str, Any]]) -> Dict[str, Any]:
         if not enriched_items:
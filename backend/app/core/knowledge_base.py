@@ -0,0 +1,316 @@
+"""
+Food Knowledge Base
+Single, process-wide view over the curated and extended food datasets.
+
+Every pipeline (/scan-food/, /scan-food-yolo-mistral/, /analyze-meal,
+/confirm-detections/ and the nutrition service) reads from the same loaded
+instance instead of parsing the JSON files separately.
+"""
+import copy
+import json
+import logging
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from app.config import (
+    DATA_DIR,
+    FOOD_CATALOG_SNAPSHOT,
+    FOOD_CATALOG_USE_SNAPSHOT,
+    FOOD_FUZZY_MATCH,
+    FOOD_FUZZY_MIN_SCORE,
+)
+from app.core.catalog_snapshot import open_snapshot
+from app.core.food_index import FoodNameIndex
+from app.core.fuzzy_match import TrigramMatcher, build_catalog_matcher
+from app.core.synonyms import FOOD_SYNONYMS
+
+logger = logging.getLogger(__name__)
+
+FoodData = Tuple[Dict[str, Any], Optional[int], Optional[str], list, list, list]
+
+
+def normalize_key(name: str) -> str:
+    """Normalize a food name for table lookups (case and whitespace only)."""
+    return name.strip().lower()
+
+
+def _load_json(path: Path, default: Any) -> Any:
+    """Load a JSON file, returning default when missing or malformed."""
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except Exception as e:
+        logger.warning(f"Could not load {path}: {e}")
+        return default
+    return data if data else default
+
+
+class FoodKnowledgeBase:
+    """
+    Immutable food catalog with precomputed lookup indexes.
+
+    Tables are exposed as read-only mappings; entries are shared between all
+    callers and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        nutrition_db: Mapping[str, Dict[str, Any]],
+        glycemic_index_db: Mapping[str, int],
+        foods_extended: Sequence[Dict[str, Any]],
+        food_map: Optional[Mapping[str, str]] = None,
+        foods_extended_index: Optional[Mapping[str, Dict[str, Any]]] = None,
+        fuzzy_match: bool = FOOD_FUZZY_MATCH,
+        fuzzy_min_score: float = FOOD_FUZZY_MIN_SCORE
+    ):
+        self.nutrition_db = MappingProxyType(dict(nutrition_db))
+        self.glycemic_index_db = MappingProxyType(dict(glycemic_index_db))
+        self.food_map = MappingProxyType(dict(food_map or {}))
+
+        if foods_extended_index is not None:
+            # Prebuilt (e.g. memory-mapped snapshot) index; entries materialize lazily
+            self.foods_extended = foods_extended
+            self.foods_extended_index = foods_extended_index
+        else:
+            # Extended dataset is a list; index by normalized name for quick lookup.
+            self.foods_extended = tuple(foods_extended)
+            self.foods_extended_index = MappingProxyType({
+                normalize_key(item.get("name", "")): item
+                for item in self.foods_extended
+            })
+        self._extended_nutrition: Dict[str, Dict[str, Any]] = {}
+
+        # Normalized exact + partial-match indexes over the curated tables
+        self.nutrition_index = FoodNameIndex(self.nutrition_db, normalize_key)
+        self.gi_index = FoodNameIndex(self.glycemic_index_db, normalize_key)
+
+        # Trigram matcher for names no index knows; built on first miss
+        self.fuzzy_match = fuzzy_match
+        self.fuzzy_min_score = fuzzy_min_score
+        self._name_matcher: Optional[TrigramMatcher] = None
+        self._name_matcher_lock = threading.Lock()
+
+        logger.info(
+            f"Food knowledge base ready: {len(self.nutrition_db)} nutrition, "
+            f"{len(self.glycemic_index_db)} GI, {len(self.foods_extended_index)} extended entries"
+        )
+
+    @classmethod
+    def from_files(
+        cls,
+        nutrition_db_path: Optional[Path] = None,
+        glycemic_index_path: Optional[Path] = None,
+        foods_extended_path: Optional[Path] = None,
+        food_map_path: Optional[Path] = None,
+        snapshot_path: Optional[Path] = None,
+        use_snapshot: bool = FOOD_CATALOG_USE_SNAPSHOT
+    ) -> "FoodKnowledgeBase":
+        """
+        Load the knowledge base from JSON files (defaults to app/data/).
+
+        When a fresh compiled snapshot of the extended dataset exists it is
+        memory-mapped instead of parsing foods_extended.json.
+        """
+        foods_extended_path = Path(foods_extended_path or DATA_DIR / "foods_extended.json")
+        snapshot = None
+        if use_snapshot:
+            snapshot = open_snapshot(snapshot_path or FOOD_CATALOG_SNAPSHOT, foods_extended_path)
+
+        if snapshot is not None:
+            logger.info(f"Using memory-mapped catalog snapshot: {snapshot.path}")
+            foods_extended = snapshot.entries()
+            foods_extended_index = snapshot.index()
+        else:
+            foods_extended = _load_json(foods_extended_path, [])
+            foods_extended_index = None
+
+        return cls(
+            nutrition_db=_load_json(nutrition_db_path or DATA_DIR / "nutrition_db.json", {}),
+            glycemic_index_db=_load_json(glycemic_index_path or DATA_DIR / "glycemic_index.json", {}),
+            foods_extended=foods_extended,
+            food_map=_load_json(food_map_path or DATA_DIR / "local_food_map.json", {}),
+            foods_extended_index=foods_extended_index,
+        )
+
+    @staticmethod
+    def _project_extended(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Project an extended-dataset entry onto the curated nutrition shape."""
+        return {
+            "calories": entry.get("calories", 0),
+            "carbs": entry.get("carbs", 0),
+            "protein": entry.get("protein", 0),
+            "fat": entry.get("fat", 0),
+            "fiber": entry.get("fiber", 0),
+            "warnings": {},
+            "flags": [],
+        }
+
+    def bulk_view(self) -> "FoodKnowledgeBase":
+        """
+        Shallow copy for precomputing per-food tables at load time.
+
+        Extended lookups read one fully decoded table (a snapshot is decoded
+        in a single pass over its rows) and memoize projections privately, so
+        the shared snapshot index stays lazy and mmap-backed. Fuzzy matches
+        still go through this instance's matcher.
+        """
+        view = copy.copy(self)
+        entries_by_key = getattr(self.foods_extended_index, "entries_by_key", None)
+        if entries_by_key is not None:
+            view.foods_extended_index = entries_by_key()
+        view._extended_nutrition = {}
+        view.fuzzy_name = self.fuzzy_name
+        return view
+
+    def extended_entry(self, food_name: str) -> Optional[Dict[str, Any]]:
+        """Raw extended-dataset entry for a name (normalized exact match)."""
+        return self.foods_extended_index.get(normalize_key(food_name))
+
+    def extended_nutrition(self, normalized: str) -> Optional[Dict[str, Any]]:
+        """Extended entry projected onto the curated nutrition shape (memoized)."""
+        nutrition = self._extended_nutrition.get(normalized)
+        if nutrition is None:
+            entry = self.foods_extended_index.get(normalized)
+            if not entry:
+                return None
+            nutrition = self._extended_nutrition[normalized] = self._project_extended(entry)
+        return nutrition
+
+    def resolve_nutrition(self, food_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Resolve nutrition with fuzzy curated matching.
+
+        Order: curated exact, curated partial (first key wins), extended
+        exact, then the closest catalog name by trigram similarity.
+
+        Returns:
+            Nutrition dict, or None when no table knows the food
+        """
+        normalized = normalize_key(food_name)
+
+        match = self.nutrition_index.lookup(normalized)
+        if match is not None:
+            key, value = match
+            if normalize_key(key) != normalized:
+                logger.debug(f"Partial match: '{food_name}' -> '{key}'")
+            return value
+
+        nutrition = self.extended_nutrition(normalized)
+        if nutrition is not None:
+            return nutrition
+
+        target = self.fuzzy_name(normalized)
+        if target is None:
+            return None
+        return self._exact_nutrition(target)
+
+    def resolve_glycemic_index(self, food_name: str) -> Optional[int]:
+        """Resolve GI with the same order as resolve_nutrition."""
+        normalized = normalize_key(food_name)
+
+        match = self.gi_index.lookup(normalized)
+        if match is not None:
+            return match[1]
+
+        ext_entry = self.foods_extended_index.get(normalized)
+        if ext_entry:
+            return ext_entry.get("glycemic_index")
+
+        target = self.fuzzy_name(normalized)
+        if target is None:
+            return None
+        gi = self.gi_index.exact(target)
+        if gi is not None:
+            return gi
+        ext_entry = self.foods_extended_index.get(target)
+        return ext_entry.get("glycemic_index") if ext_entry else None
+
+    @property
+    def name_matcher(self) -> TrigramMatcher:
+        """Trigram index over curated, extended and synonym names."""
+        if self._name_matcher is None:
+            with self._name_matcher_lock:
+                if self._name_matcher is None:
+                    names = self.list_food_names() + list(self.glycemic_index_db.keys())
+                    self._name_matcher = build_catalog_matcher(
+                        names, FOOD_SYNONYMS, normalize_key, min_score=self.fuzzy_min_score
+                    )
+                    logger.info(f"Trigram name matcher ready: {len(self._name_matcher)} names")
+        return self._name_matcher
+
+    def _exact_nutrition(self, normalized: str) -> Optional[Dict[str, Any]]:
+        return self.nutrition_index.exact(normalized) or self.extended_nutrition(normalized)
+
+    def fuzzy_name(self, normalized: str) -> Optional[str]:
+        """
+        Closest catalog food with nutrition data for a name no exact/partial
+        lookup knows (None if disabled, or nothing is the same food).
+        """
+        if not self.fuzzy_match or not normalized:
+            return None
+        best = self.name_matcher.best(normalized, accept=lambda target: self._exact_nutrition(target) is not None)
+        if best is None:
+            return None
+        target, score = best
+        logger.debug(f"Fuzzy match: '{normalized}' -> '{target}' (score={score:.2f})")
+        return target
+
+    def get_food_data(self, food_name: str) -> FoodData:
+        """
+        Retrieve nutrition and GI data prioritizing curated DB, then extended list.
+
+        Curated tables are matched on the exact key; missing macros or GI are
+        filled from the extended dataset.
+
+        Returns:
+            (nutrition, gi, gi_category, suitable_for, incompatible_with, common_pairings)
+        """
+        nutrition = self.nutrition_db.get(food_name, {})
+        gi = self.glycemic_index_db.get(food_name)
+        gi_category = None
+        suitable: list = []
+        incompatible: list = []
+        pairings: list = []
+
+        if not nutrition or gi is None:
+            entry = self.extended_entry(food_name)
+            if entry:
+                ext_nutrition = self.extended_nutrition(normalize_key(food_name))
+                if nutrition:
+                    # Merge extended macros if present, preserving warnings/flags from curated DB.
+                    nutrition = {**ext_nutrition, **nutrition}
+                else:
+                    nutrition = ext_nutrition
+                if gi is None:
+                    gi = entry.get("glycemic_index")
+                gi_category = entry.get("GI_category")
+                suitable = entry.get("suitable_for", []) or []
+                incompatible = entry.get("incompatible_with", []) or []
+                pairings = entry.get("common_pairings", []) or []
+
+        return nutrition, gi, gi_category, suitable, incompatible, pairings
+
+    def list_food_names(self) -> List[str]:
+        """Return a sorted list of known food names (curated + extended)."""
+        names = set(self.nutrition_db.keys())
+        if hasattr(self.foods_extended, "names"):
+            names.update(self.foods_extended.names())
+        else:
+            names.update(item.get("name", "") for item in self.foods_extended)
+        return sorted(n for n in names if n)
+
+
+_knowledge_base: Optional[FoodKnowledgeBase] = None
+_knowledge_base_lock = threading.Lock()
+
+
+def get_knowledge_base() -> FoodKnowledgeBase:
+    """Get or load the process-wide food knowledge base."""
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _knowledge_base_lock:
+            if _knowledge_base is None:
+                _knowledge_base = FoodKnowledgeBase.from_files()
+    return _knowledge_base
@@ -1,11 +1,13 @@
-from ultralytics import YOLO
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from io import BytesIO
 from PIL import Image
 from pathlib import Path
-import json
 import os
+import copy
+import asyncio
+import threading
 import numpy as np
 from typing import List, Dict, Any
 from pydantic import BaseModel, Field
@@ -23,6 +25,59 @@ from app.ml.yolo import YOLOFoodDetector
 from app.ml.mistral import MistralFoodValidator
 from app.core.fusion import DetectionFusion
 from app.core.heuristics import FoodHeuristics
+from app.core.knowledge_base import get_knowledge_base
+from app.core.food_attributes import FoodInfoTable
+from app.services.detection_service import DetectionMicroBatcher
+from app.services.inference_executor import BoundedExecutor, ExecutorSaturatedError
+from app.services.process_pool import DetectionPoolUnavailableError, DetectionProcessPool
+from app.services.image_utils import DecodedImage, decode_for_inference, rescale_detections, size_scale
+from app.services.upload_ingest import ingest_upload
+from app.services.scan_cache import MemoryCacheBackend, ScanResultCache, SqliteCacheBackend
+from app.services.perceptual_hash import PerceptualHashIndex, dhash
+from app.services import scan_pipeline
+from app.services.scan_pipeline import PIPELINE_MODES, drain_late_llm_tasks, run_detection_stages
+from app.config import (
+    DATA_DIR,
+    YOLO_MICRO_BATCHING,
+    YOLO_BATCH_WINDOW_MS,
+    YOLO_MAX_BATCH_SIZE,
+    YOLO_BATCH_MAX_QUEUE,
+    YOLO_INFERENCE_MODE,
+    YOLO_PROCESS_WORKERS,
+    YOLO_PROCESS_JOB_TIMEOUT,
+    YOLO_PROCESS_RESTART_BACKOFF,
+    YOLO_PROCESS_RESTART_BACKOFF_MAX,
+    YOLO_PROCESS_MAX_INIT_FAILURES,
+    YOLO_PROCESS_MAX_PENDING,
+    IMAGE_REDUCED_DECODE,
+    IMAGE_DECODE_TARGET_SIZE,
+    UPLOAD_MAX_BYTES,
+    IMAGE_MAX_PIXELS,
+    YOLO_BACKEND,
+    SCAN_CACHE_BACKEND,
+    SCAN_CACHE_PATH,
+    SCAN_CACHE_MAX_ENTRIES,
+    SCAN_CACHE_TTL_SECONDS,
+    SCAN_CACHE_VERSION,
+    MISTRAL_CACHE_ENABLED,
+    MISTRAL_CACHE_PATH,
+    MISTRAL_CACHE_MAX_ENTRIES,
+    MISTRAL_CACHE_TTL_SECONDS,
+    MISTRAL_PIPELINE_MODE,
+    MISTRAL_IMAGE_MAX_BYTES,
+    SCAN_DEADLINE_SECONDS,
+    SCAN_ENRICHMENT_RESERVE_SECONDS,
+    FUSION_MODE,
+    FUSION_SAME_CLASS_IOU,
+    FUSION_CROSS_CLASS_IOU,
+    NEAR_DUPLICATE_REUSE,
+    NEAR_DUPLICATE_MAX_DISTANCE,
+    NEAR_DUPLICATE_INDEX_SIZE,
+    NEAR_DUPLICATE_MIN_HASH_BITS,
+    INFERENCE_EXECUTOR_WORKERS,
+    INFERENCE_EXECUTOR_QUEUE,
+    INFERENCE_RETRY_AFTER_SECONDS,
+)
 from app.ml.scan_models import (
     ScanFoodResponse,
     FoodDetection as ScanFoodItem,
@@ -261,6 +316,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(ExecutorSaturatedError)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturatedError):
+    """Shed load with 503 + Retry-After when the blocking-work executor is full."""
+    return JSONResponse(
+        status_code=503,
+        content={"status": "error", "message": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Reject declared-oversized bodies before the multipart parser spools them."""
+    content_length = request.headers.get("content-length")
+    # Allow some headroom for multipart boundaries and form fields
+    if content_length and content_length.isdigit() and int(content_length) > UPLOAD_MAX_BYTES + 64 * 1024:
+        return JSONResponse(
+            status_code=413,
+            content={"status": "error", "message": "Request body too large"}
+        )
+    return await call_next(request)
+
 BASE_DIR = Path(__file__).resolve().parent
 
 # YOLO models (original implementation)
@@ -271,35 +349,238 @@ _yolo_seg_model = None
 
 # New integrated models (YOLO + Mistral + Heuristics)
 _yolo_detector = None
+_detection_batcher = None
+_detection_pool = None
+_inference_executor = None
+_scan_cache = None
+# Perceptual-hash indexes of recent detections, one per pipeline configuration
+_near_duplicate_indexes: Dict[str, PerceptualHashIndex] = {}
+# Guards lazy model initialization (getters are also called from executor threads)
+_model_init_lock = threading.RLock()
+# Legacy YOLO models are not thread-safe; serialize predict calls in analyze_image
+_legacy_predict_lock = threading.Lock()
 # TODO: Re-enable DeepSeek integration when needed
 # _deepseek_detector = None
 _mistral_validator = None
 _fusion_engine = None
+_food_info_table = None
 _heuristics_engine = None
 
 def get_yolo_detector():
     """Get or initialize YOLO food detector for /scan-food endpoint."""
     global _yolo_detector
     if _yolo_detector is None:
+        with _model_init_lock:
+            if _yolo_detector is None:
+                try:
+                    logger.info("Initializing YOLO detector for /scan-food...")
+                    _yolo_detector = YOLOFoodDetector()
+                    logger.info("YOLO detector initialized successfully")
+                except Exception as e:
+                    logger.error(f"Failed to initialize YOLO detector: {e}")
+                    raise
+    return _yolo_detector
+
+def get_inference_executor():
+    """Get or initialize the bounded executor for blocking image/model/HTTP work."""
+    global _inference_executor
+    if _inference_executor is None:
+        _inference_executor = BoundedExecutor(
+            max_workers=INFERENCE_EXECUTOR_WORKERS,
+            max_queue=INFERENCE_EXECUTOR_QUEUE,
+            retry_after=INFERENCE_RETRY_AFTER_SECONDS
+        )
+    return _inference_executor
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking stage on the bounded executor (raises ExecutorSaturatedError when full)."""
+    return await get_inference_executor().run(func, *args, **kwargs)
+
+def decode_image(source) -> DecodedImage:
+    """Decode uploaded bytes or a spooled upload into an RGB PIL image sized for inference."""
+    return decode_for_inference(source, IMAGE_DECODE_TARGET_SIZE if IMAGE_REDUCED_DECODE else None)
+
+async def read_upload(file: UploadFile):
+    """Stream-validate an upload (size, signature, header dimensions) before decode."""
+    return await ingest_upload(file, max_bytes=UPLOAD_MAX_BYTES, max_pixels=IMAGE_MAX_PIXELS)
+
+def read_passthrough_bytes(upload) -> bytes | None:
+    """Original JPEG bytes small enough to forward to the LLM without re-encoding."""
+    if upload.format != "JPEG" or upload.size > MISTRAL_IMAGE_MAX_BYTES:
+        return None
+    upload.file.seek(0)
+    return upload.file.read()
+
+# Data files behind the enriched nutrition, GI and advice in cached responses
+CATALOG_FILES = ("nutrition_db.json", "glycemic_index.json", "foods_extended.json", "local_food_map.json")
+
+def _file_id(path: Path) -> str:
+    try:
+        stat = path.stat()
+        return f"{stat.st_size}-{int(stat.st_mtime)}"
+    except OSError:
+        return "missing"
+
+def _pipeline_version() -> str:
+    """Cache namespace: bumps when the detector weights, food catalog, decode or fusion settings change."""
+    model_id = _file_id(BASE_DIR / "ml_models" / "yolo" / "best.onnx")
+    catalog_id = ",".join(_file_id(DATA_DIR / name) for name in CATALOG_FILES)
+    return (
+        f"{SCAN_CACHE_VERSION}|yolo:{model_id}|{YOLO_BACKEND}|catalog:{catalog_id}"
+        f"|decode:{IMAGE_REDUCED_DECODE}:{IMAGE_DECODE_TARGET_SIZE}|fusion:{FUSION_MODE}"
+    )
+
+def get_scan_cache():
+    """Get or initialize the scan result cache (None when SCAN_CACHE_BACKEND=off)."""
+    global _scan_cache
+    if _scan_cache is None and SCAN_CACHE_BACKEND != "off":
+        with _model_init_lock:
+            if _scan_cache is None:
+                if SCAN_CACHE_BACKEND == "sqlite":
+                    backend = SqliteCacheBackend(
+                        SCAN_CACHE_PATH,
+                        max_entries=SCAN_CACHE_MAX_ENTRIES,
+                        ttl_seconds=SCAN_CACHE_TTL_SECONDS
+                    )
+                else:
+                    backend = MemoryCacheBackend(
+                        max_entries=SCAN_CACHE_MAX_ENTRIES,
+                        ttl_seconds=SCAN_CACHE_TTL_SECONDS
+                    )
+                _scan_cache = ScanResultCache(backend, version=_pipeline_version())
+                logger.info(f"Scan result cache enabled ({backend.name})")
+    return _scan_cache
+
+def get_near_duplicate_index(namespace: str):
+    """Get the near-duplicate index for one pipeline configuration (None when disabled)."""
+    if not NEAR_DUPLICATE_REUSE:
+        return None
+    index = _near_duplicate_indexes.get(namespace)
+    if index is None:
+        with _model_init_lock:
+            index = _near_duplicate_indexes.get(namespace)
+            if index is None:
+                index = _near_duplicate_indexes[namespace] = PerceptualHashIndex(
+                    max_entries=NEAR_DUPLICATE_INDEX_SIZE,
+                    max_distance=NEAR_DUPLICATE_MAX_DISTANCE,
+                    min_hash_bits=NEAR_DUPLICATE_MIN_HASH_BITS
+                )
+    return index
+
+async def scan_cache_lookup(endpoint: str, image_digest: str, **params):
+    """
+    Look up a cached response for this image and endpoint parameters.
+
+    Returns:
+        (cache_key, cached response or None); cache_key is None when caching is off
+    """
+    cache = get_scan_cache()
+    if cache is None:
+        return None, None
+    key = cache.make_key(image_digest, endpoint, **params)
+    cached = await run_blocking(cache.get, key) if cache.blocking else cache.get(key)
+    if cached is not None:
+        logger.info(f"Scan cache hit for {endpoint}")
+    return key, cached
+
+async def scan_cache_store(key, response: dict):
+    """Store a successful response under a key from scan_cache_lookup."""
+    cache = get_scan_cache()
+    if cache is None or key is None:
+        return
+    if cache.blocking:
+        await run_blocking(cache.set, key, response)
+    else:
+        cache.set(key, response)
+
+def get_detection_batcher():
+    """Get or initialize the cross-request micro-batcher in front of the YOLO detector."""
+    global _detection_batcher
+    if _detection_batcher is None:
+        _detection_batcher = DetectionMicroBatcher(
+            get_yolo_detector,
+            window_ms=YOLO_BATCH_WINDOW_MS,
+            max_batch_size=YOLO_MAX_BATCH_SIZE,
+            max_queue_depth=YOLO_BATCH_MAX_QUEUE,
+            retry_after=INFERENCE_RETRY_AFTER_SECONDS,
+            # Batches share the bounded executor: saturation surfaces as 503 + Retry-After
+            run_blocking=run_blocking
+        )
+    return _detection_batcher
+
+def get_detection_pool():
+    """Get or start the detector process pool (YOLO_INFERENCE_MODE=process)."""
+    global _detection_pool
+    if _detection_pool is None:
+        with _model_init_lock:
+            if _detection_pool is None:
+                logger.info(f"Starting YOLO process pool with {YOLO_PROCESS_WORKERS} workers...")
+                _detection_pool = DetectionProcessPool(
+                    num_workers=YOLO_PROCESS_WORKERS,
+                    job_timeout=YOLO_PROCESS_JOB_TIMEOUT,
+                    restart_backoff=YOLO_PROCESS_RESTART_BACKOFF,
+                    restart_backoff_max=YOLO_PROCESS_RESTART_BACKOFF_MAX,
+                    max_init_failures=YOLO_PROCESS_MAX_INIT_FAILURES,
+                    max_pending=YOLO_PROCESS_MAX_PENDING,
+                    retry_after=INFERENCE_RETRY_AFTER_SECONDS
+                )
+    return _detection_pool
+
+async def run_yolo_detection(image: Image.Image, confidence_threshold: float, imgsz: int) -> List[Dict[str, Any]]:
+    """
+    Run YOLO detection, batched with concurrent requests when micro-batching is enabled.
+    In process mode, falls back to the in-process detector while no worker process
+    is available (all restarting or given up on after repeated init failures).
+    Every path is admission-bounded and raises ExecutorSaturatedError when full.
+    """
+    if YOLO_INFERENCE_MODE == "process":
         try:
-            logger.info("Initializing YOLO detector for /scan-food...")
-            _yolo_detector = YOLOFoodDetector()
-            logger.info("YOLO detector initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize YOLO detector: {e}")
+            future = get_detection_pool().submit(image, confidence_threshold=confidence_threshold, imgsz=imgsz)
+            return await asyncio.wait_for(asyncio.wrap_future(future), YOLO_PROCESS_JOB_TIMEOUT)
+        except ExecutorSaturatedError:
             raise
-    return _yolo_detector
+        except DetectionPoolUnavailableError as e:
+            logger.warning(f"{e}; running YOLO detection in-process")
+        except Exception as e:
+            logger.error(f"Pooled YOLO detection failed: {e}")
+            return []
+    elif YOLO_MICRO_BATCHING:
+        return await get_detection_batcher().detect(
+            image,
+            confidence_threshold=confidence_threshold,
+            imgsz=imgsz
+        )
+    return await run_blocking(
+        lambda: get_yolo_detector().detect_foods(image, confidence_threshold=confidence_threshold, imgsz=imgsz)
+    )
 
 # Preload models on startup for Render stability
 @app.on_event("startup")
 def preload_models():
     try:
-        logger.info("Startup: Preloading YOLO model...")
-        get_yolo_detector()
+        logger.info("Startup: Loading food knowledge base...")
+        get_knowledge_base()
+        get_food_info_table()
+        get_heuristics_engine()
+        if YOLO_INFERENCE_MODE == "process":
+            logger.info("Startup: Starting YOLO worker processes...")
+            get_detection_pool()
+        else:
+            logger.info("Startup: Preloading YOLO model...")
+            get_yolo_detector()
         logger.info("Startup: Models ready")
     except Exception as e:
         logger.error(f"Startup: Model preload failed: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_workers():
+    if _detection_pool is not None:
+        _detection_pool.shutdown()
+    if _mistral_validator is not None:
+        await drain_late_llm_tasks()
+        await _mistral_validator.aclose()
+        _mistral_validator.close()
+
 # TODO: Re-enable DeepSeek integration when needed
 # def get_deepseek_detector():
 #     """Get or initialize DeepSeek-VL2 detector for /scan-food endpoint."""
@@ -315,13 +596,29 @@ def preload_models():
 #             _deepseek_detector = None
 #     return _deepseek_detector
 
+def _build_mistral_cache():
+    """Persistent Mistral response cache, or None if disabled or unavailable."""
+    if not MISTRAL_CACHE_ENABLED:
+        return None
+    try:
+        backend = SqliteCacheBackend(
+            MISTRAL_CACHE_PATH,
+            max_entries=MISTRAL_CACHE_MAX_ENTRIES,
+            ttl_seconds=MISTRAL_CACHE_TTL_SECONDS,
+            table="mistral_responses"
+        )
+        return ScanResultCache(backend)
+    except Exception as e:
+        logger.warning(f"Mistral response cache unavailable: {e}")
+        return None
+
 def get_mistral_validator():
     """Get or initialize Mistral food validator."""
     global _mistral_validator
     if _mistral_validator is None:
         try:
             logger.info("Initializing Mistral validator...")
-            _mistral_validator = MistralFoodValidator()
+            _mistral_validator = MistralFoodValidator(response_cache=_build_mistral_cache(), run_blocking=run_blocking)
             logger.info("Mistral validator initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Mistral validator: {e}")
@@ -333,7 +630,11 @@ def get_fusion_engine():
     """Get or initialize fusion engine."""
     global _fusion_engine
     if _fusion_engine is None:
-        _fusion_engine = DetectionFusion()
+        _fusion_engine = DetectionFusion(
+            spatial=FUSION_MODE == "spatial",
+            same_class_iou=FUSION_SAME_CLASS_IOU,
+            cross_class_iou=FUSION_CROSS_CLASS_IOU
+        )
     return _fusion_engine
 
 def get_heuristics_engine():
@@ -352,107 +653,36 @@ def get_heuristics_engine():
 def get_yolo_model():
     global _yolo_model
     if _yolo_model is None:
-        if not YOLO_PATH.exists():
-            raise FileNotFoundError(f"YOLO model not found at {YOLO_PATH}")
-        _yolo_model = YOLO(str(YOLO_PATH))
+        with _model_init_lock:
+            if _yolo_model is None:
+                if not YOLO_PATH.exists():
+                    raise FileNotFoundError(f"YOLO model not found at {YOLO_PATH}")
+                # Legacy endpoints only; the onnxruntime backend runs without ultralytics/torch
+                from ultralytics import YOLO
+                _yolo_model = YOLO(str(YOLO_PATH))
     return _yolo_model
 
 def get_yolo_seg_model():
     global _yolo_seg_model
     if _yolo_seg_model is None:
-        if YOLO_SEG_PATH.exists():
-            _yolo_seg_model = YOLO(str(YOLO_SEG_PATH))
-        else:
-            _yolo_seg_model = None
+        with _model_init_lock:
+            if _yolo_seg_model is None and YOLO_SEG_PATH.exists():
+                from ultralytics import YOLO
+                _yolo_seg_model = YOLO(str(YOLO_SEG_PATH))
     return _yolo_seg_model
 
-NUTRITION_PATH = BASE_DIR / "data" / "nutrition_db.json"
-GI_PATH = BASE_DIR / "data" / "glycemic_index.json"
-FOODS_EXT_PATH = BASE_DIR / "data" / "foods_extended.json"
-
-def _load_json_or_empty(path: Path):
-    try:
-        with open(path, "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {} if path.suffix == ".json" else []
-
-
-def _normalize(name: str) -> str:
-    return name.strip().lower()
-
-
-nutrition_db = _load_json_or_empty(NUTRITION_PATH)
-gi_db = _load_json_or_empty(GI_PATH)
-foods_extended = _load_json_or_empty(FOODS_EXT_PATH) or []
-foods_extended_index = {_normalize(item.get("name", "")): item for item in foods_extended}
-
-
-def _from_extended(food_name: str):
-    entry = foods_extended_index.get(_normalize(food_name))
-    if not entry:
-        return {}, None, None, []
-
-    nutrition = {
-        "calories": entry.get("calories", 0),
-        "carbs": entry.get("carbs", 0),
-        "protein": entry.get("protein", 0),
-        "fat": entry.get("fat", 0),
-        "fiber": entry.get("fiber", 0),
-        "warnings": {},
-        "flags": [],
-    }
-    return nutrition, entry.get("glycemic_index"), entry.get("GI_category"), entry.get("suitable_for", [])
-
+def get_food_info_table():
+    """Get or build the precomputed per-food info table."""
+    global _food_info_table
+    if _food_info_table is None:
+        with _model_init_lock:
+            if _food_info_table is None:
+                _food_info_table = FoodInfoTable(get_knowledge_base())
+                logger.info(f"Food info table ready: {len(_food_info_table)} foods")
+    return _food_info_table
 
 def get_food_info(food_name: str, confidence: float):
-    nutrition = nutrition_db.get(food_name, {})
-    gi = gi_db.get(food_name)
-    gi_category = None
-    suitable_for = []
-
-    if not nutrition or gi is None:
-        ext_nutrition, ext_gi, gi_category, suitable_for = _from_extended(food_name)
-        if nutrition:
-            nutrition = {**ext_nutrition, **nutrition}
-        else:
-            nutrition = ext_nutrition
-        if gi is None:
-            gi = ext_gi
-
-    calories = nutrition.get("calories")
-    carbs = nutrition.get("carbs")
-    protein = nutrition.get("protein")
-    fat = nutrition.get("fat")
-    fiber = nutrition.get("fiber")
-    flags = nutrition.get("flags", [])
-    health_warnings = nutrition.get("warnings", {})
-    
-    # Basic advice based on GI
-    if gi is None:
-        advice = "No GI data available"
-    elif gi < 55:
-        advice = "Low GI – safer for diabetes"
-    elif 55 <= gi <= 69:
-        advice = "Medium GI – moderate consumption advised"
-    else:
-        advice = "High GI – minimize for diabetes"
-
-    return {
-        "name": food_name,
-        "confidence": confidence,
-        "calories": calories,
-        "carbs": carbs,
-        "protein": protein,
-        "fat": fat,
-        "fiber": fiber,
-        "glycemic_index": gi,
-        "gi_category": gi_category,
-        "suitable_for": suitable_for,
-        "advice": advice,
-        "flags": flags,
-        "health_warnings": health_warnings
-    }
+    return get_food_info_table().item(food_name, confidence)
 
 def _estimate_portion(mask_area: float, food_name: str) -> float:
     # Simple heuristic: reference area per serving ~4000 pixels; clamp 0.3x-2x
@@ -460,22 +690,6 @@ def _estimate_portion(mask_area: float, food_name: str) -> float:
     portion = max(0.3, min(2.0, mask_area / ref_area))
     return portion
 
-def _apply_flag_heuristics(info: dict) -> dict:
-    name_lower = info.get("name", "").lower()
-    flags = set(info.get("flags", []))
-    if "fried" in name_lower:
-        flags.add("fried")
-    if "pepper" in name_lower or "spicy" in name_lower:
-        flags.add("spicy")
-    if "soup" in name_lower:
-        flags.add("soup")
-    if "stew" in name_lower:
-        flags.add("stew")
-    if "rice" in name_lower or "yam" in name_lower or "fufu" in name_lower or "plantain" in name_lower:
-        flags.add("carb-heavy")
-    info["flags"] = list(flags)
-    return info
-
 def _apply_portion_scaling(info: dict, portion: float) -> dict:
     scaled = info.copy()
     for key in ["calories", "carbs", "protein", "fat", "fiber"]:
@@ -484,10 +698,10 @@ def _apply_portion_scaling(info: dict, portion: float) -> dict:
     return scaled
 
 def _handle_detection(results_dict: dict, food_name: str, conf_val: float, user_health: dict, portion: float | None = None):
-    info = get_food_info(food_name, conf_val)
+    # Catalog info with name-derived flags already applied (one table lookup)
+    info = get_food_info_table().item(food_name, conf_val, tag_flags=True)
     if portion is not None:
         info = _apply_portion_scaling(info, portion)
-    info = _apply_flag_heuristics(info)
     info["advice"] = personalize_advice(info, user_health)
     return info
 
@@ -497,7 +711,8 @@ def analyze_image(img: Image.Image, user_health: dict):
 
     # Prefer segmentation if available
     if seg_model:
-        seg_results = seg_model.predict(img)
+        with _legacy_predict_lock:
+            seg_results = seg_model.predict(img)
         for r in seg_results:
             masks = getattr(r, "masks", None)
             if masks is None:
@@ -515,7 +730,8 @@ def analyze_image(img: Image.Image, user_health: dict):
 
     # Fallback to bounding-box YOLO (and also run to complement seg)
     yolo_model = get_yolo_model()
-    yolo_results = yolo_model.predict(img)
+    with _legacy_predict_lock:
+        yolo_results = yolo_model.predict(img)
     for r in yolo_results:
         for box, cls_id, conf in zip(r.boxes.xyxy, r.boxes.cls, r.boxes.conf):
             food_name = yolo_model.names[int(cls_id)]
@@ -851,7 +1067,7 @@ def root():
                 "/docs (Swagger UI)",
                 "/redoc (ReDoc)"
             ],
-            "health": ["/health"],
+            "health": ["/health", "/stats"],
             "food_analysis": [
                 "/scan-food/ (basic analysis)",
                 "/analyze-meal (flagship endpoint with full recommendations)"
@@ -884,6 +1100,36 @@ def health_with_slash():
     return health()
 
 
+@app.get("/stats", tags=["Health"], summary="Pipeline Statistics", response_model=dict)
+def stats():
+    """
+    Runtime statistics for the scan pipeline.
+    
+    Returns:
+    - **detection_batcher**: Micro-batching queue depth and batch-size histogram
+    - **inference_executor**: Blocking-work pool utilization, queue and rejections
+    - **detection_pool**: Detector process health, in-flight jobs and restarts (process mode)
+    - **scan_cache**: Result cache hits, misses and bytes served/stored
+    - **near_duplicates**: Perceptual-hash reuse rate per pipeline
+    - **mistral_cache**: Persistent LLM response cache hits and size
+    - **llm_image_encoder**: LLM image payload bytes, encode time and passthrough count
+    - **mistral_resilience**: Circuit breaker state, retries and rejected (open/busy) calls
+    - **scan_pipeline**: LLM requests that missed the scan deadline (total, still running)
+    """
+    mistral_cache = _mistral_validator.response_cache if _mistral_validator else None
+    return {
+        "mistral_cache": mistral_cache.get_statistics() if mistral_cache else None,
+        "llm_image_encoder": _mistral_validator.image_encoder.get_statistics() if _mistral_validator else None,
+        "mistral_resilience": _mistral_validator.resilience.get_statistics() if _mistral_validator else None,
+        "scan_pipeline": scan_pipeline.get_statistics(),
+        "near_duplicates": {name: index.get_statistics() for name, index in _near_duplicate_indexes.items()},
+        "scan_cache": _scan_cache.get_statistics() if _scan_cache else None,
+        "detection_batcher": _detection_batcher.get_statistics() if _detection_batcher else None,
+        "detection_pool": _detection_pool.get_statistics() if _detection_pool else None,
+        "inference_executor": get_inference_executor().get_statistics(),
+    }
+
+
 # Disabled Deepseek; using Mistral API key. Re-enable DeepSeek endpoint when needed
 # @app.post(
 #     "/scan-food-yolo-deepseek/",
@@ -910,8 +1156,11 @@ def health_with_slash():
     responses={
         200: {"description": "Successful food detection and analysis using YOLO + Mistral fusion"},
         400: {"description": "Invalid image format"},
+        413: {"description": "Upload or image dimensions too large"},
+        415: {"description": "Unsupported image type"},
         404: {"description": "No foods detected in image"},
-        500: {"description": "Server error during detection or analysis"}
+        500: {"description": "Server error during detection or analysis"},
+        503: {"description": "Server busy; retry after the Retry-After delay"}
     }
 )
 async def scan_food_yolo_mistral(
@@ -927,7 +1176,9 @@ async def scan_food_yolo_mistral(
     
     **Detection Strategy:**
     1. Run YOLO detection (high precision, trusted anchor)
-    2. Validate with Mistral AI (confirms YOLO items, adds visible missed foods)
+    2. Validate with Mistral AI (confirms YOLO items, adds visible missed foods);
+       with MISTRAL_PIPELINE_MODE=parallel an open-ended Mistral detection runs
+       concurrently with step 1 instead
     3. Fuse results: For duplicates, keep higher confidence; add unique items >= 0.3 confidence
     4. Apply heuristics for nutrition data with defensive defaults
     5. Calculate meal summary and recommendations
@@ -972,7 +1223,8 @@ async def scan_food_yolo_mistral(
         "total_items": 3,
         "yolo_items": 2,
         "llm_items": 1
-      }
+      },
+      "partial": false
     }
     ```
     
@@ -981,53 +1233,85 @@ async def scan_food_yolo_mistral(
     - YOLO precision + Mistral validation
     - Rich nutrition data and recommendations
     - Graceful fallback to YOLO-only if Mistral fails
+    - Bounded latency: if Mistral misses its share of SCAN_DEADLINE_SECONDS,
+      fused YOLO-only results are returned with `"partial": true`
     """
+    loop = asyncio.get_running_loop()
+    deadline = None
+    if SCAN_DEADLINE_SECONDS > 0:
+        deadline = loop.time() + SCAN_DEADLINE_SECONDS - SCAN_ENRICHMENT_RESERVE_SECONDS
+    partial = False
     try:
         # Load and validate image
         try:
-            image_bytes = await file.read()
-            image = Image.open(BytesIO(image_bytes))
-            
-            # Convert to RGB if needed
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
+            upload = await read_upload(file)
+            mistral_validator = get_mistral_validator()
+            mistral_model = mistral_validator.model if mistral_validator and mistral_validator.api_key else None
+            pipeline_mode = MISTRAL_PIPELINE_MODE if MISTRAL_PIPELINE_MODE in PIPELINE_MODES else "sequential"
+            cache_key, cached = await scan_cache_lookup(
+                "scan-food-yolo-mistral",
+                upload.sha256,
+                yolo_confidence=0.20,
+                imgsz=640,
+                mistral_confidence=0.3,
+                mistral_model=mistral_model,
+                pipeline_mode=pipeline_mode
+            )
+            if cached is not None:
+                return cached
+            # Decode and convert to RGB off the event loop
+            decoded = await run_blocking(decode_image, upload.file)
+            image = decoded.image
                 
-            logger.info(f"Processing image: {image.size}, mode: {image.mode}")
+            logger.info(f"Processing image: {decoded.original_size} decoded at {image.size}, mode: {image.mode}")
             
+        except (ExecutorSaturatedError, HTTPException):
+            raise
         except Exception as e:
             logger.error(f"Invalid image format: {e}")
             raise HTTPException(status_code=400, detail=f"Invalid image format: {str(e)}")
         
-        # Step 1: YOLO Detection
-        logger.info("Step 1: Running YOLO detection...")
-        yolo_detector = get_yolo_detector()
-        # Slightly lower confidence to improve recall on challenging images
-        yolo_results = yolo_detector.detect_foods(image, confidence_threshold=0.20, imgsz=640)
-        logger.info(f"YOLO detected {len(yolo_results)} items")
+        # Near-duplicate reuse: a re-encoded, resized or slightly cropped copy of a
+        # recent photo skips YOLO and Mistral; enrichment below still runs fresh
+        near_duplicate = None
+        near_dup_index = get_near_duplicate_index(f"scan-food-yolo-mistral|{mistral_model}|{pipeline_mode}")
+        if near_dup_index is not None:
+            image_hash = await run_blocking(dhash, image)
+            near_duplicate = near_dup_index.find(image_hash)
         
-        # Step 2: Mistral Validation (optional - graceful fallback)
-        mistral_results = []
-        try:
-            logger.info("Step 2: Running Mistral validation...")
-            mistral_validator = get_mistral_validator()
-            if mistral_validator and mistral_validator.api_key:
-                mistral_results = mistral_validator.validate_detections(
-                    image, 
-                    yolo_results, 
-                    confidence_threshold=0.3
-                )
-                logger.info(f"Mistral validated/extended: {len(mistral_results)} items")
-            else:
+        if near_duplicate is not None:
+            distance, (stored_size, stored_yolo, stored_mistral) = near_duplicate
+            yolo_results = rescale_detections(
+                copy.deepcopy(stored_yolo), size_scale(stored_size, decoded.original_size)
+            )
+            mistral_results = copy.deepcopy(stored_mistral)
+            logger.info(f"Reusing detections from a near-duplicate scan (distance {distance})")
+        else:
+            async def detect_yolo():
+                # Slightly lower confidence to improve recall on challenging images
+                results = await run_yolo_detection(image, confidence_threshold=0.20, imgsz=640)
+                results = rescale_detections(results, decoded.scale)
+                logger.info(f"YOLO detected {len(results)} items")
+                return results
+            
+            # Steps 1-2: YOLO detection + Mistral validation (optional - graceful fallback:
+            # the validator returns [] on API errors, leaving YOLO only)
+            logger.info(f"Steps 1-2: Running YOLO and Mistral ({pipeline_mode})...")
+            if not mistral_model:
                 logger.warning("Mistral validator not available (no API key), using YOLO only")
-        except Exception as e:
-            logger.warning(f"Mistral validation failed, continuing with YOLO only: {e}")
-            if deepseek_detector:
-                deepseek_results = deepseek_detector.detect_foods(image, confidence_threshold=0.3)
-                logger.info(f"DeepSeek detected {len(deepseek_results)} items")
-            else:
-                logger.warning("DeepSeek detector not available, using YOLO only")
-        except Exception as e:
-            logger.warning(f"DeepSeek detection failed, continuing with YOLO only: {e}")
+            source_bytes = await run_blocking(read_passthrough_bytes, upload) if mistral_model else None
+            yolo_results, mistral_results, partial = await run_detection_stages(
+                image,
+                detect_yolo,
+                mistral_validator if mistral_model else None,
+                mode=pipeline_mode,
+                llm_confidence_threshold=0.3,
+                deadline=deadline,
+                source_bytes=source_bytes
+            )
+            
+            if near_dup_index is not None and yolo_results and not partial and not (mistral_model and not mistral_results):
+                near_dup_index.add(image_hash, (decoded.original_size, copy.deepcopy(yolo_results), copy.deepcopy(mistral_results)))
         
         # Step 3: Fusion
         logger.info("Step 3: Fusing detection results...")
@@ -1038,10 +1322,13 @@ async def scan_food_yolo_mistral(
             logger.warning("No foods detected via YOLO+Mistral. Running server-side fallbacks...")
             # Fallback 1: Legacy YOLO-only pipeline
             try:
-                legacy_yolo_results = yolo_detector.detect_foods(image, confidence_threshold=0.25, imgsz=640)
+                legacy_yolo_results = await run_yolo_detection(image, confidence_threshold=0.25, imgsz=640)
+                legacy_yolo_results = rescale_detections(legacy_yolo_results, decoded.scale)
                 fusion_engine = get_fusion_engine()
                 fused_results = fusion_engine.fuse(legacy_yolo_results, [])
                 logger.info(f"Legacy fallback fused items: {len(fused_results)}")
+            except ExecutorSaturatedError:
+                raise
             except Exception as e:
                 logger.warning(f"Legacy fallback failed: {e}")
                 fused_results = []
@@ -1052,7 +1339,7 @@ async def scan_food_yolo_mistral(
                 heuristics_engine = get_heuristics_engine()
                 # Reuse flagship functions if available
                 from app.core.heuristics import analyze_image, apply_missing_ingredient_heuristics, build_meal_analysis
-                foods_flagship = analyze_image(image, {
+                foods_flagship = await run_blocking(analyze_image, image, {
                     "diabetes": False,
                     "hypertension": False,
                     "ulcer": False,
@@ -1068,6 +1355,8 @@ async def scan_food_yolo_mistral(
                     "acid_reflux": False,
                 })
                 logger.info("Flagship fallback analysis completed")
+            except ExecutorSaturatedError:
+                raise
             except Exception as e:
                 logger.warning(f"Flagship fallback failed: {e}")
                 flagship_result = None
@@ -1086,10 +1375,7 @@ async def scan_food_yolo_mistral(
         logger.info("Step 4: Applying heuristics and enriching data...")
         heuristics_engine = get_heuristics_engine()
         
-        enriched_items = []
-        for item in fused_results:
-            enriched = heuristics_engine.enrich_food_item(item)
-            enriched_items.append(enriched)
+        enriched_items = heuristics_engine.enrich_many(fused_results)
         
         # Step 5: Calculate Meal Summary
         logger.info("Step 5: Calculating meal summary...")
@@ -1109,12 +1395,20 @@ async def scan_food_yolo_mistral(
             "recommendations": ScanMealRecommendations(**recommendations).model_dump(),
             "fusion_stats": fusion_stats,
             "status": "success",
+            "partial": partial,
         }
         if 'flagship_result' in locals() and flagship_result:
             response["flagship"] = flagship_result
+        # validate_detections returns [] on API errors and late answers are
+        # dropped; don't pin a degraded YOLO-only result in the cache when
+        # Mistral should have answered
+        if not partial and not (mistral_model and yolo_results and not mistral_results):
+            await scan_cache_store(cache_key, response)
         logger.info("Food detection complete!")
         return response
         
+    except ExecutorSaturatedError:
+        raise
     except HTTPException as e:
         logger.error(f"HTTP error during food detection: {e}")
         return {"detected_items": [], "meal_summary": {}, "recommendations": {}, "status": "error", "message": str(e.detail) if hasattr(e, 'detail') else str(e)}
@@ -1130,7 +1424,10 @@ async def scan_food_yolo_mistral(
     responses={
         200: {"description": "Successful meal analysis with nutrition and recommendations"},
         400: {"description": "Invalid image format or request"},
-        500: {"description": "Server error during detection or analysis"}
+        413: {"description": "Upload or image dimensions too large"},
+        415: {"description": "Unsupported image type"},
+        500: {"description": "Server error during detection or analysis"},
+        503: {"description": "Server busy; retry after the Retry-After delay"}
     }
 )
 async def scan_food(
@@ -1193,30 +1490,52 @@ async def scan_food(
     }
     
     try:
-        image_bytes = await file.read()
-        image = Image.open(BytesIO(image_bytes))
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        logger.info(f"Legacy /scan-food: image {image.size} mode {image.mode}")
+        upload = await read_upload(file)
+        cache_key, cached = await scan_cache_lookup(
+            "scan-food", upload.sha256, yolo_confidence=0.25, imgsz=640, **user_health
+        )
+        if cached is not None:
+            return cached
+        decoded = await run_blocking(decode_image, upload.file)
+        image = decoded.image
+        logger.info(f"Legacy /scan-food: image {decoded.original_size} decoded at {image.size} mode {image.mode}")
 
         # Use new pipeline but keep legacy route
-        yolo_detector = get_yolo_detector()
-        yolo_results = yolo_detector.detect_foods(image, confidence_threshold=0.25, imgsz=640)
+        near_duplicate = None
+        near_dup_index = get_near_duplicate_index("scan-food")
+        if near_dup_index is not None:
+            image_hash = await run_blocking(dhash, image)
+            near_duplicate = near_dup_index.find(image_hash)
+        if near_duplicate is not None:
+            distance, (stored_size, stored_yolo) = near_duplicate
+            yolo_results = rescale_detections(
+                copy.deepcopy(stored_yolo), size_scale(stored_size, decoded.original_size)
+            )
+            logger.info(f"Legacy /scan-food: reusing detections from a near-duplicate scan (distance {distance})")
+        else:
+            yolo_results = await run_yolo_detection(image, confidence_threshold=0.25, imgsz=640)
+            yolo_results = rescale_detections(yolo_results, decoded.scale)
+            if near_dup_index is not None and yolo_results:
+                near_dup_index.add(image_hash, (decoded.original_size, copy.deepcopy(yolo_results)))
 
         fusion_engine = get_fusion_engine()
         fused_results = fusion_engine.fuse(yolo_results, [])
 
         heuristics_engine = get_heuristics_engine()
-        enriched_items = [heuristics_engine.enrich_food_item(item) for item in fused_results]
+        enriched_items = heuristics_engine.enrich_many(fused_results)
         meal_summary = heuristics_engine.calculate_meal_summary(enriched_items)
         recommendations = heuristics_engine.generate_meal_recommendations(enriched_items, meal_summary)
 
-        return {
+        response = {
             "detected_items": enriched_items,
             "meal_summary": meal_summary,
             "recommendations": recommendations,
             "status": "success",
         }
+        await scan_cache_store(cache_key, response)
+        return response
+    except (ExecutorSaturatedError, HTTPException):
+        raise
     except Exception as e:
         logger.error(f"Legacy /scan-food error: {e}", exc_info=True)
         return {"detected_items": [], "meal_summary": {}, "recommendations": {}, "status": "error", "message": str(e)}
@@ -1229,7 +1548,10 @@ async def scan_food(
     responses={
         200: {"description": "Comprehensive meal analysis with all health conditions"},
         400: {"description": "Invalid image or request parameters"},
-        500: {"description": "Detection or analysis error"}
+        413: {"description": "Upload or image dimensions too large"},
+        415: {"description": "Unsupported image type"},
+        500: {"description": "Detection or analysis error"},
+        503: {"description": "Server busy; retry after the Retry-After delay"}
     }
 )
 async def analyze_meal(
@@ -1283,7 +1605,18 @@ async def analyze_meal(
         "weight_loss": weight_loss,
         "acid_reflux": acid_reflux
     }
-    img = Image.open(BytesIO(await file.read()))
+    upload = await read_upload(file)
+    cache_key, cached = await scan_cache_lookup("analyze-meal", upload.sha256, **user_health)
+    if cached is not None:
+        return cached
+    result = await run_blocking(_analyze_meal_sync, upload.file, user_health)
+    await scan_cache_store(cache_key, result)
+    return result
+
+
+def _analyze_meal_sync(image_file, user_health: dict) -> dict:
+    """Decode, detect/classify and score a meal (blocking; runs on the executor)."""
+    img = Image.open(image_file)
     foods = analyze_image(img, user_health)
     foods = apply_missing_ingredient_heuristics(foods)
     result = build_meal_analysis(foods, user_health)
@@ -1343,8 +1676,7 @@ async def confirm_detections(
         name = item.get("name")
         new_name = correction_map.get(name, name)
         confidence = item.get("confidence", 0.5)
-        info = get_food_info(new_name, confidence)
-        info = _apply_flag_heuristics(info)
+        info = get_food_info_table().item(new_name, confidence, tag_flags=True)
         info["source"] = f"Corrected:{item.get('source','user')}"
         updated_items.append(info)
 
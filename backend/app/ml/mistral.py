@@ -1,16 +1,43 @@
+import asyncio
 import logging
 import os
 import json
-from typing import List, Dict, Any
+import hashlib
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from PIL import Image
-import requests
+import httpx
 import base64
-from io import BytesIO
+
+from app.config import (
+    MISTRAL_API_URL,
+    MISTRAL_TIMEOUT_SECONDS,
+    MISTRAL_MAX_CONNECTIONS,
+    MISTRAL_HTTP2,
+    MISTRAL_IMAGE_MAX_SIDE,
+    MISTRAL_IMAGE_QUALITY,
+    MISTRAL_IMAGE_MAX_BYTES,
+    MISTRAL_MAX_CONCURRENCY,
+    MISTRAL_CONCURRENCY_WAIT_SECONDS,
+    MISTRAL_MAX_RETRIES,
+    MISTRAL_RETRY_BACKOFF_SECONDS,
+    MISTRAL_RETRY_BACKOFF_MAX_SECONDS,
+    MISTRAL_BREAKER_WINDOW_SECONDS,
+    MISTRAL_BREAKER_MIN_CALLS,
+    MISTRAL_BREAKER_FAILURE_RATIO,
+    MISTRAL_BREAKER_OPEN_SECONDS,
+)
+from app.services.llm_image_encoder import LLMImageEncoder
+from app.services.llm_resilience import CircuitBreaker, LLMResilience
 
 logger = logging.getLogger(__name__)
 
 
 class MistralFoodValidator:
+    # Bump whenever a prompt or response parsing changes (invalidates cached responses)
+    PROMPT_VERSION = "1"
+    
     VALIDATION_PROMPT = """You are a precise food detection system. Analyze this image and the provided YOLO detections.
 
 YOLO DETECTED: {yolo_foods}
@@ -37,36 +64,112 @@ OUTPUT FORMAT (valid JSON only):
 
 Return JSON only, no other text."""
 
-    def __init__(self, api_key: str = None, model: str = "pixtral-12b-2409"):
+    # Open-ended variant used when the LLM runs alongside YOLO rather than after it
+    DETECTION_PROMPT = """You are a precise food detection system. Analyze this image.
+
+TASK:
+1. Identify every food item clearly visible in the image
+2. Return ONLY foods you can clearly see
+
+STRICT RULES:
+- NO hallucinations: only report foods clearly visible
+- Provide confidence score 0.0-1.0 for each item
+- Use lowercase names (e.g., "rice", "chicken", "beans")
+- Confidence must be >= 0.3
+
+OUTPUT FORMAT (valid JSON only):
+{
+  "validated_foods": [
+    {"name": "rice", "confidence": 0.85, "source": "LLM", "notes": "clearly visible"},
+    {"name": "beans", "confidence": 0.72, "source": "LLM", "notes": "side portion"}
+  ]
+}
+
+Return JSON only, no other text."""
+
+    def __init__(
+        self,
+        api_key: str = None,
+        model: str = "pixtral-12b-2409",
+        response_cache=None,
+        image_encoder: Optional[LLMImageEncoder] = None,
+        resilience: Optional[LLMResilience] = None,
+        api_url: Optional[str] = None,
+        run_blocking: Optional[Callable[..., Awaitable[Any]]] = None
+    ):
         """
         Initialize Mistral Food Validator.
         
         Args:
             api_key: Mistral API key (defaults to MISTRAL_API_KEY env var)
             model: Mistral vision model to use
+            response_cache: Optional persistent cache (ScanResultCache) of parsed
+                responses, keyed on image, YOLO names, model and prompt version
+            image_encoder: Size-bounded JPEG encoder for the request image
+                (defaults to the MISTRAL_IMAGE_* settings)
+            resilience: Circuit breaker / concurrency limit / retry policy for
+                API calls (defaults to the MISTRAL_* resilience settings)
+            api_url: Chat completions endpoint (defaults to MISTRAL_API_URL; point
+                it at tools/fake_mistral_server.py for offline testing)
+            run_blocking: Awaitable runner for the CPU-bound steps (cache key
+                hashing, cache I/O, image encoding); the API passes its bounded
+                inference executor so these share its admission limit.
+                Defaults to asyncio.to_thread for standalone use
         """
         self.api_key = api_key or os.environ.get("MISTRAL_API_KEY")
         self.model = model
-        self.api_url = "https://api.mistral.ai/v1/chat/completions"
+        self.response_cache = response_cache
+        self.image_encoder = image_encoder or LLMImageEncoder(
+            max_side=MISTRAL_IMAGE_MAX_SIDE,
+            quality=MISTRAL_IMAGE_QUALITY,
+            max_bytes=MISTRAL_IMAGE_MAX_BYTES
+        )
+        self.resilience = resilience or LLMResilience(
+            breaker=CircuitBreaker(
+                window_seconds=MISTRAL_BREAKER_WINDOW_SECONDS,
+                min_calls=MISTRAL_BREAKER_MIN_CALLS,
+                failure_ratio=MISTRAL_BREAKER_FAILURE_RATIO,
+                open_seconds=MISTRAL_BREAKER_OPEN_SECONDS
+            ),
+            max_concurrency=MISTRAL_MAX_CONCURRENCY,
+            acquire_timeout=MISTRAL_CONCURRENCY_WAIT_SECONDS,
+            max_retries=MISTRAL_MAX_RETRIES,
+            backoff_base=MISTRAL_RETRY_BACKOFF_SECONDS,
+            backoff_max=MISTRAL_RETRY_BACKOFF_MAX_SECONDS
+        )
+        self.api_url = api_url or MISTRAL_API_URL
+        self._run_blocking = run_blocking or asyncio.to_thread
+        
+        # One pooled keep-alive client per event loop (httpx clients are loop-bound);
+        # sync callers share a background loop so their connections are reused too
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self._sync_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync_lock = threading.Lock()
         
         if not self.api_key:
             logger.warning("MISTRAL_API_KEY not set - Mistral validation will be disabled")
         else:
             logger.info(f"Initialized Mistral validator with model: {model}")
     
-    def validate_detections(
+    async def validate_detections_async(
         self,
         image: Image.Image,
         yolo_detections: List[Dict[str, Any]],
-        confidence_threshold: float = 0.3
+        confidence_threshold: float = 0.3,
+        source_bytes: Optional[bytes] = None
     ) -> List[Dict[str, Any]]:
         """
-        Validate and extend YOLO detections using Mistral AI.
+        Validate and extend YOLO detections using Mistral AI (non-blocking).
+        
+        Hashing, cache I/O and JPEG encoding run in a worker thread; the API
+        call goes through the validator's pooled keep-alive client.
         
         Args:
             image: PIL Image to analyze
             yolo_detections: List of YOLO detection dicts with 'name', 'confidence', 'source'
             confidence_threshold: Minimum confidence for new detections (0.0-1.0)
+            source_bytes: Original upload bytes; forwarded untouched when they are
+                a JPEG within the image encoder's limits
             
         Returns:
             List of validated/extended food items:
@@ -88,64 +191,152 @@ Return JSON only, no other text."""
             logger.info("No YOLO detections to validate")
             return []
         
-        try:
-            # Extract YOLO food names for prompt
-            yolo_food_names = [det['name'] for det in yolo_detections]
-            yolo_foods_str = ", ".join(yolo_food_names)
+        # Extract YOLO food names for prompt
+        yolo_food_names = [det['name'] for det in yolo_detections]
+        yolo_foods_str = ", ".join(yolo_food_names)
+        logger.info(f"Validating YOLO detections with Mistral: {yolo_foods_str}")
+        
+        return await self._request_foods_async(
+            image,
+            self.VALIDATION_PROMPT.format(yolo_foods=yolo_foods_str),
+            confidence_threshold,
+            "mistral-validation",
+            source_bytes,
+            yolo_foods=sorted(yolo_food_names)
+        )
+    
+    async def detect_foods_async(
+        self,
+        image: Image.Image,
+        confidence_threshold: float = 0.3,
+        source_bytes: Optional[bytes] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Open-ended food detection using Mistral AI (non-blocking).
+        
+        Unlike validate_detections_async the prompt does not depend on YOLO
+        output, so this can run concurrently with YOLO; DetectionFusion
+        reconciles the two lists afterwards.
+        
+        Args:
+            image: PIL Image to analyze
+            confidence_threshold: Minimum confidence for returned items (0.0-1.0)
+            source_bytes: Original upload bytes (see validate_detections_async)
             
-            logger.info(f"Validating YOLO detections with Mistral: {yolo_foods_str}")
+        Returns:
+            List of food items in the validate_detections_async format
+        """
+        if not self.api_key:
+            logger.warning("Mistral API key not available, skipping detection")
+            return []
+        
+        logger.info("Detecting foods with Mistral")
+        return await self._request_foods_async(
+            image,
+            self.DETECTION_PROMPT,
+            confidence_threshold,
+            "mistral-detection",
+            source_bytes
+        )
+    
+    async def _request_foods_async(
+        self,
+        image: Image.Image,
+        prompt: str,
+        confidence_threshold: float,
+        task: str,
+        source_bytes: Optional[bytes] = None,
+        **key_params
+    ) -> List[Dict[str, Any]]:
+        """Cached prompt round-trip shared by validation and detection; [] on failure."""
+        try:
+            # Identical image + prompt inputs were answered before: skip the API call
+            cache_key, cached_foods = await self._run_blocking(self._cache_lookup, image, task, **key_params)
+            if cached_foods is not None:
+                logger.info(f"Mistral response cache hit ({task})")
+                return self._filter_foods(cached_foods, confidence_threshold)
             
-            # Encode image to base64
-            image_base64 = self._encode_image(image)
+            # Provider degraded: skip encoding and the call entirely (YOLO-only at YOLO speed)
+            if self.resilience.should_skip():
+                logger.warning(f"Mistral circuit open, skipping {task}")
+                return []
             
-            # Build prompt
-            prompt = self.VALIDATION_PROMPT.format(yolo_foods=yolo_foods_str)
+            # Encode image to base64 (original JPEG bytes pass through when small enough)
+            image_base64 = await self._run_blocking(self._encode_image, image, source_bytes)
             
             # Call Mistral API
-            response = self._call_mistral_api(image_base64, prompt)
+            response = await self._call_mistral_api_async(image_base64, prompt)
             
-            # Parse response
-            validated_foods = self._parse_response(response, confidence_threshold)
+            # Parse response (only well-formed answers are cached)
+            foods = self._extract_foods(response)
+            if foods is None:
+                return []
+            if cache_key is not None:
+                await self._run_blocking(self.response_cache.set, cache_key, foods)
+            validated_foods = self._filter_foods(foods, confidence_threshold)
             
-            logger.info(f"Mistral validated {len(validated_foods)} food items")
+            logger.info(f"Mistral returned {len(validated_foods)} food items ({task})")
             return validated_foods
             
         except Exception as e:
-            logger.error(f"Mistral validation failed: {e}", exc_info=True)
+            logger.error(f"Mistral request failed ({task}): {e}", exc_info=True)
             return []
     
-    def _encode_image(self, image: Image.Image) -> str:
+    def validate_detections(
+        self,
+        image: Image.Image,
+        yolo_detections: List[Dict[str, Any]],
+        confidence_threshold: float = 0.3,
+        source_bytes: Optional[bytes] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Encode PIL Image to base64 string.
+        Blocking wrapper around validate_detections_async for sync callers.
         
-        Args:
-            image: PIL Image
-            
-        Returns:
-            Base64 encoded image string
+        Runs on the validator's background event loop, so repeated calls
+        reuse the same pooled connections.
         """
-        buffered = BytesIO()
-        image.save(buffered, format="JPEG")
-        img_bytes = buffered.getvalue()
-        return base64.b64encode(img_bytes).decode('utf-8')
+        return self._run_sync(
+            self.validate_detections_async(image, yolo_detections, confidence_threshold, source_bytes)
+        )
     
-    def _call_mistral_api(self, image_base64: str, prompt: str) -> dict:
+    def _cache_lookup(self, image: Image.Image, task: str, **params) -> Tuple[Optional[str], Optional[list]]:
+        """(cache key, cached foods) in one blocking step; (None, None) when caching is disabled."""
+        cache_key = self._cache_key(image, task, **params)
+        if cache_key is None:
+            return None, None
+        return cache_key, self.response_cache.get(cache_key)
+    
+    def _cache_key(self, image: Image.Image, task: str, **params) -> Optional[str]:
+        """Response cache key, or None when caching is disabled."""
+        if self.response_cache is None:
+            return None
+        digest = hashlib.sha256(image.tobytes())
+        digest.update(f"{image.mode}:{image.size}".encode())
+        return self.response_cache.make_key(
+            digest.hexdigest(),
+            task,
+            model=self.model,
+            prompt_version=self.PROMPT_VERSION,
+            **params
+        )
+    
+    def _encode_image(self, image: Image.Image, source_bytes: Optional[bytes] = None) -> str:
         """
-        Call Mistral API with image and prompt.
+        Encode PIL Image to a size-bounded base64 JPEG.
         
         Args:
-            image_base64: Base64 encoded image
-            prompt: Analysis prompt
+            image: PIL Image
+            source_bytes: Original upload bytes, forwarded as-is when they fit
             
         Returns:
-            API response dict
+            Base64 encoded image string
         """
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
+        encoded = self.image_encoder.encode(image, source_bytes)
+        return base64.b64encode(encoded.data).decode('utf-8')
+    
+    def _build_payload(self, image_base64: str, prompt: str) -> dict:
+        """Chat completion request body for one image + prompt."""
+        return {
             "model": self.model,
             "messages": [
                 {
@@ -165,18 +356,88 @@ Return JSON only, no other text."""
             "max_tokens": 1000,
             "temperature": 0.1  # Low temperature for consistent, factual responses
         }
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Pooled client for the running event loop (created on first use)."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            http2 = MISTRAL_HTTP2
+            if http2:
+                try:
+                    import h2  # noqa: F401  (httpx[http2] extra)
+                except ImportError:
+                    logger.warning("MISTRAL_HTTP2 set but the h2 package is missing; using HTTP/1.1")
+                    http2 = False
+            client = httpx.AsyncClient(
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                timeout=httpx.Timeout(MISTRAL_TIMEOUT_SECONDS, connect=min(10.0, MISTRAL_TIMEOUT_SECONDS)),
+                limits=httpx.Limits(
+                    max_connections=MISTRAL_MAX_CONNECTIONS,
+                    max_keepalive_connections=MISTRAL_MAX_CONNECTIONS,
+                    keepalive_expiry=60.0
+                ),
+                http2=http2
+            )
+            self._clients[loop] = client
+        return client
+    
+    async def _call_mistral_api_async(self, image_base64: str, prompt: str) -> dict:
+        """
+        Call Mistral API with image and prompt over the pooled client.
         
-        logger.debug(f"Calling Mistral API: {self.api_url}")
-        response = requests.post(
-            self.api_url,
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
+        Goes through the resilience layer: skipped while the circuit is open,
+        limited to MISTRAL_MAX_CONCURRENCY in flight, 429/5xx retried.
         
+        Args:
+            image_base64: Base64 encoded image
+            prompt: Analysis prompt
+            
+        Returns:
+            API response dict
+        """
+        return await self.resilience.call(self._post_chat_completion, image_base64, prompt)
+    
+    async def _post_chat_completion(self, image_base64: str, prompt: str) -> dict:
+        """Single chat completion request (no retries)."""
+        logger.debug(f"Calling Mistral API: {self.api_url}")
+        response = await self._get_client().post(self.api_url, json=self._build_payload(image_base64, prompt))
         response.raise_for_status()
         return response.json()
     
+    def _call_mistral_api(self, image_base64: str, prompt: str) -> dict:
+        """Blocking variant of _call_mistral_api_async."""
+        return self._run_sync(self._call_mistral_api_async(image_base64, prompt))
+    
+    def _run_sync(self, coro):
+        """Run a coroutine on the background loop and wait for its result."""
+        with self._sync_lock:
+            if self._sync_loop is None or self._sync_loop.is_closed():
+                self._sync_loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._sync_loop.run_forever,
+                    name="mistral-http",
+                    daemon=True
+                ).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._sync_loop).result()
+    
+    async def aclose(self):
+        """Close the client owned by the running loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+    
+    def close(self):
+        """Close the background loop's client and stop the loop."""
+        with self._sync_lock:
+            loop, self._sync_loop = self._sync_loop, None
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.aclose(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+    
     def _parse_response(
         self,
         api_response: dict,
@@ -192,6 +453,18 @@ Return JSON only, no other text."""
         Returns:
             List of validated food dicts
         """
+        foods = self._extract_foods(api_response)
+        if foods is None:
+            return []
+        return self._filter_foods(foods, confidence_threshold)
+    
+    def _extract_foods(self, api_response: dict) -> Optional[List[Dict[str, Any]]]:
+        """
+        Extract the validated_foods list from a raw API response.
+        
+        Returns:
+            All reported foods (unfiltered), or None if the response is malformed
+        """
         try:
             # Extract content from response
             content = api_response['choices'][0]['message']['content']
@@ -212,28 +485,28 @@ Return JSON only, no other text."""
             parsed = json.loads(content)
             
             # Extract validated foods
-            validated_foods = parsed.get('validated_foods', [])
-            
-            # Filter by confidence threshold
-            filtered_foods = [
-                food for food in validated_foods
-                if food.get('confidence', 0) >= confidence_threshold
-            ]
-            
-            logger.info(f"Parsed {len(filtered_foods)} foods meeting confidence threshold {confidence_threshold}")
-            return filtered_foods
+            return list(parsed.get('validated_foods', []))
             
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse Mistral response as JSON: {e}")
             logger.debug(f"Raw response: {api_response}")
-            return []
+            return None
         except (KeyError, IndexError) as e:
             logger.error(f"Unexpected API response structure: {e}")
             logger.debug(f"Raw response: {api_response}")
-            return []
+            return None
         except Exception as e:
             logger.error(f"Error parsing Mistral response: {e}")
-            return []
+            return None
+    
+    def _filter_foods(self, foods: List[Dict[str, Any]], confidence_threshold: float) -> List[Dict[str, Any]]:
+        """Keep foods meeting the confidence threshold."""
+        filtered_foods = [
+            food for food in foods
+            if food.get('confidence', 0) >= confidence_threshold
+        ]
+        logger.info(f"Parsed {len(filtered_foods)} foods meeting confidence threshold {confidence_threshold}")
+        return filtered_foods
 
 
 # Convenience function for standalone testing
@@ -0,0 +1,259 @@
+"""
+Native ONNX Runtime backend for the YOLO food detector.
+
+Runs best.onnx through an onnxruntime.InferenceSession directly instead of
+the Ultralytics predictor: letterboxing goes into preallocated per-thread
+buffers, and box decoding, NMS and rescaling are plain numpy. Pre/post-
+processing mirrors Ultralytics (LetterBox, non_max_suppression, scale_boxes)
+so detections match the default backend.
+"""
+import ast
+import logging
+import math
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+try:
+    import cv2
+except ImportError:  # PIL resize fallback
+    cv2 = None
+
+logger = logging.getLogger(__name__)
+
+PAD_VALUE = 114
+STRIDE = 32
+MAX_NMS = 30000   # candidates kept before NMS (Ultralytics default)
+MAX_DET = 300     # detections kept after NMS (Ultralytics default)
+MAX_WH = 7680     # per-class box offset for class-aware NMS
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+# (class_ids, confidences, xyxy boxes in original image pixels)
+RawDetections = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+class LetterboxBuffers(threading.local):
+    """Per-thread canvas and input tensors, reused across calls of the same shape."""
+
+    def __init__(self):
+        self.canvases: Dict[int, np.ndarray] = {}
+        self.blobs: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def canvas(self, size: int) -> np.ndarray:
+        canvas = self.canvases.get(size)
+        if canvas is None:
+            canvas = self.canvases[size] = np.empty((size, size, 3), dtype=np.uint8)
+        return canvas
+
+    def blob(self, batch: int, size: int) -> np.ndarray:
+        blob = self.blobs.get((batch, size))
+        if blob is None:
+            blob = self.blobs[(batch, size)] = np.empty((batch, 3, size, size), dtype=np.float32)
+        return blob
+
+
+def letterbox_into(image: np.ndarray, canvas: np.ndarray) -> Tuple[float, Tuple[int, int]]:
+    """
+    Resize an HWC uint8 image into a square canvas, padding with gray.
+
+    Returns:
+        (gain, (pad_left, pad_top)) needed to map boxes back
+    """
+    size = canvas.shape[0]
+    height, width = image.shape[:2]
+    gain = min(size / height, size / width)
+    new_w, new_h = int(round(width * gain)), int(round(height * gain))
+    dw, dh = (size - new_w) / 2, (size - new_h) / 2
+    left, top = int(round(dw - 0.1)), int(round(dh - 0.1))
+
+    if (new_w, new_h) != (width, height):
+        if cv2 is not None:
+            resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        else:
+            resized = np.asarray(Image.fromarray(image).resize((new_w, new_h), Image.BILINEAR))
+    else:
+        resized = image
+
+    canvas.fill(PAD_VALUE)
+    canvas[top:top + new_h, left:left + new_w] = resized
+    return gain, (left, top)
+
+
+def to_blob(canvas: np.ndarray, out: np.ndarray):
+    """HWC uint8 canvas -> CHW float32 in [0, 1], written into `out`.
+
+    Channels are reversed as Ultralytics does for ndarray input (it assumes
+    BGR); detect_foods has always passed RGB arrays, so this keeps parity.
+    """
+    np.multiply(canvas.transpose(2, 0, 1)[::-1], 1.0 / 255.0, out=out, casting="unsafe")
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Greedy NMS; returns kept indices in descending score order."""
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1).clip(0) * (y2 - y1).clip(0)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter = (
+            (np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest])).clip(0)
+            * (np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest])).clip(0)
+        )
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def decode_predictions(
+    prediction: np.ndarray,
+    confidence_threshold: float,
+    iou_threshold: float,
+    max_det: int = MAX_DET
+) -> RawDetections:
+    """
+    Decode one raw YOLOv8 output (4 + num_classes, anchors) into boxes.
+
+    Returns:
+        (class_ids, confidences, xyxy boxes) in letterboxed-input pixels
+    """
+    scores_all = prediction[4:]
+    class_ids = scores_all.argmax(axis=0)
+    scores = scores_all[class_ids, np.arange(scores_all.shape[1])]
+    mask = scores > confidence_threshold
+    if not mask.any():
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32), np.empty((0, 4), dtype=np.float32)
+
+    xywh = prediction[:4, mask].T
+    scores, class_ids = scores[mask], class_ids[mask]
+    boxes = np.empty_like(xywh)
+    boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+    boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+    if scores.size > MAX_NMS:
+        top = scores.argsort()[::-1][:MAX_NMS]
+        boxes, scores, class_ids = boxes[top], scores[top], class_ids[top]
+
+    # Offset boxes per class so NMS only suppresses within a class
+    keep = nms(boxes + (class_ids * MAX_WH)[:, None], scores, iou_threshold)[:max_det]
+    return class_ids[keep], scores[keep], boxes[keep]
+
+
+def scale_boxes(boxes: np.ndarray, gain: float, pad: Tuple[int, int], shape: Tuple[int, int]) -> np.ndarray:
+    """Map letterboxed xyxy boxes back to the original (height, width) image."""
+    boxes = boxes.copy()
+    boxes[:, [0, 2]] -= pad[0]
+    boxes[:, [1, 3]] -= pad[1]
+    boxes /= gain
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+    return boxes
+
+
+class OnnxYOLOSession:
+    """
+    YOLOv8 detection model on a bare onnxruntime.InferenceSession.
+    """
+
+    def __init__(
+        self,
+        model_path: Path,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0,
+        graph_optimization: str = "all",
+        providers: Optional[List[str]] = None
+    ):
+        """
+        Create the inference session.
+
+        Args:
+            model_path: Exported YOLO ONNX model
+            intra_op_threads: Threads within an operator (0 = onnxruntime default)
+            inter_op_threads: Threads across operators (0 = onnxruntime default)
+            graph_optimization: disable | basic | extended | all
+            providers: Execution providers (defaults to CPU)
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = max(0, intra_op_threads)
+        options.inter_op_num_threads = max(0, inter_op_threads)
+        level = GRAPH_OPTIMIZATION_LEVELS.get(graph_optimization.lower(), "ORT_ENABLE_ALL")
+        options.graph_optimization_level = getattr(ort.GraphOptimizationLevel, level)
+
+        self.session = ort.InferenceSession(
+            str(model_path),
+            sess_options=options,
+            providers=providers or ["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch_dim, _, height_dim, _ = model_input.shape
+        # Static exports fix the batch size and input resolution
+        self.static_batch = batch_dim if isinstance(batch_dim, int) else None
+        self.static_size = height_dim if isinstance(height_dim, int) else None
+        self.names = self._read_names()
+        self._buffers = LetterboxBuffers()
+
+        logger.info(
+            f"ONNX Runtime session ready (input {model_input.shape}, "
+            f"intra_op={intra_op_threads}, inter_op={inter_op_threads}, optimization={graph_optimization})"
+        )
+
+    def _read_names(self) -> Dict[int, str]:
+        """Class names embedded in Ultralytics export metadata, if present."""
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        try:
+            return {int(k): v for k, v in ast.literal_eval(metadata.get("names", "{}")).items()}
+        except (ValueError, SyntaxError, AttributeError):
+            return {}
+
+    @property
+    def supports_batching(self) -> bool:
+        return self.static_batch is None
+
+    def _input_size(self, imgsz: int) -> int:
+        if self.static_size is not None:
+            return self.static_size
+        return int(math.ceil(imgsz / STRIDE) * STRIDE)
+
+    def detect(
+        self,
+        images: List[np.ndarray],
+        confidence_threshold: float = 0.25,
+        iou_threshold: float = 0.45,
+        imgsz: int = 640
+    ) -> List[RawDetections]:
+        """
+        Run detection on one or more HWC uint8 images.
+
+        Returns:
+            (class_ids, confidences, xyxy boxes) per image, in input order
+        """
+        size = self._input_size(imgsz)
+        canvas = self._buffers.canvas(size)
+        blob = self._buffers.blob(len(images), size)
+
+        transforms = []
+        for i, image in enumerate(images):
+            transforms.append(letterbox_into(image, canvas))
+            to_blob(canvas, blob[i])
+
+        output = self.session.run(None, {self.input_name: blob})[0]
+
+        results = []
+        for i, (image, (gain, pad)) in enumerate(zip(images, transforms)):
+            class_ids, confidences, boxes = decode_predictions(output[i], confidence_threshold, iou_threshold)
+            results.append((class_ids, confidences, scale_boxes(boxes, gain, pad, image.shape[:2])))
+        return results
@@ -146,7 +146,11 @@ class ScanFoodResponse(BaseModel):
         default_factory=dict,
         description="Statistics about detection fusion (YOLO vs DeepSeek)"
     )
-    
+    partial: bool = Field(
+        False,
+        description="True when the LLM missed the scan deadline and only YOLO results were fused"
+    )
+
     class Config:
         json_schema_extra = {
             "example": {
@@ -1,18 +1,60 @@
 import logging
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Sequence
 from pathlib import Path
 import numpy as np
 from PIL import Image
-from ultralytics import YOLO
-import cv2
+
+from app.config import (
+    YOLO_BACKEND,
+    YOLO_ORT_INTRA_OP_THREADS,
+    YOLO_ORT_INTER_OP_THREADS,
+    YOLO_ORT_GRAPH_OPTIMIZATION,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def _to_numpy(values) -> np.ndarray:
+    """Torch tensor (any device) or array-like -> numpy array."""
+    if hasattr(values, "cpu"):
+        values = values.cpu().numpy()
+    return np.asarray(values)
+
+
+def build_class_name_table(class_names) -> np.ndarray:
+    """Lowercased class names indexed by class id (gaps filled with class_<id>)."""
+    items = dict(enumerate(class_names)) if isinstance(class_names, (list, tuple)) else dict(class_names or {})
+    size = max((int(k) for k in items), default=-1) + 1
+    table = np.array([f"class_{i}" for i in range(size)], dtype=object)
+    for class_id, name in items.items():
+        table[int(class_id)] = str(name).lower()
+    return table
+
+
+def lookup_class_names(table: np.ndarray, class_ids: np.ndarray) -> List[str]:
+    """Map an array of class ids to names with one fancy-index lookup."""
+    if class_ids.size == 0:
+        return []
+    if class_ids.min() >= 0 and class_ids.max() < len(table):
+        return table[class_ids].tolist()
+    return [table[i] if 0 <= i < len(table) else f"class_{i}" for i in class_ids.tolist()]
+
+
+def is_batch_shape_error(error: Exception) -> bool:
+    """
+    True for ONNX Runtime's rejection of a stacked input by a model exported
+    with a fixed batch dimension ("Got invalid dimensions for input: images
+    for the following indices index: 0 Got: 4 Expected: 1").
+    """
+    message = str(error).lower()
+    return "invalid dimensions" in message and "index: 0" in message
+
+
 class YOLOFoodDetector:    
     _instance_count = 0  # Safeguard: track instantiation count
     
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, backend: str = None):
         YOLOFoodDetector._instance_count += 1
         
         if YOLOFoodDetector._instance_count > 1:
@@ -27,6 +69,12 @@ class YOLOFoodDetector:
             model_path = base_path / "ml_models" / "yolo" / "best.onnx"
         
         self.model_path = Path(model_path)
+        # "ultralytics" (YOLO predictor) or "onnxruntime" (bare InferenceSession)
+        self.backend = (backend or YOLO_BACKEND).lower()
+        # Cleared if the exported model rejects stacked (N > 1) input tensors
+        self._batch_supported = True
+        # Ultralytics predictors are not thread-safe; serialize calls from executor threads
+        self._predict_lock = threading.Lock()
         
         if not self.model_path.exists():
             raise FileNotFoundError(f"YOLO model not found at: {self.model_path}")
@@ -34,14 +82,27 @@ class YOLOFoodDetector:
         logger.info(f"Loading YOLO model from: {self.model_path}")
         
         try:
-            # Load YOLO model (Ultralytics handles ONNX); explicitly set task to silence warnings
-            # ONNX session is cached internally by Ultralytics - no explicit session management needed
-            self.model = YOLO(str(self.model_path), task="detect")
-            logger.info("YOLO model loaded successfully (ONNX session cached)")
+            if self.backend == "onnxruntime":
+                from app.ml.onnx_backend import OnnxYOLOSession
+                self.model = OnnxYOLOSession(
+                    self.model_path,
+                    intra_op_threads=YOLO_ORT_INTRA_OP_THREADS,
+                    inter_op_threads=YOLO_ORT_INTER_OP_THREADS,
+                    graph_optimization=YOLO_ORT_GRAPH_OPTIMIZATION
+                )
+                self._batch_supported = self.model.supports_batching
+                logger.info("YOLO model loaded successfully (native ONNX Runtime session)")
+            else:
+                from ultralytics import YOLO
+                # Load YOLO model (Ultralytics handles ONNX); explicitly set task to silence warnings
+                # ONNX session is cached internally by Ultralytics - no explicit session management needed
+                self.model = YOLO(str(self.model_path), task="detect")
+                logger.info("YOLO model loaded successfully (ONNX session cached)")
             
             # Load class names if available
             yaml_path = self.model_path.parent / "chownet_data.yaml"
             self.class_names = self._load_class_names(yaml_path)
+            self._name_table = build_class_name_table(self.class_names)
             logger.info(f"YOLO class names loaded: {len(self.class_names)} classes")
             
         except Exception as e:
@@ -78,39 +139,28 @@ class YOLOFoodDetector:
         try:
             logger.info(f"Running YOLO detection with confidence >= {confidence_threshold}")
             
-            # Convert PIL to numpy array for YOLO
-            img_array = np.array(image)
-            
-            # Run inference - reuses cached ONNX session (no re-initialization)
-            results = self.model.predict(
-                img_array,
-                conf=confidence_threshold,
-                iou=iou_threshold,
-                imgsz=imgsz,
-                verbose=False
-            )
-            
-            # Parse results
-            detections = []
+            # Convert PIL to numpy array for YOLO (arrays, e.g. shared-memory views, pass through)
+            img_array = image if isinstance(image, np.ndarray) else np.array(image)
             
-            for result in results:
-                boxes = result.boxes
+            if self.backend == "onnxruntime":
+                # InferenceSession.run is thread-safe and buffers are per-thread: no lock
+                raw = self.model.detect([img_array], confidence_threshold, iou_threshold, imgsz)[0]
+                detections = self._to_detections(*raw)
+            else:
+                # Run inference - reuses cached ONNX session (no re-initialization)
+                with self._predict_lock:
+                    results = self.model.predict(
+                        img_array,
+                        conf=confidence_threshold,
+                        iou=iou_threshold,
+                        imgsz=imgsz,
+                        verbose=False
+                    )
                 
-                for box in boxes:
-                    # Extract detection info
-                    class_id = int(box.cls[0])
-                    confidence = float(box.conf[0])
-                    bbox = box.xyxy[0].cpu().numpy().tolist()
-                    
-                    # Get class name
-                    class_name = self.class_names.get(class_id, f"class_{class_id}")
-                    
-                    detections.append({
-                        "name": class_name.lower(),
-                        "confidence": confidence,
-                        "bbox": bbox,
-                        "source": "yolo"
-                    })
+                # Parse results
+                detections = []
+                for result in results:
+                    detections.extend(self._parse_result(result))
             
             logger.info(f"YOLO detected {len(detections)} food items: {[d['name'] for d in detections]}")
             return detections
@@ -119,6 +169,94 @@ class YOLOFoodDetector:
             logger.error(f"YOLO detection failed: {e}")
             return []
     
+    def detect_foods_batch(
+        self,
+        images: Sequence[Image.Image],
+        confidence_threshold: float = 0.25,
+        iou_threshold: float = 0.45,
+        imgsz: int = 320
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Detect foods in several images with a single batched inference.
+        
+        Ultralytics letterboxes every image to imgsz and stacks them into one
+        input tensor, so the ONNX session runs once for the whole batch.
+        Models exported with a fixed batch dimension of 1 cannot take a
+        stacked tensor; that error disables batching for the detector's
+        lifetime. Any other batched failure falls back to per-image calls
+        for this batch only.
+        
+        Args:
+            images: PIL images to analyze
+            confidence_threshold: Minimum detection confidence
+            iou_threshold: NMS IoU threshold
+            imgsz: Inference size
+            
+        Returns:
+            One detection list per input image, in input order, each with the
+            same dict shape as detect_foods()
+        """
+        if not images:
+            return []
+        if len(images) == 1 or not self._batch_supported:
+            return [
+                self.detect_foods(image, confidence_threshold, iou_threshold, imgsz)
+                for image in images
+            ]
+        
+        try:
+            logger.info(f"Running batched YOLO detection on {len(images)} images")
+            img_arrays = [image if isinstance(image, np.ndarray) else np.array(image) for image in images]
+            if self.backend == "onnxruntime":
+                raw = self.model.detect(img_arrays, confidence_threshold, iou_threshold, imgsz)
+                return [self._to_detections(*result) for result in raw]
+            with self._predict_lock:
+                results = self.model.predict(
+                    img_arrays,
+                    conf=confidence_threshold,
+                    iou=iou_threshold,
+                    imgsz=imgsz,
+                    verbose=False
+                )
+            # One Results object per input image, in order
+            return [self._parse_result(result) for result in results]
+            
+        except Exception as e:
+            if is_batch_shape_error(e):
+                logger.warning(f"YOLO model rejects batched input ({e}); using per-image inference from now on")
+                self._batch_supported = False
+            else:
+                logger.warning(f"Batched YOLO detection failed ({e}); falling back to per-image inference for this batch")
+            return [
+                self.detect_foods(image, confidence_threshold, iou_threshold, imgsz)
+                for image in images
+            ]
+    
+    def _parse_result(self, result) -> List[Dict[str, Any]]:
+        """Convert one Ultralytics Results object into detection dicts.
+        
+        Box tensors are converted to numpy once per result rather than once
+        per box, so crowded plates don't pay a tensor slice and device sync
+        for every detection.
+        """
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return []
+        
+        return self._to_detections(
+            _to_numpy(boxes.cls).astype(np.int64),
+            _to_numpy(boxes.conf),
+            _to_numpy(boxes.xyxy)
+        )
+    
+    def _to_detections(self, class_ids: np.ndarray, confidences: np.ndarray, boxes: np.ndarray) -> List[Dict[str, Any]]:
+        """Build detection dicts from per-result class, confidence and xyxy arrays."""
+        names = lookup_class_names(self._name_table, class_ids)
+        return [
+            {"name": name, "confidence": confidence, "bbox": bbox, "source": "yolo"}
+            for name, confidence, bbox in zip(names, confidences.tolist(), boxes.tolist())
+        ]
+    
     def get_class_names(self) -> Dict[int, str]:
         return self.class_names.copy()
     
@@ -1,20 +1,27 @@
-from transformers import AutoFeatureExtractor, AutoModelForImageClassification, pipeline
 from PIL import Image
 from pathlib import Path
+import threading
 
 # Load HF model once
 MODEL_NAME = "nateraw/food"  # Hugging Face model
 _model = None
 _pipeline = None
+# HF pipelines are not thread-safe; classify_food may be called from executor threads
+_pipeline_lock = threading.Lock()
 
 def get_pipeline():
     global _pipeline
     if _pipeline is None:
-        _pipeline = pipeline("image-classification", model=MODEL_NAME, top_k=5)  # top 5 predictions
+        with _pipeline_lock:
+            if _pipeline is None:
+                # Imported on first use so the API starts without transformers/torch
+                from transformers import pipeline
+                _pipeline = pipeline("image-classification", model=MODEL_NAME, top_k=5)  # top 5 predictions
     return _pipeline
 
 def classify_food(image: Image.Image):
     pipe = get_pipeline()
-    results = pipe(image)
+    with _pipeline_lock:
+        results = pipe(image)
     # results = [{"label": ..., "score": ...}, ...]
     return results
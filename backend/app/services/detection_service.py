@@ -0,0 +1,187 @@
+"""
+Detection Service
+Cross-request dynamic micro-batching in front of the YOLO detector.
+
+Concurrent scan requests each await detect(); requests that arrive within a
+short window (or until the batch is full) are run as one
+detect_foods_batch() call on a dedicated inference thread, and every caller
+gets back its own detections.
+
+Admission is bounded: once max_queue_depth requests are waiting or in
+inference, detect() raises ExecutorSaturatedError (served as 503 +
+Retry-After). The detector factory runs on the inference thread too, so a
+model that still has to load never blocks the event loop.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from app.services.inference_executor import ExecutorSaturatedError
+
+logger = logging.getLogger(__name__)
+
+# (confidence_threshold, iou_threshold, imgsz) - only identical params share a batch
+BatchKey = Tuple[float, float, int]
+
+
+class DetectionMicroBatcher:
+    """
+    Collects detection requests into batches for one batched inference.
+    """
+
+    def __init__(
+        self,
+        detector_factory: Callable[[], Any],
+        window_ms: float = 10.0,
+        max_batch_size: int = 8,
+        executor: Optional[Executor] = None,
+        max_queue_depth: int = 64,
+        retry_after: int = 1,
+        run_blocking: Optional[Callable[..., Awaitable[Any]]] = None
+    ):
+        """
+        Initialize the micro-batcher.
+
+        Args:
+            detector_factory: Returns the detector (must provide detect_foods_batch)
+            window_ms: Maximum time the first request in a batch waits for company
+            max_batch_size: Flush immediately once this many requests are queued
+            executor: Where inference runs (defaults to a single dedicated thread,
+                since the detector is not safe for concurrent predict calls)
+            max_queue_depth: Requests waiting or in inference before detect() rejects
+            retry_after: Seconds suggested to rejected clients
+            run_blocking: Awaitable runner for each batch (e.g. the app's shared
+                BoundedExecutor.run, so batches count toward its admission limit
+                and statistics); replaces executor when given
+        """
+        self.detector_factory = detector_factory
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="yolo-batch")
+        self.max_queue_depth = max(1, max_queue_depth)
+        self.retry_after = retry_after
+        self._run_blocking = run_blocking or self._run_in_executor
+
+        self._pending: Dict[BatchKey, List[Tuple[Image.Image, asyncio.Future, float]]] = {}
+        self._timers: Dict[BatchKey, asyncio.TimerHandle] = {}
+        self._in_flight = 0
+        self._tasks: set = set()
+
+        # Statistics
+        self._batch_sizes: Counter = Counter()
+        self._requests_total = 0
+        self._rejected_total = 0
+        self._batches_total = 0
+        self._batched_requests = 0
+        self._max_queue_depth = 0
+        self._wait_seconds_total = 0.0
+
+    async def detect(
+        self,
+        image: Image.Image,
+        confidence_threshold: float = 0.25,
+        iou_threshold: float = 0.45,
+        imgsz: int = 320
+    ) -> List[Dict[str, Any]]:
+        """
+        Queue an image for batched detection and wait for its results.
+
+        Returns:
+            Detection dicts for this image (same shape as detect_foods())
+
+        Raises:
+            ExecutorSaturatedError: If max_queue_depth requests are already queued
+        """
+        if self.queue_depth >= self.max_queue_depth:
+            self._rejected_total += 1
+            logger.warning(f"Detection batcher saturated ({self.queue_depth} requests queued); rejecting work")
+            raise ExecutorSaturatedError(self.retry_after)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (confidence_threshold, iou_threshold, imgsz)
+
+        batch = self._pending.setdefault(key, [])
+        batch.append((image, future, time.perf_counter()))
+        self._requests_total += 1
+        self._max_queue_depth = max(self._max_queue_depth, self.queue_depth)
+
+        if len(batch) >= self.max_batch_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+
+        return await future
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting for a batch plus requests currently in inference."""
+        return sum(len(batch) for batch in self._pending.values()) + self._in_flight
+
+    def _flush(self, key: BatchKey):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(key, batch))
+            # Hold a reference until the batch finishes
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, key: BatchKey, batch: List[Tuple[Image.Image, asyncio.Future, float]]):
+        confidence_threshold, iou_threshold, imgsz = key
+        images = [image for image, _, _ in batch]
+
+        now = time.perf_counter()
+        self._wait_seconds_total += sum(now - queued_at for _, _, queued_at in batch)
+        self._batch_sizes[len(batch)] += 1
+        self._batches_total += 1
+        self._batched_requests += len(batch)
+        self._in_flight += len(batch)
+
+        try:
+            results = await self._run_blocking(
+                lambda: self.detector_factory().detect_foods_batch(
+                    images,
+                    confidence_threshold=confidence_threshold,
+                    iou_threshold=iou_threshold,
+                    imgsz=imgsz
+                )
+            )
+            if len(results) != len(batch):
+                raise RuntimeError(f"Detector returned {len(results)} results for {len(batch)} images")
+            logger.debug(f"Micro-batch of {len(batch)} images completed")
+            for (_, future, _), detections in zip(batch, results):
+                if not future.done():
+                    future.set_result(detections)
+        except Exception as e:
+            logger.error(f"Batched detection failed for {len(batch)} requests: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._in_flight -= len(batch)
+
+    async def _run_in_executor(self, func: Callable[[], Any]) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Queue depth and batch-size histogram for monitoring."""
+        return {
+            "window_ms": round(self.window * 1000, 3),
+            "max_batch_size": self.max_batch_size,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self._max_queue_depth,
+            "max_queue_depth_limit": self.max_queue_depth,
+            "requests_total": self._requests_total,
+            "rejected_total": self._rejected_total,
+            "batches_total": self._batches_total,
+            "average_batch_size": round(self._batched_requests / self._batches_total, 3) if self._batches_total else 0,
+            "average_wait_ms": round(self._wait_seconds_total * 1000 / self._batched_requests, 3) if self._batched_requests else 0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self._batch_sizes.items())},
+        }
@@ -0,0 +1,85 @@
+"""
+Image Utilities
+Decoding helpers for uploaded food photos.
+
+Detection runs at imgsz=640, so a 12 MP phone photo never needs to be
+decoded at full resolution. JPEGs are decoded with DCT scaling (PIL draft
+mode) straight to the smallest 1/2, 1/4 or 1/8 scale that still covers the
+inference size; other formats are box-reduced after decode. The original
+dimensions are kept so detection bboxes can be mapped back.
+"""
+import logging
+from io import BytesIO
+from typing import Any, BinaryIO, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class DecodedImage(NamedTuple):
+    image: Image.Image
+    # (width, height) of the encoded image before any reduction
+    original_size: Tuple[int, int]
+
+    @property
+    def scale(self) -> Tuple[float, float]:
+        """(x, y) factors mapping decoded pixel coordinates to the original image."""
+        width, height = self.image.size
+        return self.original_size[0] / width, self.original_size[1] / height
+
+
+def decode_for_inference(
+    source: Union[bytes, BinaryIO],
+    target_size: Optional[int] = 640
+) -> DecodedImage:
+    """
+    Decode an upload to RGB, no larger than needed for inference.
+
+    Args:
+        source: Encoded image bytes or a readable binary file object
+        target_size: Both decoded sides stay >= this (None decodes at full size)
+
+    Returns:
+        DecodedImage with the RGB image and the original dimensions
+    """
+    image = Image.open(BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+    original_size = image.size
+
+    if target_size and image.format == "JPEG":
+        # Picks the largest DCT scale keeping both sides >= target_size
+        image.draft("RGB", (target_size, target_size))
+
+    # Decode now (PIL is lazy) so pixel work happens on the caller's thread
+    image.load()
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    if target_size:
+        factor = min(image.width // target_size, image.height // target_size)
+        if factor >= 2:
+            image = image.reduce(factor)
+
+    if image.size != original_size:
+        logger.debug(f"Reduced decode {original_size} -> {image.size}")
+    return DecodedImage(image, original_size)
+
+
+def size_scale(from_size: Tuple[int, int], to_size: Tuple[int, int]) -> Tuple[float, float]:
+    """(x, y) factors mapping coordinates in a from_size image onto a to_size image."""
+    return to_size[0] / from_size[0], to_size[1] / from_size[1]
+
+
+def rescale_detections(detections: List[Dict[str, Any]], scale: Tuple[float, float]) -> List[Dict[str, Any]]:
+    """Map detection bboxes from decoded to original image coordinates."""
+    sx, sy = scale
+    if sx == 1.0 and sy == 1.0:
+        return detections
+    rescaled = []
+    for det in detections:
+        bbox = det.get("bbox")
+        if bbox:
+            x1, y1, x2, y2 = bbox
+            det = {**det, "bbox": [x1 * sx, y1 * sy, x2 * sx, y2 * sy]}
+        rescaled.append(det)
+    return rescaled
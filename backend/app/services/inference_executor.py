@@ -0,0 +1,120 @@
+"""
+Inference Executor
+Bounded thread pool that keeps blocking image, model and HTTP work off the
+event loop.
+
+Admission is bounded: once every worker is busy and the wait queue is full,
+new work is rejected immediately with ExecutorSaturatedError (served as
+503 + Retry-After) instead of piling up behind slow requests.
+"""
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when the executor's workers and wait queue are all occupied."""
+
+    def __init__(self, retry_after: int = 1):
+        super().__init__("Server is busy processing other images; please retry shortly")
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a bounded wait queue and utilization statistics.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_queue: int = 32,
+        retry_after: int = 1,
+        name: str = "inference"
+    ):
+        """
+        Initialize the executor.
+
+        Args:
+            max_workers: Threads running blocking stages
+            max_queue: Tasks allowed to wait for a free thread before rejecting
+            retry_after: Seconds suggested to rejected clients
+            name: Thread name prefix
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+        self._completed = 0
+        self._rejected = 0
+        self._failed = 0
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking callable on the pool and await its result.
+
+        Raises:
+            ExecutorSaturatedError: If no worker or queue slot is available
+        """
+        with self._lock:
+            if self._active + self._queued >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                logger.warning(
+                    f"Executor saturated ({self._active} active, {self._queued} queued); rejecting work"
+                )
+                raise ExecutorSaturatedError(self.retry_after)
+            self._queued += 1
+
+        future = self._pool.submit(functools.partial(self._execute, func, *args, **kwargs))
+        future.add_done_callback(self._release_if_cancelled)
+        # Cancelling the awaiting request cancels a job that has not started yet
+        return await asyncio.wrap_future(future)
+
+    def _release_if_cancelled(self, future: Future):
+        """A job cancelled before it started never reaches _execute; give back its queue slot."""
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def _execute(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+        return result
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Current load and lifetime counters."""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queued": self._queued,
+                "utilization": round(self._active / self.max_workers, 3),
+                "queue_utilization": round(self._queued / self.max_queue, 3) if self.max_queue else 0,
+                "completed_total": self._completed,
+                "failed_total": self._failed,
+                "rejected_total": self._rejected,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
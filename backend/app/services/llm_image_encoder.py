@@ -0,0 +1,136 @@
+"""
+LLM Image Encoder
+Size-bounded JPEG payloads for the vision LLM.
+
+Upload size dominates LLM latency on our egress, so images are capped at a
+maximum side length and a byte budget before being base64'd into the
+request. An original upload that is already a JPEG within both limits is
+forwarded byte-for-byte with no re-encode; everything else is downscaled
+and re-encoded, stepping quality (then size) down until it fits.
+"""
+import logging
+import threading
+import time
+from io import BytesIO
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+JPEG_SOI = b"\xff\xd8\xff"
+# Lowest quality tried before shrinking the image further
+MIN_QUALITY = 40
+QUALITY_STEP = 15
+SHRINK_FACTOR = 0.75
+
+
+class EncodedImage(NamedTuple):
+    data: bytes
+    width: int
+    height: int
+    quality: Optional[int]  # None when the original bytes were forwarded
+    passthrough: bool
+    encode_ms: float
+
+
+class LLMImageEncoder:
+    """
+    JPEG encoder bounded by side length and byte size, with per-call accounting.
+    """
+
+    def __init__(self, max_side: int = 1024, quality: int = 85, max_bytes: int = 1_000_000):
+        """
+        Args:
+            max_side: Longest side sent to the LLM, in pixels
+            quality: Initial JPEG quality for re-encodes
+            max_bytes: Encoded size budget (before base64)
+        """
+        self.max_side = max(32, max_side)
+        self.quality = min(95, max(MIN_QUALITY, quality))
+        self.max_bytes = max(1, max_bytes)
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._passthrough = 0
+        self._over_budget = 0
+        self._bytes_total = 0
+        self._encode_ms_total = 0.0
+
+    def passthrough_size(self, original: Optional[bytes]) -> Optional[Tuple[int, int]]:
+        """(width, height) when `original` is an RGB/grayscale JPEG within both limits, else None."""
+        if not original or len(original) > self.max_bytes or not original.startswith(JPEG_SOI):
+            return None
+        try:
+            with Image.open(BytesIO(original)) as probe:  # header only
+                if probe.format == "JPEG" and probe.mode in ("RGB", "L") and max(probe.size) <= self.max_side:
+                    return probe.size
+        except Exception:
+            pass
+        return None
+
+    def encode(self, image: Image.Image, original: Optional[bytes] = None) -> EncodedImage:
+        """
+        Bounded JPEG for `image`, or `original` untouched when it already fits.
+
+        Args:
+            image: Decoded RGB image (used when the original can't be forwarded)
+            original: Encoded upload bytes, if available
+        """
+        start = time.perf_counter()
+        size = self.passthrough_size(original)
+        if size is not None:
+            result = EncodedImage(original, size[0], size[1], None, True, (time.perf_counter() - start) * 1000)
+        else:
+            result = self._reencode(image, start)
+        self._record(result)
+        logger.info(
+            f"LLM image payload: {len(result.data)} bytes {result.width}x{result.height} "
+            f"({'passthrough' if result.passthrough else f'q={result.quality}'}, {result.encode_ms:.1f} ms)"
+        )
+        return result
+
+    def _reencode(self, image: Image.Image, start: float) -> EncodedImage:
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        if max(image.size) > self.max_side:
+            image = image.copy()
+            image.thumbnail((self.max_side, self.max_side), Image.BILINEAR)
+
+        quality = self.quality
+        while True:
+            buffered = BytesIO()
+            image.save(buffered, format="JPEG", quality=quality)
+            data = buffered.getvalue()
+            if len(data) <= self.max_bytes or max(image.size) <= 64:
+                break
+            if quality > MIN_QUALITY:
+                quality = max(MIN_QUALITY, quality - QUALITY_STEP)
+            else:
+                image = image.resize(
+                    (max(1, int(image.width * SHRINK_FACTOR)), max(1, int(image.height * SHRINK_FACTOR))),
+                    Image.BILINEAR
+                )
+        return EncodedImage(data, image.width, image.height, quality, False, (time.perf_counter() - start) * 1000)
+
+    def _record(self, result: EncodedImage):
+        with self._lock:
+            self._calls += 1
+            self._passthrough += result.passthrough
+            self._over_budget += len(result.data) > self.max_bytes
+            self._bytes_total += len(result.data)
+            self._encode_ms_total += result.encode_ms
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self._calls
+            return {
+                "max_side": self.max_side,
+                "quality": self.quality,
+                "max_bytes": self.max_bytes,
+                "calls": calls,
+                "passthrough": self._passthrough,
+                "over_budget": self._over_budget,
+                "bytes_total": self._bytes_total,
+                "avg_bytes": round(self._bytes_total / calls) if calls else 0,
+                "avg_encode_ms": round(self._encode_ms_total / calls, 2) if calls else 0,
+            }
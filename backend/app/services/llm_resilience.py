@@ -0,0 +1,292 @@
+"""
+LLM Resilience
+Circuit breaker, concurrency limit and retry policy for vision-LLM calls.
+
+- CircuitBreaker: rolling-window failure ratio; while open, calls are
+  skipped outright so scans fall back to YOLO-only at YOLO speed. After a
+  cool-down one trial call (half-open) decides whether to close again.
+- LLMResilience: caps concurrent calls with a bounded wait (bursts queue
+  briefly, then shed instead of tripping provider rate limits) and retries
+  429/5xx responses with full-jitter exponential backoff.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+
+class ConcurrencyLimitError(RuntimeError):
+    """Raised when no LLM call slot frees up within the allowed wait."""
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Errors that say the provider is unhealthy (count against the breaker)."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+class CircuitBreaker:
+    """
+    Failure-ratio breaker over a rolling time window (thread-safe).
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 60.0,
+        min_calls: int = 5,
+        failure_ratio: float = 0.5,
+        open_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            window_seconds: Outcomes older than this are forgotten
+            min_calls: Outcomes needed in the window before the breaker can open
+            failure_ratio: Failure share that opens the breaker
+            open_seconds: Cool-down before a half-open trial call
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.window_seconds = window_seconds
+        self.min_calls = max(1, min_calls)
+        self.failure_ratio = failure_ratio
+        self.open_seconds = open_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._opened_total = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may proceed now (claims the trial slot when half-open)."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release_trial(self):
+        """Give back a half-open trial slot whose call never reached the provider."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self._current_state() == HALF_OPEN:
+                logger.info("LLM circuit closed after successful trial call")
+                self._state = CLOSED
+                self._outcomes.clear()
+            self._record(True)
+
+    def record_failure(self):
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                self._open("trial call failed")
+                return
+            self._record(False)
+            if state == CLOSED and len(self._outcomes) >= self.min_calls:
+                failures = sum(1 for _, ok in self._outcomes if not ok)
+                if failures / len(self._outcomes) >= self.failure_ratio:
+                    self._open(f"{failures}/{len(self._outcomes)} calls failed in {self.window_seconds:.0f}s")
+
+    def _record(self, ok: bool):
+        now = self._clock()
+        self._outcomes.append((now, ok))
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def _open(self, reason: str):
+        logger.warning(f"LLM circuit opened ({reason}); skipping calls for {self.open_seconds:.0f}s")
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._trial_in_flight = False
+        self._opened_total += 1
+        self._outcomes.clear()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                "state": state,
+                "window_calls": len(self._outcomes),
+                "window_failures": failures,
+                "opened_total": self._opened_total,
+            }
+
+
+class LLMResilience:
+    """
+    Breaker + concurrency limit + jittered retry around one provider call.
+    """
+
+    def __init__(
+        self,
+        breaker: Optional[CircuitBreaker] = None,
+        max_concurrency: int = 8,
+        acquire_timeout: float = 2.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 4.0
+    ):
+        """
+        Args:
+            breaker: Circuit breaker (a default one is created when omitted)
+            max_concurrency: Concurrent provider calls per event loop
+            acquire_timeout: Seconds to wait for a call slot before shedding
+            max_retries: Extra attempts for 429/5xx responses
+            backoff_base: First backoff ceiling in seconds (doubles per attempt)
+            backoff_max: Largest backoff ceiling (and cap on Retry-After)
+        """
+        self.breaker = breaker or CircuitBreaker()
+        self.max_concurrency = max(1, max_concurrency)
+        self.acquire_timeout = acquire_timeout
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # asyncio.Semaphore is bound to one loop; uvicorn runs one per worker
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._calls = 0
+        self._retries = 0
+        self._rejected_open = 0
+        self._rejected_busy = 0
+        self._failures = 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    def should_skip(self) -> bool:
+        """
+        Cheap pre-check before preparing a call: True (and counted as a
+        rejection) while the breaker is open. Does not claim a half-open trial.
+        """
+        if self.breaker.state != OPEN:
+            return False
+        self._bump("_rejected_open")
+        return True
+
+    def _bump(self, counter: str, amount: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Run `func(*args, **kwargs)` under the breaker, limit and retry policy.
+
+        Raises:
+            CircuitOpenError: Breaker open (or a half-open trial already running)
+            ConcurrencyLimitError: No call slot within acquire_timeout
+        """
+        if not self.breaker.allow():
+            self._bump("_rejected_open")
+            raise CircuitOpenError("LLM circuit is open")
+
+        semaphore = self._semaphore()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self._bump("_rejected_busy")
+            # Shedding says nothing about provider health
+            self.breaker.release_trial()
+            raise ConcurrencyLimitError(
+                f"{self.max_concurrency} LLM calls in flight; no slot within {self.acquire_timeout:.1f}s"
+            )
+
+        self._bump("_in_flight")
+        self._bump("_calls")
+        settled = False
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    retryable = isinstance(e, httpx.HTTPStatusError) and e.response.status_code in RETRYABLE_STATUS
+                    if retryable and attempt < self.max_retries:
+                        delay = self._backoff(attempt, e.response)
+                        self._bump("_retries")
+                        logger.warning(
+                            f"LLM call returned {e.response.status_code}; retry {attempt + 1}/{self.max_retries} in {delay:.2f}s"
+                        )
+                        await asyncio.sleep(delay)
+                        continue
+                    settled = True
+                    if is_provider_failure(e):
+                        self._bump("_failures")
+                        self.breaker.record_failure()
+                    else:
+                        # e.g. 400/401: the provider answered, so it is reachable
+                        self.breaker.record_success()
+                    raise
+                settled = True
+                self.breaker.record_success()
+                return result
+        finally:
+            if not settled:  # cancelled mid-call
+                self.breaker.release_trial()
+            self._bump("_in_flight", -1)
+            semaphore.release()
+
+    def _backoff(self, attempt: int, response: httpx.Response) -> float:
+        """Full-jitter exponential backoff, honoring a short Retry-After."""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(self.backoff_max, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "calls": self._calls,
+                "retries": self._retries,
+                "failures": self._failures,
+                "rejected_open": self._rejected_open,
+                "rejected_busy": self._rejected_busy,
+            }
+        stats["breaker"] = self.breaker.get_statistics()
+        return stats
@@ -0,0 +1,114 @@
+"""
+Perceptual Hash Index
+Near-duplicate lookup for recently scanned photos.
+
+The mobile app often re-encodes, resizes or slightly crops a photo before
+re-uploading it, which defeats the exact-bytes scan cache. A 64-bit dHash
+(gradient signs on a 9x8 grayscale thumbnail) survives those edits, and a
+small Hamming-distance index over recent scans lets a close match reuse the
+stored detections.
+
+Flat or low-contrast photos (a blank plate, a dark shot) have almost no
+gradient bits set, or almost all of them, so unrelated ones hash alike;
+such hashes are neither looked up nor stored.
+"""
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+_BIT_WEIGHTS = (1 << np.arange(HASH_SIZE * HASH_SIZE, dtype=np.uint64)[::-1]).astype(np.uint64)
+
+
+def dhash(image: Image.Image) -> int:
+    """64-bit difference hash: one bit per horizontally adjacent brightness gradient."""
+    thumb = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BOX)
+    pixels = np.asarray(thumb, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int(np.bitwise_or.reduce(_BIT_WEIGHTS[bits])) if bits.any() else 0
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(values)
+    return np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class PerceptualHashIndex:
+    """
+    Fixed-size ring of (hash, payload) pairs searched by Hamming distance.
+    """
+
+    def __init__(self, max_entries: int = 2048, max_distance: int = 6, min_hash_bits: int = 8):
+        """
+        Args:
+            max_entries: Recent scans kept (oldest are overwritten)
+            max_distance: Largest Hamming distance (of 64 bits) treated as the same photo
+            min_hash_bits: Hashes with fewer set (or fewer clear) bits than this
+                are too featureless to identify a photo and are skipped
+        """
+        self.max_entries = max(1, max_entries)
+        self.max_distance = max_distance
+        self.min_hash_bits = min_hash_bits
+        self._hashes = np.zeros(self.max_entries, dtype=np.uint64)
+        self._payloads = [None] * self.max_entries
+        self._count = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+        self._lookups = 0
+        self._reuses = 0
+        self._skipped = 0
+
+    def is_distinctive(self, image_hash: int) -> bool:
+        """True if the hash has enough set and clear bits to identify a photo."""
+        set_bits = bin(image_hash).count("1")
+        return self.min_hash_bits <= set_bits <= HASH_SIZE * HASH_SIZE - self.min_hash_bits
+
+    def find(self, image_hash: int) -> Optional[Tuple[int, Any]]:
+        """
+        Closest stored scan within max_distance.
+
+        Returns:
+            (distance, payload) or None (also for featureless hashes)
+        """
+        with self._lock:
+            self._lookups += 1
+            if not self.is_distinctive(image_hash):
+                self._skipped += 1
+                return None
+            if not self._count:
+                return None
+            distances = _popcount(self._hashes[:self._count] ^ np.uint64(image_hash))
+            best = int(distances.argmin())
+            distance = int(distances[best])
+            if distance > self.max_distance:
+                return None
+            self._reuses += 1
+            return distance, self._payloads[best]
+
+    def add(self, image_hash: int, payload: Any):
+        if not self.is_distinctive(image_hash):
+            return
+        with self._lock:
+            self._hashes[self._next] = image_hash
+            self._payloads[self._next] = payload
+            self._next = (self._next + 1) % self.max_entries
+            self._count = min(self._count + 1, self.max_entries)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": self._count,
+                "max_entries": self.max_entries,
+                "max_distance": self.max_distance,
+                "lookups": self._lookups,
+                "reuses": self._reuses,
+                "skipped_featureless": self._skipped,
+                "reuse_rate": round(self._reuses / self._lookups, 3) if self._lookups else 0,
+            }
@@ -0,0 +1,474 @@
+"""
+Detection Process Pool
+Runs N YOLO detector processes, each with its own ONNX session, so one
+uvicorn worker can use every core despite the GIL and Ultralytics' Python
+pre/post-processing.
+
+Decoded images reach workers through multiprocessing.shared_memory buffers
+(only the segment name and shape are pickled); detections come back as small
+(name, confidence, x1, y1, x2, y2) tuples over a per-worker pipe, so a
+worker killed mid-send (OOM killer, native crash) can only break its own
+channel, never a lock shared with the others. A monitor thread restarts
+workers that die and fails the jobs they were holding. Workers that die before
+becoming ready (bad model path, missing runtime) are restarted with
+exponential backoff; after max_init_failures in a row the slot is given up
+on, and once every slot is given up on the pool reports failed. Admission is
+bounded: past max_pending in-flight jobs submit raises ExecutorSaturatedError
+rather than allocating another shared-memory segment.
+"""
+import itertools
+import logging
+import multiprocessing as mp
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.services.inference_executor import ExecutorSaturatedError
+
+logger = logging.getLogger(__name__)
+
+# (name, confidence, x1, y1, x2, y2)
+PackedDetection = Tuple[str, float, float, float, float, float]
+
+
+class WorkerCrashedError(RuntimeError):
+    """Raised for jobs held by a detector process that died."""
+
+
+class DetectionPoolUnavailableError(RuntimeError):
+    """Raised by submit when no detector process is running or starting."""
+
+
+def _default_detector_factory(model_path: Optional[str] = None):
+    from app.ml.yolo import YOLOFoodDetector
+    return YOLOFoodDetector(model_path)
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach to a parent-owned segment; the parent alone unlinks it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # Spawned workers share the parent's resource tracker, so re-registering is harmless
+        return shared_memory.SharedMemory(name=name)
+
+
+def _pack(detections: List[Dict[str, Any]]) -> List[PackedDetection]:
+    packed = []
+    for det in detections:
+        x1, y1, x2, y2 = det.get("bbox") or (0.0, 0.0, 0.0, 0.0)
+        packed.append((det["name"], float(det["confidence"]), float(x1), float(y1), float(x2), float(y2)))
+    return packed
+
+
+def _unpack(packed: List[PackedDetection]) -> List[Dict[str, Any]]:
+    return [
+        {"name": name, "confidence": confidence, "bbox": [x1, y1, x2, y2], "source": "yolo"}
+        for name, confidence, x1, y1, x2, y2 in packed
+    ]
+
+
+def _worker_main(
+    worker_id: int,
+    detector_factory: Callable[..., Any],
+    factory_args: tuple,
+    requests: mp.Queue,
+    results: Connection
+):
+    """Detector process loop: attach image buffer, run inference, send tuples back."""
+    try:
+        detector = detector_factory(*factory_args)
+    except Exception as e:
+        results.send(("init_error", worker_id, None, repr(e)))
+        return
+    results.send(("ready", worker_id, None, None))
+
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+        job_id, shm_name, shape, confidence_threshold, iou_threshold, imgsz = message
+        try:
+            shm = _attach_shared_memory(shm_name)
+            try:
+                image = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+                detections = detector.detect_foods(
+                    image,
+                    confidence_threshold=confidence_threshold,
+                    iou_threshold=iou_threshold,
+                    imgsz=imgsz
+                )
+                del image
+            finally:
+                shm.close()
+            results.send(("result", worker_id, job_id, _pack(detections)))
+        except Exception as e:
+            results.send(("error", worker_id, job_id, repr(e)))
+
+
+class _WorkerSlot:
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id
+        self.process: Optional[mp.Process] = None
+        self.requests: Optional[mp.Queue] = None
+        # Parent end of this worker's result pipe (replaced on restart)
+        self.results: Optional[Connection] = None
+        self.jobs: Dict[int, Future] = {}
+        self.ready = False
+        # Consecutive deaths before "ready"
+        self.init_failures = 0
+        # Monotonic time of the pending backoff restart (None while running)
+        self.restart_at: Optional[float] = None
+        # Given up on after max_init_failures
+        self.failed = False
+
+
+class DetectionProcessPool:
+    """
+    Pool of detector processes exposing the YOLOFoodDetector detection API.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = 2,
+        model_path: Optional[str] = None,
+        job_timeout: float = 60.0,
+        detector_factory: Callable[..., Any] = _default_detector_factory,
+        start_method: str = "spawn",
+        restart_backoff: float = 0.5,
+        restart_backoff_max: float = 30.0,
+        max_init_failures: int = 5,
+        max_pending: int = 32,
+        retry_after: int = 1
+    ):
+        """
+        Start the pool.
+
+        Args:
+            num_workers: Detector processes (one ONNX session each)
+            model_path: Passed to the detector factory in each worker
+            job_timeout: Seconds a blocking detect call waits for its result
+            detector_factory: Picklable callable building a detector in the worker
+            start_method: multiprocessing start method ("spawn" avoids forking
+                threads and ONNX state)
+            restart_backoff: Delay before restarting a worker that died during
+                init, doubled per consecutive init failure
+            restart_backoff_max: Upper bound on that delay
+            max_init_failures: Consecutive init failures after which a worker
+                is no longer restarted
+            max_pending: In-flight jobs (queued or running) before submit rejects
+            retry_after: Seconds suggested to rejected clients
+        """
+        self.num_workers = max(1, num_workers)
+        self.job_timeout = job_timeout
+        self._factory = detector_factory
+        self._factory_args = (model_path,) if model_path is not None else ()
+        self.restart_backoff = restart_backoff
+        self.restart_backoff_max = restart_backoff_max
+        self.max_init_failures = max(1, max_init_failures)
+        self.max_pending = max(1, max_pending)
+        self.retry_after = retry_after
+        self._ctx = mp.get_context(start_method)
+
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count()
+        self._segments: Dict[int, shared_memory.SharedMemory] = {}
+        self._slots = [_WorkerSlot(i) for i in range(self.num_workers)]
+        # Result pipes of replaced workers, handed to the collector to drain
+        self._retired: List[Connection] = []
+        self._closed = False
+
+        self._completed = 0
+        self._failed = 0
+        self._restarts = 0
+        self._rejected = 0
+        self._admitting = 0
+
+        for slot in self._slots:
+            self._start_worker(slot)
+
+        self._collector = threading.Thread(target=self._collect_results, name="yolo-pool-results", daemon=True)
+        self._collector.start()
+        self._monitor = threading.Thread(target=self._monitor_workers, name="yolo-pool-monitor", daemon=True)
+        self._monitor.start()
+
+        logger.info(f"Started detection process pool with {self.num_workers} workers")
+
+    def _start_worker(self, slot: _WorkerSlot):
+        if slot.requests is not None:
+            self._discard_queue(slot.requests)
+        slot.requests = self._ctx.Queue()
+        if slot.results is not None:
+            # The collector drains and closes the previous pipe once it reports EOF
+            self._retired.append(slot.results)
+        slot.results, writer = self._ctx.Pipe(duplex=False)
+        slot.ready = False
+        slot.process = self._ctx.Process(
+            target=_worker_main,
+            args=(slot.worker_id, self._factory, self._factory_args, slot.requests, writer),
+            name=f"yolo-worker-{slot.worker_id}",
+            daemon=True
+        )
+        slot.process.start()
+        # Only the worker holds the write end, so its death shows up as EOF
+        writer.close()
+
+    @property
+    def failed(self) -> bool:
+        """True once every worker has been given up on after repeated init failures."""
+        return all(slot.failed for slot in self._slots)
+
+    def submit(
+        self,
+        image: Image.Image,
+        confidence_threshold: float = 0.25,
+        iou_threshold: float = 0.45,
+        imgsz: int = 320
+    ) -> Future:
+        """
+        Queue one image on the least-loaded running worker (ready ones first).
+
+        Returns:
+            concurrent.futures.Future resolving to the detection dict list
+
+        Raises:
+            ExecutorSaturatedError: max_pending jobs are already in flight
+            DetectionPoolUnavailableError: every worker is waiting to restart
+                or has been given up on
+        """
+        with self._lock:
+            # Segments of in-flight jobs plus those being filled by concurrent submits
+            in_flight = len(self._segments) + self._admitting
+            if in_flight >= self.max_pending:
+                self._rejected += 1
+                logger.warning(f"Detection process pool saturated ({in_flight} jobs in flight); rejecting work")
+                raise ExecutorSaturatedError(self.retry_after)
+            self._admitting += 1
+        try:
+            array = np.asarray(image, dtype=np.uint8)
+            future: Future = Future()
+            shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, dtype=np.uint8, buffer=shm.buf)[...] = array
+        except BaseException:
+            with self._lock:
+                self._admitting -= 1
+            raise
+
+        with self._lock:
+            self._admitting -= 1
+            if self._closed:
+                shm.close()
+                shm.unlink()
+                raise RuntimeError("Detection process pool is shut down")
+            running = [s for s in self._slots if s.restart_at is None and not s.failed]
+            if not running:
+                shm.close()
+                shm.unlink()
+                state = "failed" if self.failed else "restarting"
+                raise DetectionPoolUnavailableError(f"No detection worker available (pool {state})")
+            job_id = next(self._job_ids)
+            slot = min(running, key=lambda s: (not s.ready, len(s.jobs)))
+            slot.jobs[job_id] = future
+            self._segments[job_id] = shm
+            slot.requests.put((job_id, shm.name, array.shape, confidence_threshold, iou_threshold, imgsz))
+        return future
+
+    def detect_foods(
+        self,
+        image: Image.Image,
+        confidence_threshold: float = 0.25,
+        iou_threshold: float = 0.45,
+        imgsz: int = 320
+    ) -> List[Dict[str, Any]]:
+        """Blocking single-image detection (same contract as YOLOFoodDetector)."""
+        try:
+            return self.submit(image, confidence_threshold, iou_threshold, imgsz).result(self.job_timeout)
+        except Exception as e:
+            logger.error(f"Pooled YOLO detection failed: {e}")
+            return []
+
+    def detect_foods_batch(
+        self,
+        images: Sequence[Image.Image],
+        confidence_threshold: float = 0.25,
+        iou_threshold: float = 0.45,
+        imgsz: int = 320
+    ) -> List[List[Dict[str, Any]]]:
+        """Fan a batch out across workers and gather results in input order."""
+        futures = [self.submit(image, confidence_threshold, iou_threshold, imgsz) for image in images]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(self.job_timeout))
+            except Exception as e:
+                logger.error(f"Pooled YOLO detection failed: {e}")
+                results.append([])
+        return results
+
+    def _finish_job(self, job_id: int) -> Optional[Future]:
+        """Release a job's shared memory and return its future (caller holds the lock)."""
+        future = None
+        for slot in self._slots:
+            future = slot.jobs.pop(job_id, None)
+            if future is not None:
+                break
+        shm = self._segments.pop(job_id, None)
+        if shm is not None:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        return future
+
+    def _collect_results(self, poll_interval: float = 0.1):
+        # Every open result pipe, including a replaced worker's until it reports EOF
+        watched = set()
+        while not self._closed:
+            with self._lock:
+                watched.update(slot.results for slot in self._slots if slot.results is not None)
+                watched.update(self._retired)
+                self._retired.clear()
+            for conn in wait(list(watched), poll_interval):
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    # The worker exited; the monitor fails its jobs and restarts it
+                    with self._lock:
+                        for slot in self._slots:
+                            if slot.results is conn:
+                                slot.results = None
+                    watched.discard(conn)
+                    conn.close()
+                    continue
+                self._handle_message(*message)
+        for conn in watched:
+            conn.close()
+
+    def _handle_message(self, kind: str, worker_id: int, job_id: Optional[int], payload: Any):
+        if kind == "ready":
+            with self._lock:
+                self._slots[worker_id].ready = True
+                self._slots[worker_id].init_failures = 0
+            return
+        if kind == "init_error":
+            logger.error(f"Detection worker {worker_id} failed to start: {payload}")
+            return
+
+        with self._lock:
+            future = self._finish_job(job_id)
+            if kind == "result":
+                self._completed += 1
+            else:
+                self._failed += 1
+        if future is None or future.done():
+            return
+        if kind == "result":
+            future.set_result(_unpack(payload))
+        else:
+            future.set_exception(RuntimeError(f"Detection worker {worker_id} error: {payload}"))
+
+    def _monitor_workers(self, interval: float = 0.5):
+        while not self._closed:
+            time.sleep(interval)
+            for slot in self._slots:
+                if self._closed or slot.failed or slot.process is None:
+                    continue
+                if slot.restart_at is not None:
+                    if time.monotonic() >= slot.restart_at:
+                        with self._lock:
+                            if self._closed:
+                                return
+                            slot.restart_at = None
+                            self._restarts += 1
+                            self._start_worker(slot)
+                    continue
+                if slot.process.is_alive():
+                    continue
+                with self._lock:
+                    if self._closed:
+                        return
+                    exitcode = slot.process.exitcode
+                    orphaned = list(slot.jobs)
+                    futures = [self._finish_job(job_id) for job_id in orphaned]
+                    self._failed += len(orphaned)
+                    if not slot.ready:
+                        slot.init_failures += 1
+                    if slot.init_failures >= self.max_init_failures:
+                        slot.failed = True
+                        logger.error(
+                            f"Detection worker {slot.worker_id} failed to start {slot.init_failures} times "
+                            f"in a row (exit code {exitcode}); giving up on it and failing "
+                            f"{len(orphaned)} queued jobs"
+                        )
+                        if self.failed:
+                            logger.error("Detection process pool failed: no worker could start")
+                    elif slot.init_failures:
+                        delay = min(self.restart_backoff_max, self.restart_backoff * 2 ** (slot.init_failures - 1))
+                        slot.restart_at = time.monotonic() + delay
+                        logger.error(
+                            f"Detection worker {slot.worker_id} died during init (exit code {exitcode}); "
+                            f"restarting in {delay:.1f}s and failing {len(orphaned)} queued jobs"
+                        )
+                    else:
+                        self._restarts += 1
+                        logger.error(
+                            f"Detection worker {slot.worker_id} died (exit code {exitcode}); "
+                            f"restarting and failing {len(orphaned)} in-flight jobs"
+                        )
+                        self._start_worker(slot)
+                for future in futures:
+                    if future is not None and not future.done():
+                        future.set_exception(WorkerCrashedError(f"Detection worker {slot.worker_id} crashed"))
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Worker health and job counters for monitoring."""
+        with self._lock:
+            return {
+                "workers": self.num_workers,
+                "workers_alive": sum(1 for s in self._slots if s.process is not None and s.process.is_alive()),
+                "workers_ready": sum(1 for s in self._slots if s.ready),
+                "workers_restarting": sum(1 for s in self._slots if s.restart_at is not None),
+                "workers_failed": sum(1 for s in self._slots if s.failed),
+                "failed": self.failed,
+                "in_flight": sum(len(s.jobs) for s in self._slots),
+                "completed_total": self._completed,
+                "failed_total": self._failed,
+                "restarts_total": self._restarts,
+                "rejected_total": self._rejected,
+            }
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop workers, fail pending jobs and release shared memory."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for slot in self._slots:
+                slot.requests.put(None)
+        for slot in self._slots:
+            slot.process.join(timeout)
+            if slot.process.is_alive():
+                slot.process.terminate()
+        with self._lock:
+            pending = [job_id for slot in self._slots for job_id in slot.jobs]
+            futures = [self._finish_job(job_id) for job_id in pending]
+        for future in futures:
+            if future is not None and not future.done():
+                future.set_exception(RuntimeError("Detection process pool shut down"))
+        self._collector.join(timeout)
+        for slot in self._slots:
+            self._discard_queue(slot.requests)
+        logger.info("Detection process pool shut down")
+
+    @staticmethod
+    def _discard_queue(queue: mp.Queue):
+        # Don't let interpreter exit wait on feeder threads whose reader is gone
+        queue.cancel_join_thread()
+        queue.close()
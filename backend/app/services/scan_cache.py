@@ -0,0 +1,234 @@
+"""
+Scan Result Cache
+Content-addressed cache for complete scan responses.
+
+Keys are a SHA-256 over the uploaded image digest, the endpoint, its
+pipeline parameters (thresholds, imgsz, health flags) and the model
+version, so an identical re-upload with identical settings skips detection,
+LLM validation and enrichment. Two backends are provided:
+
+- MemoryCacheBackend: per-process LRU with TTL
+- SqliteCacheBackend: on-disk table shared by every worker on the node (and
+  by several nodes when placed on shared storage)
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value: Any) -> Any:
+    # numpy scalars/arrays that slip into responses
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+class MemoryCacheBackend:
+    """Thread-safe LRU of encoded values with per-entry expiry."""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self) -> Tuple[int, int]:
+        """(entries, stored bytes)"""
+        with self._lock:
+            return len(self._entries), sum(len(v) for _, v in self._entries.values())
+
+
+class SqliteCacheBackend:
+    """SQLite table keyed by cache key, with TTL and an entry bound."""
+
+    name = "sqlite"
+    blocking = True
+
+    # Trim to max_entries every N writes rather than on each insert
+    PRUNE_EVERY = 64
+
+    def __init__(self, path: Path, max_entries: int = 10000, ttl_seconds: float = 86400, table: str = "scan_cache"):
+        self.path = Path(path)
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl_seconds
+        self.table = table
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table} (accessed_at)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread; WAL lets worker processes read while one writes
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at < now:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            conn.commit()
+            return None
+        conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        conn.commit()
+        return bytes(value)
+
+    def set(self, key: str, value: bytes):
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, value, now + self.ttl, now)
+        )
+        conn.commit()
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """Drop expired rows, then least recently used rows beyond max_entries."""
+        conn = self._connection()
+        conn.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (time.time(),))
+        conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        conn.commit()
+
+    def size(self) -> Tuple[int, int]:
+        """(entries, stored bytes)"""
+        row = self._connection().execute(
+            f"SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM {self.table}"
+        ).fetchone()
+        return int(row[0]), int(row[1])
+
+
+class ScanResultCache:
+    """
+    JSON response cache over a pluggable backend, with hit/miss accounting.
+    """
+
+    def __init__(self, backend, version: str = ""):
+        """
+        Args:
+            backend: MemoryCacheBackend or SqliteCacheBackend
+            version: Model/pipeline version folded into every key
+        """
+        self.backend = backend
+        self.version = version
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._bytes_served = 0
+        self._bytes_written = 0
+
+    @property
+    def blocking(self) -> bool:
+        """True when lookups touch disk and belong on the executor."""
+        return self.backend.blocking
+
+    def make_key(self, image_digest: str, endpoint: str, **params) -> str:
+        """Content address for one image under one endpoint's parameters."""
+        material = json.dumps(
+            {"image": image_digest, "endpoint": endpoint, "version": self.version, "params": params},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Scan cache lookup failed: {e}")
+            raw = None
+        with self._lock:
+            if raw is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._bytes_served += len(raw)
+        return json.loads(raw)
+
+    def set(self, key: str, result: Dict[str, Any]):
+        raw = json.dumps(result, default=_json_default).encode("utf-8")
+        try:
+            self.backend.set(key, raw)
+        except Exception as e:
+            logger.warning(f"Scan cache write failed: {e}")
+            return
+        with self._lock:
+            self._writes += 1
+            self._bytes_written += len(raw)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        try:
+            entries, stored_bytes = self.backend.size()
+        except Exception:
+            entries, stored_bytes = None, None
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "backend": self.backend.name,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0,
+                "writes": self._writes,
+                "bytes_served": self._bytes_served,
+                "bytes_written": self._bytes_written,
+                "entries": entries,
+                "stored_bytes": stored_bytes,
+            }
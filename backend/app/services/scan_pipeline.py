@@ -0,0 +1,139 @@
+"""
+Scan Pipeline
+Orchestrates the YOLO and Mistral stages of /scan-food-yolo-mistral/.
+
+- sequential: YOLO runs first and Mistral validates/extends its names
+  (end-to-end latency is YOLO + LLM)
+- parallel: an open-ended Mistral detection starts as soon as the image is
+  decoded and runs alongside YOLO; DetectionFusion reconciles both lists
+  afterwards (end-to-end latency is max(YOLO, LLM))
+
+With a deadline, the Mistral request is waited on only until then. A late
+request is shielded and left running in the background so its answer still
+reaches the validator's response cache.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Set
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_MODES = ("sequential", "parallel")
+
+Detections = List[Dict[str, Any]]
+
+# Late LLM requests still running after their scan returned (strong refs keep
+# the tasks alive until they finish and populate the cache)
+_late_llm_tasks: Set[asyncio.Task] = set()
+_late_llm_total = 0
+
+
+class StageResults(NamedTuple):
+    yolo: Detections
+    llm: Detections
+    # True when the LLM missed the deadline and `llm` is empty for that reason
+    llm_timed_out: bool = False
+
+
+async def run_detection_stages(
+    image: Image.Image,
+    run_yolo: Callable[[], Awaitable[Detections]],
+    mistral_validator=None,
+    mode: str = "sequential",
+    llm_confidence_threshold: float = 0.3,
+    deadline: Optional[float] = None,
+    source_bytes: Optional[bytes] = None
+) -> StageResults:
+    """
+    Run YOLO and (optionally) Mistral for one decoded image.
+
+    Args:
+        image: Decoded RGB image sent to Mistral
+        run_yolo: Coroutine factory returning YOLO detections in original-image pixels
+        mistral_validator: MistralFoodValidator, or None for YOLO only
+        mode: "sequential" or "parallel"
+        llm_confidence_threshold: Minimum confidence for Mistral items
+        deadline: Event-loop time (loop.time()) after which Mistral is no
+            longer waited on; None waits for the validator's own timeout
+        source_bytes: Original upload bytes the validator may forward instead
+            of re-encoding `image`
+
+    Returns:
+        StageResults(yolo, llm, llm_timed_out)
+    """
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"Unknown pipeline mode: {mode!r} (expected one of {PIPELINE_MODES})")
+
+    if mistral_validator is None:
+        return StageResults(await run_yolo(), [])
+
+    if mode == "parallel":
+        llm_task = asyncio.create_task(
+            mistral_validator.detect_foods_async(
+                image,
+                confidence_threshold=llm_confidence_threshold,
+                source_bytes=source_bytes
+            )
+        )
+        try:
+            yolo_results = await run_yolo()
+        except BaseException:
+            llm_task.cancel()
+            raise
+    else:
+        yolo_results = await run_yolo()
+        llm_task = asyncio.create_task(
+            mistral_validator.validate_detections_async(
+                image,
+                yolo_results,
+                confidence_threshold=llm_confidence_threshold,
+                source_bytes=source_bytes
+            )
+        )
+
+    mistral_results = await _await_until(llm_task, deadline)
+    if mistral_results is None:
+        return StageResults(yolo_results, [], llm_timed_out=True)
+    logger.info(f"Mistral returned {len(mistral_results)} items ({mode})")
+    return StageResults(yolo_results, mistral_results)
+
+
+async def _await_until(task: asyncio.Task, deadline: Optional[float]) -> Optional[Detections]:
+    """Task result, or None (task left running) once the deadline passes."""
+    if deadline is None:
+        return await task
+    remaining = max(0.0, deadline - asyncio.get_running_loop().time())
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), remaining)
+    except asyncio.TimeoutError:
+        global _late_llm_total
+        _late_llm_total += 1
+        _late_llm_tasks.add(task)
+        task.add_done_callback(_late_llm_tasks.discard)
+        logger.warning(f"Mistral missed the scan deadline ({remaining:.2f}s left after YOLO); returning YOLO only")
+        return None
+    except asyncio.CancelledError:
+        # Client went away: the LLM answer is still worth caching
+        if not task.done():
+            _late_llm_tasks.add(task)
+            task.add_done_callback(_late_llm_tasks.discard)
+        raise
+
+
+async def drain_late_llm_tasks(timeout: float = 5.0):
+    """Give background LLM requests a chance to finish (call before closing the validator)."""
+    pending = list(_late_llm_tasks)
+    if not pending:
+        return
+    _, still_running = await asyncio.wait(pending, timeout=timeout)
+    for task in still_running:
+        task.cancel()
+
+
+def get_statistics() -> Dict[str, Any]:
+    return {
+        "late_llm_total": _late_llm_total,
+        "late_llm_in_flight": len(_late_llm_tasks),
+    }
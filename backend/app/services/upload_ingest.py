@@ -0,0 +1,114 @@
+"""
+Upload Ingestion
+Streams an UploadFile in bounded chunks and validates it before any pixel
+decode.
+
+The upload is hashed incrementally while its size is enforced, its magic
+bytes must match a supported format, and only the image header is parsed to
+check dimensions, so oversized, unsupported or decompression-bomb inputs are
+rejected cheaply. The accepted upload's spooled file is handed to the decoder
+as-is instead of being copied into a bytes object.
+"""
+import hashlib
+import logging
+from typing import BinaryIO, NamedTuple, Optional
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# (prefix, offset, PIL format)
+MAGIC_SIGNATURES = (
+    (b"\xff\xd8\xff", 0, "JPEG"),
+    (b"\x89PNG\r\n\x1a\n", 0, "PNG"),
+    (b"WEBP", 8, "WEBP"),
+    (b"BM", 0, "BMP"),
+    (b"GIF8", 0, "GIF"),
+)
+
+
+class IngestedUpload(NamedTuple):
+    file: BinaryIO  # spooled upload, rewound to the start
+    size: int
+    sha256: str
+    format: str
+    width: int
+    height: int
+
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """Identify a supported image format from its leading bytes."""
+    for prefix, offset, fmt in MAGIC_SIGNATURES:
+        if head[offset:offset + len(prefix)] == prefix:
+            if fmt == "WEBP" and not head.startswith(b"RIFF"):
+                continue
+            return fmt
+    return None
+
+
+async def ingest_upload(
+    upload: UploadFile,
+    max_bytes: int,
+    max_pixels: int,
+    chunk_size: int = CHUNK_SIZE
+) -> IngestedUpload:
+    """
+    Validate an uploaded image without loading or decoding it whole.
+
+    Args:
+        upload: Multipart upload from the endpoint
+        max_bytes: Largest accepted encoded size
+        max_pixels: Largest accepted width * height
+        chunk_size: Read size while hashing
+
+    Returns:
+        IngestedUpload ready for decode_for_inference(upload.file)
+
+    Raises:
+        HTTPException: 413 (too large), 415 (unsupported format) or 400 (corrupt header)
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Image exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    await upload.seek(0)
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        if not head:
+            head = chunk[:16]
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Image exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+        digest.update(chunk)
+
+    if size == 0:
+        raise HTTPException(status_code=400, detail="Empty upload")
+    fmt = sniff_format(head)
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Unsupported image type; upload a JPEG, PNG, WEBP, BMP or GIF")
+
+    # Header-only probe: Image.open parses dimensions without decoding pixels
+    await upload.seek(0)
+    try:
+        with Image.open(upload.file) as probe:
+            width, height = probe.size
+            probed_format = probe.format
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid image format: {e}")
+    finally:
+        await upload.seek(0)
+
+    if probed_format != fmt:
+        raise HTTPException(status_code=415, detail=f"Image content ({probed_format}) does not match its signature")
+    if width * height > max_pixels:
+        logger.warning(f"Rejected {width}x{height} upload ({width * height} px > {max_pixels})")
+        raise HTTPException(status_code=413, detail=f"Image dimensions {width}x{height} are too large")
+
+    return IngestedUpload(upload.file, size, digest.hexdigest(), fmt, width, height)
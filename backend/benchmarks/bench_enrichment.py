@@ -0,0 +1,61 @@
+"""
+Benchmark: per-item enrich_food_item vs batched enrich_many.
+
+Enriches N detections drawn from the known food names (with the case and
+whitespace variants detectors and the LLM produce) both ways and checks the
+outputs are identical.
+
+Usage (from backend/):
+    python -m benchmarks.bench_enrichment --sizes 10 1000 10000
+"""
+import argparse
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.heuristics import FoodHeuristics
+
+
+def _items(rng, names, count):
+    variants = (str.lower, str.title, lambda n: f" {n} ")
+    return [
+        {"name": rng.choice(variants)(rng.choice(names)), "confidence": rng.random(), "source": "yolo"}
+        for _ in range(count)
+    ]
+
+
+def _time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--foods", type=int, default=200, help="distinct food names to draw from")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    heuristics = FoodHeuristics()
+    rng = random.Random(0)
+    names = rng.sample(heuristics.knowledge_base.list_food_names(), args.foods)
+    print(f"{'items':>6} {'per-item':>12} {'enrich_many':>12} {'speedup':>8}")
+    for size in args.sizes:
+        items = _items(rng, names, size)
+        single_ms, expected = _time(lambda: [heuristics.enrich_food_item(item) for item in items], args.repeat)
+        batch_ms, actual = _time(lambda: heuristics.enrich_many(items), args.repeat)
+        assert actual == expected, "enrich_many diverged from enrich_food_item"
+        print(f"{size:>6} {single_ms:>9.3f} ms {batch_ms:>9.3f} ms {single_ms / batch_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: pairwise vs token-indexed duplicate detection in DetectionFusion.
+
+Fuses a YOLO list with an LLM list of N items (mostly distinct names drawn
+from a food vocabulary, plus some near-duplicates) using the original
+all-pairs check (rebuild the key set, re-split every name, Jaccard against
+each) and the inverted token index, and checks both give identical output.
+
+Usage (from backend/):
+    python -m benchmarks.bench_fusion --sizes 10 100 1000
+"""
+import argparse
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.fusion import DetectionFusion
+
+WORDS = [
+    "rice", "jollof", "fried", "beans", "plantain", "moi", "chicken", "stew", "egg", "yam", "pepper", "soup",
+    "egusi", "okra", "ogbono", "fufu", "garri", "amala", "suya", "beef", "fish", "goat", "meat", "pie",
+    "puff", "akara", "bread", "tea", "pap", "salad", "coleslaw", "spaghetti", "noodles", "gizdodo", "efo",
+    "riro", "ewa", "agoyin", "abacha", "nkwobi", "ofada", "sauce", "boiled", "grilled", "roasted", "spicy",
+]
+
+
+class PairwiseFusion(DetectionFusion):
+    """The original O(n*m) duplicate check, for comparison."""
+
+    def _is_indexed_duplicate(self, name, name_tokens, index):
+        return self._is_duplicate(name, set(index.tokens))
+
+
+def _items(rng, count, source):
+    return [
+        {"name": " ".join(rng.sample(WORDS, rng.randint(1, 4))), "confidence": rng.random(), "source": source}
+        for _ in range(count)
+    ]
+
+
+def _time(fusion, yolo, llm, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fusion.fuse(yolo, llm)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    rng = random.Random(0)
+    print(f"{'LLM items':>10} {'pairwise':>12} {'indexed':>12} {'speedup':>8}  fused")
+    for size in args.sizes:
+        yolo = _items(rng, max(1, size // 10), "yolo")
+        llm = _items(rng, size, "LLM")
+        pairwise_ms, expected = _time(PairwiseFusion(), yolo, llm, args.repeat)
+        indexed_ms, actual = _time(DetectionFusion(), yolo, llm, args.repeat)
+        assert actual == expected, "indexed fusion diverged from the pairwise reference"
+        print(f"{size:>10} {pairwise_ms:>9.3f} ms {indexed_ms:>9.3f} ms {pairwise_ms / indexed_ms:>7.1f}x  {len(actual)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark: per-call connection vs pooled keep-alive Mistral client.
+
+Runs tools/fake_mistral_server.py with zero latency and times N calls
+made the old way (requests.post, one connection per call) against the
+validator's pooled async client. Over loopback this only captures TCP
+setup; against api.mistral.ai each fresh connection also pays DNS and a
+TLS handshake (typically tens of ms more), so real savings are larger.
+
+Usage (from backend/):
+    python -m benchmarks.bench_mistral_client --calls 200
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import requests
+
+from app.ml.mistral import MistralFoodValidator
+from tools.fake_mistral_server import FakeMistralServer, FakeProviderProfile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    server = FakeMistralServer(FakeProviderProfile(latency_ms=0, latency_dist="fixed")).start()
+    url = server.url
+
+    validator = MistralFoodValidator(api_key="bench", api_url=url)
+    payload = validator._build_payload("AAAA", "prompt")
+
+    start = time.perf_counter()
+    for _ in range(args.calls):
+        requests.post(url, headers={"Authorization": "Bearer bench"}, json=payload, timeout=30).json()
+    per_call_fresh = (time.perf_counter() - start) / args.calls * 1000
+
+    async def pooled():
+        await validator._call_mistral_api_async("AAAA", "prompt")  # warm the pool
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            await validator._call_mistral_api_async("AAAA", "prompt")
+        elapsed = time.perf_counter() - start
+        await validator.aclose()
+        return elapsed / args.calls * 1000
+
+    per_call_pooled = asyncio.run(pooled())
+    server.stop()
+
+    print(f"{args.calls} calls against a loopback stand-in server")
+    print(f"  requests.post (new connection) {per_call_fresh:7.3f} ms/call")
+    print(f"  pooled AsyncClient (keep-alive) {per_call_pooled:7.3f} ms/call")
+    print(f"  saved per call                  {per_call_fresh - per_call_pooled:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Load test: YOLO + Mistral pipeline under simulated provider conditions.
+
+Drives concurrent scans through run_detection_stages with a simulated YOLO
+stage (blocking sleep on a worker thread) and the real MistralFoodValidator
+(pooled client, resilience layer, parsing) pointed at
+tools/fake_mistral_server.py. Reports throughput, latency percentiles, how
+many scans fell back to YOLO-only (partial / empty LLM answer), and the
+breaker and fake-server counters.
+
+Usage (from backend/):
+    python -m benchmarks.bench_mistral_provider --scans 200 --concurrency 16
+    python -m benchmarks.bench_mistral_provider --error-rate 0.6 --deadline-ms 2000
+    python -m benchmarks.bench_mistral_provider --burst-every 5 --burst-seconds 2 --malformed-rate 0.1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from PIL import Image
+
+from app.ml.mistral import MistralFoodValidator
+from app.services.scan_pipeline import PIPELINE_MODES, drain_late_llm_tasks, run_detection_stages
+from tools.fake_mistral_server import LATENCY_DISTRIBUTIONS, FakeMistralServer, FakeProviderProfile
+
+YOLO_RESULTS = [{"name": "jollof rice", "confidence": 0.78, "bbox": [10, 10, 200, 180], "source": "yolo"}]
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scans", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mode", choices=PIPELINE_MODES, default="sequential")
+    parser.add_argument("--yolo-ms", type=float, default=150.0)
+    parser.add_argument("--deadline-ms", type=float, default=0.0, help="0 = wait for the LLM")
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-spread", type=float, default=0.4)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--burst-every", type=float, default=0.0)
+    parser.add_argument("--burst-seconds", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    server = FakeMistralServer(FakeProviderProfile(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        latency_spread=args.latency_spread,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        burst_every=args.burst_every,
+        burst_seconds=args.burst_seconds,
+        retry_after=0.2,
+        seed=args.seed
+    )).start()
+    validator = MistralFoodValidator(api_key="bench", api_url=server.url)
+    image = Image.new("RGB", (640, 480), (180, 120, 60))
+
+    async def run_yolo():
+        await asyncio.to_thread(time.sleep, args.yolo_ms / 1000)
+        return [dict(det) for det in YOLO_RESULTS]
+
+    async def scan(slots, timings, outcomes):
+        async with slots:
+            loop = asyncio.get_running_loop()
+            start = time.perf_counter()
+            deadline = loop.time() + args.deadline_ms / 1000 if args.deadline_ms > 0 else None
+            _, llm, timed_out = await run_detection_stages(image, run_yolo, validator, mode=args.mode, deadline=deadline)
+            timings.append((time.perf_counter() - start) * 1000)
+            outcomes["partial" if timed_out else ("full" if llm else "yolo_only")] += 1
+
+    async def load():
+        slots = asyncio.Semaphore(args.concurrency)
+        timings, outcomes = [], {"full": 0, "partial": 0, "yolo_only": 0}
+        start = time.perf_counter()
+        await asyncio.gather(*(scan(slots, timings, outcomes) for _ in range(args.scans)))
+        elapsed = time.perf_counter() - start
+        await drain_late_llm_tasks(timeout=30)
+        await validator.aclose()
+        return timings, outcomes, elapsed
+
+    timings, outcomes, elapsed = asyncio.run(load())
+    server.stop()
+
+    print(
+        f"{args.scans} scans, concurrency {args.concurrency}, {args.mode}, YOLO {args.yolo_ms:.0f} ms, "
+        f"LLM {args.latency_dist} ~{args.latency_ms:.0f} ms"
+        + (f", deadline {args.deadline_ms:.0f} ms" if args.deadline_ms > 0 else "")
+    )
+    print(f"  throughput   {args.scans / elapsed:7.1f} scans/s")
+    print(
+        f"  latency      p50 {_percentile(timings, 0.50):7.1f} ms  p95 {_percentile(timings, 0.95):7.1f} ms  "
+        f"p99 {_percentile(timings, 0.99):7.1f} ms  max {max(timings):7.1f} ms  mean {statistics.mean(timings):7.1f} ms"
+    )
+    print(f"  outcomes     {outcomes}")
+    print(f"  resilience   {json.dumps(validator.resilience.get_statistics())}")
+    print(f"  fake server  {json.dumps(server.get_statistics())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: sequential vs parallel YOLO + Mistral pipeline modes.
+
+YOLO is simulated by a blocking sleep on a worker thread and Mistral by
+tools/fake_mistral_server.py answering after a fixed delay;
+the real MistralFoodValidator (pooled client, prompt building, parsing)
+runs between them. Sequential scans should take about YOLO + LLM, parallel
+scans about max(YOLO, LLM). With --deadline-ms, scans whose LLM misses the
+deadline return YOLO-only results and are counted as partial.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pipeline_modes --scans 20 --yolo-ms 150 --llm-ms 900
+    python -m benchmarks.bench_pipeline_modes --llm-ms 3000 --deadline-ms 1000
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from PIL import Image
+
+from app.core.fusion import DetectionFusion
+from app.ml.mistral import MistralFoodValidator
+from app.services.scan_pipeline import PIPELINE_MODES, drain_late_llm_tasks, run_detection_stages
+from tools.fake_mistral_server import FakeMistralServer, FakeProviderProfile
+
+YOLO_RESULTS = [{"name": "jollof rice", "confidence": 0.78, "bbox": [10, 10, 200, 180], "source": "yolo"}]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scans", type=int, default=20)
+    parser.add_argument("--yolo-ms", type=float, default=150.0)
+    parser.add_argument("--llm-ms", type=float, default=900.0)
+    parser.add_argument("--deadline-ms", type=float, default=0.0, help="0 = wait for the LLM")
+    args = parser.parse_args()
+
+    server = FakeMistralServer(FakeProviderProfile(latency_ms=args.llm_ms, latency_dist="fixed")).start()
+    validator = MistralFoodValidator(api_key="bench", api_url=server.url)
+    fusion = DetectionFusion()
+    image = Image.new("RGB", (640, 480), (180, 120, 60))
+
+    async def run_yolo():
+        await asyncio.to_thread(time.sleep, args.yolo_ms / 1000)
+        return [dict(det) for det in YOLO_RESULTS]
+
+    async def scans(mode):
+        timings, fused, partial = [], [], 0
+        loop = asyncio.get_running_loop()
+        for _ in range(args.scans):
+            start = time.perf_counter()
+            deadline = loop.time() + args.deadline_ms / 1000 if args.deadline_ms > 0 else None
+            yolo, llm, timed_out = await run_detection_stages(image, run_yolo, validator, mode=mode, deadline=deadline)
+            fused = fusion.fuse(yolo, llm)
+            timings.append((time.perf_counter() - start) * 1000)
+            partial += timed_out
+        await drain_late_llm_tasks(timeout=args.llm_ms / 1000 + 1)
+        return timings, [item["name"] for item in fused], partial
+
+    async def bench():
+        await validator._call_mistral_api_async("AAAA", "warm up")
+        results = {mode: await scans(mode) for mode in PIPELINE_MODES}
+        await validator.aclose()
+        return results
+
+    results = asyncio.run(bench())
+    server.stop()
+
+    deadline = f", deadline {args.deadline_ms:.0f} ms" if args.deadline_ms > 0 else ""
+    print(f"{args.scans} scans, YOLO {args.yolo_ms:.0f} ms, LLM {args.llm_ms:.0f} ms{deadline} (loopback stand-in)")
+    for mode, (timings, items, partial) in results.items():
+        print(
+            f"  {mode:<10} mean {statistics.mean(timings):7.1f} ms  "
+            f"p50 {statistics.median(timings):7.1f} ms  max {max(timings):7.1f} ms  "
+            f"partial {partial}/{args.scans}  fused {items}"
+        )
+    sequential = statistics.mean(results["sequential"][0])
+    parallel = statistics.mean(results["parallel"][0])
+    print(f"  parallel saves {sequential - parallel:.1f} ms per scan ({1 - parallel / sequential:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark: per-box vs vectorized YOLO result parsing.
+
+Compares the original `for box in boxes` loop in YOLOFoodDetector with the
+vectorized _parse_result on one crowded result. Uses real Ultralytics Boxes
+(torch tensors) when ultralytics is installed, otherwise a numpy stand-in
+that under-states the per-box tensor overhead of the old loop.
+
+Usage (from backend/):
+    python -m benchmarks.bench_yolo_postprocess --boxes 50 --repeat 2000
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from app.ml.yolo import YOLOFoodDetector, build_class_name_table
+
+
+class _Tensor(np.ndarray):
+    """numpy array with the torch methods the per-box loop calls."""
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return np.asarray(self)
+
+
+class _Boxes:
+    """Minimal stand-in for ultralytics.engine.results.Boxes."""
+
+    def __init__(self, data: np.ndarray):
+        self.data = data.view(_Tensor)
+
+    @property
+    def xyxy(self):
+        return self.data[:, :4]
+
+    @property
+    def conf(self):
+        return self.data[:, -2]
+
+    @property
+    def cls(self):
+        return self.data[:, -1]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return (_Boxes(self.data[i:i + 1]) for i in range(len(self.data)))
+
+
+class _Result:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+def make_result(num_boxes: int, num_classes: int = 80):
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(0, 500, (num_boxes, 2))
+    data = np.column_stack([
+        xy, xy + rng.uniform(10, 100, (num_boxes, 2)),
+        rng.uniform(0.2, 1.0, num_boxes),
+        rng.integers(0, num_classes, num_boxes),
+    ]).astype(np.float32)
+    try:
+        import torch
+        from ultralytics.engine.results import Boxes
+        return _Result(Boxes(torch.from_numpy(data), (640, 640))), "ultralytics Boxes (torch)"
+    except ImportError:
+        return _Result(_Boxes(data)), "numpy stand-in"
+
+
+def legacy_parse(detector, result):
+    """The original per-box loop."""
+    detections = []
+    for box in result.boxes:
+        class_id = int(box.cls[0])
+        confidence = float(box.conf[0])
+        bbox = box.xyxy[0].cpu().numpy().tolist()
+        class_name = detector.class_names.get(class_id, f"class_{class_id}")
+        detections.append({"name": class_name.lower(), "confidence": confidence, "bbox": bbox, "source": "yolo"})
+    return detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--boxes", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    detector = YOLOFoodDetector.__new__(YOLOFoodDetector)
+    detector.class_names = {i: f"Food_{i}" for i in range(80)}
+    detector._name_table = build_class_name_table(detector.class_names)
+    result, kind = make_result(args.boxes)
+
+    assert legacy_parse(detector, result) == detector._parse_result(result)
+
+    print(f"{args.boxes} boxes per result, {args.repeat} repeats, {kind}")
+    for label, fn in (("per-box loop", legacy_parse), ("vectorized", YOLOFoodDetector._parse_result)):
+        seconds = min(timeit.repeat(lambda: fn(detector, result), number=args.repeat, repeat=3))
+        per_result = seconds / args.repeat * 1e6
+        print(f"  {label:<13} {per_result:9.1f} us/result  {per_result / args.boxes:7.2f} us/box")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Tests for the compiled, memory-mapped food catalog snapshot.
+"""
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import DATA_DIR
+from app.core.catalog_snapshot import CatalogSnapshot, compile_snapshot, open_snapshot
+from app.core.food_attributes import FoodInfoTable
+from app.core.heuristics import FoodHeuristics
+from app.core.knowledge_base import FoodKnowledgeBase
+
+SOURCE_PATH = DATA_DIR / "foods_extended.json"
+
+
+def test_snapshot_round_trips_every_entry(tmp_path):
+    snapshot = CatalogSnapshot(compile_snapshot(SOURCE_PATH, tmp_path / "foods.snap"))
+    foods = json.loads(SOURCE_PATH.read_text())
+    index = snapshot.index()
+
+    expected = {f["name"].strip().lower(): f for f in foods}
+
+    assert len(snapshot) == len(foods)
+    assert len(index) == len(expected)
+    for key, food in expected.items():
+        assert index[key] == food
+    assert "not a real food" not in index
+    assert index.get("not a real food") is None
+
+
+def test_stale_snapshot_is_ignored(tmp_path):
+    source = tmp_path / "foods_extended.json"
+    source.write_text(json.dumps([{"name": "Ogi", "calories": 60, "carbs": 12, "protein": 1,
+                                   "fat": 0.5, "fiber": 1, "glycemic_index": 55, "GI_category": "low",
+                                   "suitable_for": [], "incompatible_with": [], "common_pairings": []}]))
+    path = compile_snapshot(source, tmp_path / "foods.snap")
+    assert open_snapshot(path, source) is not None
+
+    source.write_text("[]")
+    assert open_snapshot(path, source) is None
+
+
+def test_knowledge_base_matches_json_loading(tmp_path):
+    path = compile_snapshot(SOURCE_PATH, tmp_path / "foods.snap")
+    mapped = FoodKnowledgeBase.from_files(snapshot_path=path, use_snapshot=True)
+    parsed = FoodKnowledgeBase.from_files(use_snapshot=False)
+
+    assert mapped.list_food_names() == parsed.list_food_names()
+    for name in parsed.list_food_names():
+        assert mapped.get_food_data(name) == parsed.get_food_data(name)
+        assert mapped.resolve_nutrition(name) == parsed.resolve_nutrition(name)
+        assert mapped.resolve_glycemic_index(name) == parsed.resolve_glycemic_index(name)
+
+
+def test_bulk_decode_matches_lazy_entries(tmp_path):
+    snapshot = CatalogSnapshot(compile_snapshot(SOURCE_PATH, tmp_path / "foods.snap"))
+    entries = snapshot.entries_by_key()
+
+    assert list(entries) == snapshot.keys()
+    for key, entry in entries.items():
+        assert entry == snapshot.entry(snapshot.find(key))
+
+
+def test_precomputed_tables_leave_the_snapshot_index_lazy(tmp_path):
+    path = compile_snapshot(SOURCE_PATH, tmp_path / "foods.snap")
+    mapped = FoodKnowledgeBase.from_files(snapshot_path=path, use_snapshot=True)
+    parsed = FoodKnowledgeBase.from_files(use_snapshot=False)
+
+    mapped_table, parsed_table = FoodInfoTable(mapped), FoodInfoTable(parsed)
+    mapped_records = FoodHeuristics(knowledge_base=mapped).food_records
+    parsed_records = FoodHeuristics(knowledge_base=parsed).food_records
+
+    assert mapped.foods_extended_index._cache == {}
+    assert mapped._extended_nutrition == {}
+    assert {n: mapped_table.get(n) for n in mapped_table._table} == {n: parsed_table.get(n) for n in parsed_table._table}
+    assert {n: dict(r) for n, r in mapped_records.items()} == {n: dict(r) for n, r in parsed_records.items()}
@@ -0,0 +1,130 @@
+"""
+Tests for cross-request detection micro-batching.
+"""
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from app.services.detection_service import DetectionMicroBatcher
+from app.services.inference_executor import BoundedExecutor, ExecutorSaturatedError
+
+
+class FakeDetector:
+    """Echoes each image back as a detection and records batch sizes."""
+
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+
+    def detect_foods_batch(self, images, confidence_threshold=0.25, iou_threshold=0.45, imgsz=320):
+        self.batches.append(len(images))
+        if self.fail:
+            raise RuntimeError("inference failed")
+        return [[{"name": image, "confidence": confidence_threshold, "source": "yolo"}] for image in images]
+
+
+def test_concurrent_requests_share_one_batch():
+    detector = FakeDetector()
+    batcher = DetectionMicroBatcher(lambda: detector, window_ms=20, max_batch_size=8)
+
+    async def run():
+        return await asyncio.gather(*(batcher.detect(f"img{i}", confidence_threshold=0.2) for i in range(5)))
+
+    results = asyncio.run(run())
+
+    assert detector.batches == [5]
+    assert [r[0]["name"] for r in results] == [f"img{i}" for i in range(5)]
+    stats = batcher.get_statistics()
+    assert stats["batch_size_histogram"] == {"5": 1}
+    assert stats["queue_depth"] == 0
+
+
+def test_full_batch_flushes_and_params_are_not_mixed():
+    detector = FakeDetector()
+    batcher = DetectionMicroBatcher(lambda: detector, window_ms=50, max_batch_size=2)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.detect("a", confidence_threshold=0.2),
+            batcher.detect("b", confidence_threshold=0.2),
+            batcher.detect("c", confidence_threshold=0.25),
+        )
+
+    results = asyncio.run(run())
+
+    assert sorted(detector.batches) == [1, 2]
+    assert results[2][0]["confidence"] == 0.25
+
+
+def test_failures_propagate_to_every_caller():
+    batcher = DetectionMicroBatcher(lambda: FakeDetector(fail=True), window_ms=5)
+
+    async def run():
+        return await asyncio.gather(batcher.detect("a"), batcher.detect("b"), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_rejects_requests_past_max_queue_depth():
+    detector = FakeDetector()
+    batcher = DetectionMicroBatcher(lambda: detector, window_ms=50, max_batch_size=8, max_queue_depth=2, retry_after=4)
+
+    async def run():
+        queued = [asyncio.ensure_future(batcher.detect(name)) for name in ("a", "b")]
+        await asyncio.sleep(0)
+        with pytest.raises(ExecutorSaturatedError) as exc_info:
+            await batcher.detect("c")
+        return await asyncio.gather(*queued), exc_info.value
+
+    results, error = asyncio.run(run())
+
+    assert [r[0]["name"] for r in results] == ["a", "b"]
+    assert error.retry_after == 4
+    assert detector.batches == [2]
+    assert batcher.get_statistics()["rejected_total"] == 1
+
+
+def test_detector_factory_runs_on_the_inference_thread():
+    detector = FakeDetector()
+    factory_threads = []
+
+    def factory():
+        factory_threads.append(threading.get_ident())
+        return detector
+
+    batcher = DetectionMicroBatcher(factory, window_ms=1)
+
+    async def run():
+        await batcher.detect("a")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert factory_threads and factory_threads[0] != loop_thread
+
+
+def test_batches_run_on_the_shared_bounded_executor():
+    detector = FakeDetector()
+    executor = BoundedExecutor(max_workers=1, max_queue=0)
+    batcher = DetectionMicroBatcher(lambda: detector, window_ms=5, run_blocking=executor.run)
+    release = threading.Event()
+
+    async def run():
+        first = await batcher.detect("a")
+        # With the executor busy elsewhere, the batch is rejected like any other blocking stage
+        busy = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorSaturatedError):
+            await batcher.detect("b")
+        release.set()
+        await busy
+        return first
+
+    assert asyncio.run(run())[0]["name"] == "a"
+    stats = executor.get_statistics()
+    assert stats["completed_total"] == 2 and stats["rejected_total"] == 1
@@ -0,0 +1,59 @@
+"""
+Tests for batch enrichment (FoodHeuristics.enrich_many).
+"""
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.heuristics import FoodHeuristics
+
+NAMES = ["Jollof Rice", "jollof rice", "  rice ", "moi moi", "beans", "fried plantain", "egg", "unknown dish xyz"]
+
+
+def _items(rng, count):
+    return [
+        {"name": rng.choice(NAMES), "confidence": round(rng.random(), 3), "source": rng.choice(["yolo", "LLM"])}
+        for _ in range(count)
+    ]
+
+
+def test_enrich_many_matches_per_item_enrichment():
+    heuristics = FoodHeuristics()
+    items = _items(random.Random(0), 200)
+    assert heuristics.enrich_many(items) == [heuristics.enrich_food_item(item) for item in items]
+
+
+def test_each_distinct_food_is_resolved_once():
+    heuristics = FoodHeuristics()
+    resolved = []
+    original = heuristics._resolve_food
+
+    def counting(canonical_name):
+        resolved.append(canonical_name)
+        return original(canonical_name)
+
+    heuristics._resolve_food = counting
+    items = _items(random.Random(1), 500)
+    enriched = heuristics.enrich_many(items)
+
+    assert len(enriched) == 500
+    assert len(resolved) == len(set(resolved)) == len({item["name"] for item in enriched})
+    assert [item["confidence"] for item in enriched] == [item["confidence"] for item in items]
+    assert [item["source"] for item in enriched] == [item["source"] for item in items]
+
+
+def test_duplicates_get_separate_dicts():
+    heuristics = FoodHeuristics()
+    first, second = heuristics.enrich_many([
+        {"name": "rice", "confidence": 0.9, "source": "yolo"},
+        {"name": "Rice", "confidence": 0.4, "source": "LLM"},
+    ])
+    assert first is not second
+    assert first["name"] == second["name"]
+    assert (first["confidence"], second["confidence"]) == (0.9, 0.4)
+
+
+def test_empty_batch():
+    assert FoodHeuristics().enrich_many([]) == []
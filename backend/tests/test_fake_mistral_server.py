@@ -0,0 +1,77 @@
+"""
+Tests for the offline Mistral API stand-in (tools/fake_mistral_server.py).
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from PIL import Image
+
+from app.ml.mistral import MistralFoodValidator
+from app.services.llm_resilience import LLMResilience
+from tools.fake_mistral_server import FakeMistralServer, FakeProviderProfile, build_content
+
+DETECTIONS = [{"name": "beans", "confidence": 0.5, "source": "yolo"}]
+
+
+def _validate(server, **resilience):
+    validator = MistralFoodValidator(
+        api_key="fake",
+        api_url=server.url,
+        resilience=LLMResilience(**resilience) if resilience else None
+    )
+    try:
+        return validator, validator.validate_detections(Image.new("RGB", (64, 64), 90), DETECTIONS)
+    finally:
+        validator.close()
+
+
+def test_validator_parses_fake_answers():
+    with FakeMistralServer(FakeProviderProfile(latency_ms=0, markdown=True)) as server:
+        _, foods = _validate(server)
+
+    assert [f["name"] for f in foods] == ["beans", "jollof rice", "fried plantain"]
+    assert server.get_statistics() == {
+        "requests": 1, "ok": 1, "errors": 0, "rate_limited": 0, "malformed": 0, "bad_requests": 0
+    }
+
+
+def test_malformed_answers_fall_back_to_empty():
+    with FakeMistralServer(FakeProviderProfile(latency_ms=0, malformed_rate=1.0, seed=1)) as server:
+        results = [_validate(server)[1] for _ in range(4)]
+
+    assert results == [[]] * 4
+    assert server.get_statistics()["malformed"] == 4
+
+
+def test_rate_limit_bursts_are_retried_then_shed():
+    profile = FakeProviderProfile(latency_ms=0, burst_every=60, burst_seconds=60, retry_after=0.01)
+    with FakeMistralServer(profile) as server:
+        validator, foods = _validate(server, max_retries=2)
+
+    assert foods == []
+    assert server.get_statistics()["rate_limited"] == 3
+    assert validator.resilience.get_statistics()["retries"] == 2
+
+
+def test_error_rate_and_latency_distributions():
+    profile = FakeProviderProfile(latency_ms=100, latency_dist="lognormal", latency_spread=0.5, error_rate=0.5, seed=3)
+    samples = [profile.sample_latency() for _ in range(2000)]
+    errors = sum(profile.roll(profile.error_rate) for _ in range(2000))
+
+    assert 0.08 < sorted(samples)[1000] < 0.12  # median ~ latency_ms
+    assert 900 < errors < 1100
+    assert FakeProviderProfile(latency_ms=50, latency_dist="fixed").sample_latency() == 0.05
+    with pytest.raises(ValueError):
+        FakeProviderProfile(latency_dist="pareto")
+
+
+def test_build_content_confirms_prompt_names_once():
+    content = build_content(MistralFoodValidator.VALIDATION_PROMPT.format(yolo_foods="Rice, jollof rice"), [
+        {"name": "jollof rice", "confidence": 0.9, "source": "LLM"},
+        {"name": "moi moi", "confidence": 0.5, "source": "LLM"},
+    ])
+
+    assert '"rice"' in content and content.count("jollof rice") == 1 and "moi moi" in content
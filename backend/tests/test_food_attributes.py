@@ -0,0 +1,99 @@
+"""
+Tests for precomputed per-food derived attributes.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from app.core.food_attributes import FoodInfoTable, gi_advice, name_flags
+from app.core.heuristics import FoodHeuristics
+from app.core.knowledge_base import get_knowledge_base
+
+
+def _reference_food_info(food_name, confidence):
+    """The original per-request get_food_info + _apply_flag_heuristics."""
+    nutrition, gi, gi_category, suitable_for, _, _ = get_knowledge_base().get_food_data(food_name)
+    if gi is None:
+        advice = "No GI data available"
+    elif gi < 55:
+        advice = "Low GI – safer for diabetes"
+    elif 55 <= gi <= 69:
+        advice = "Medium GI – moderate consumption advised"
+    else:
+        advice = "High GI – minimize for diabetes"
+    info = {
+        "name": food_name,
+        "confidence": confidence,
+        "calories": nutrition.get("calories"),
+        "carbs": nutrition.get("carbs"),
+        "protein": nutrition.get("protein"),
+        "fat": nutrition.get("fat"),
+        "fiber": nutrition.get("fiber"),
+        "glycemic_index": gi,
+        "gi_category": gi_category,
+        "suitable_for": suitable_for,
+        "advice": advice,
+        "flags": nutrition.get("flags", []),
+        "health_warnings": nutrition.get("warnings", {}),
+    }
+    tagged = dict(info)
+    lower = food_name.lower()
+    flags = set(info["flags"])
+    for word, flag in [("fried", "fried"), ("pepper", "spicy"), ("spicy", "spicy"), ("soup", "soup"), ("stew", "stew")]:
+        if word in lower:
+            flags.add(flag)
+    if any(word in lower for word in ("rice", "yam", "fufu", "plantain")):
+        flags.add("carb-heavy")
+    tagged["flags"] = flags
+    return info, tagged
+
+
+@pytest.fixture(scope="module")
+def table():
+    return FoodInfoTable(get_knowledge_base())
+
+
+def test_food_info_table_matches_per_request_derivation(table):
+    names = get_knowledge_base().list_food_names()[:300] + ["pepper soup", "Unknown Food", "not a food"]
+    for name in names:
+        expected, expected_tagged = _reference_food_info(name, 0.7)
+        assert table.item(name, 0.7) == expected
+        tagged = table.item(name, 0.7, tag_flags=True)
+        assert list(tagged) == list(expected_tagged)
+        assert set(tagged.pop("flags")) == expected_tagged.pop("flags")
+        assert tagged == expected_tagged
+
+
+def test_food_info_items_are_fresh_and_table_is_frozen(table):
+    name = get_knowledge_base().list_food_names()[0]
+    first, second = table.item(name, 0.9), table.item(name, 0.4)
+    assert first is not second and first["confidence"] == 0.9
+    with pytest.raises(TypeError):
+        table.get(name).fields["calories"] = 0
+
+
+def test_names_outside_the_catalog_are_memoized(table):
+    assert table.get("definitely not a food") is table.get("definitely not a food")
+
+
+def test_derivation_rules():
+    assert gi_advice(None) == "No GI data available"
+    assert gi_advice(40) == "Low GI – safer for diabetes"
+    assert gi_advice(69) == "Medium GI – moderate consumption advised"
+    assert gi_advice(70) == "High GI – minimize for diabetes"
+    assert set(name_flags("Spicy Fried Rice", ["starchy"])) == {"starchy", "spicy", "fried", "carb-heavy"}
+
+
+def test_heuristics_records_match_fresh_computation():
+    heuristics = FoodHeuristics()
+    assert heuristics.food_records
+    for canonical_name, record in heuristics.food_records.items():
+        assert dict(record) == dict(heuristics._compute_food_record(canonical_name))
+    item = {"name": "Jollof Rice", "confidence": 0.8, "source": "yolo"}
+    enriched = heuristics.enrich_food_item(item)
+    assert enriched["portion_advice"] == heuristics.food_records["jollof rice"]["portion_advice"]
+    with pytest.raises(TypeError):
+        heuristics.food_records["jollof rice"]["calories"] = 0
@@ -0,0 +1,61 @@
+"""
+Tests for the precomputed food name resolution index.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.food_index import FoodNameIndex
+from app.core.heuristics import FoodHeuristics
+
+
+def _normalize(name: str) -> str:
+    return name.strip().lower()
+
+
+def _linear_lookup(table, normalized):
+    """Reference implementation: the original exact-then-partial linear scan."""
+    for key, value in table.items():
+        if _normalize(key) == normalized:
+            return key, value
+    for key, value in table.items():
+        if normalized in _normalize(key) or _normalize(key) in normalized:
+            return key, value
+    return None
+
+
+def test_index_matches_linear_scan():
+    table = {
+        "Jollof Rice": 1,
+        "Fried Rice": 2,
+        "Rice": 3,
+        "Rice and Beans": 4,
+        "Fried Plantain": 5,
+        " stew ": 6,
+        "Pepper Soup": 7,
+    }
+    index = FoodNameIndex(table, _normalize)
+    queries = [
+        "jollof rice", "rice", "fried", "plantain", "beans", "rice and beans",
+        "spicy pepper soup", "stew", "beef stew", "soup", "", "unknown food", "e",
+    ]
+    for query in queries:
+        assert index.lookup(query) == _linear_lookup(table, query), query
+        # Memoized second lookup returns the same winner
+        assert index.lookup(query) == _linear_lookup(table, query), query
+
+
+def test_heuristics_resolution_unchanged():
+    heuristics = FoodHeuristics()
+    names = list(heuristics.nutrition_db.keys()) + [
+        "rice", "plantain", "chicken", "soup", "beans", "pizza", "yam",
+    ]
+    for name in names:
+        normalized = _normalize(name)
+        expected = _linear_lookup(heuristics.nutrition_db, normalized)
+        if expected is not None:
+            assert heuristics._find_nutrition_data(name) is expected[1]
+        expected_gi = _linear_lookup(heuristics.glycemic_index_db, normalized)
+        if expected_gi is not None:
+            assert heuristics._find_glycemic_index(name) == expected_gi[1]
@@ -0,0 +1,61 @@
+"""
+Tests for token-indexed duplicate detection in DetectionFusion.
+"""
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from app.core.fusion import DetectionFusion
+
+VOCAB = ["rice", "jollof", "fried", "beans", "plantain", "moi", "chicken", "stew", "egg", "yam", "pepper", "soup"]
+
+
+class PairwiseFusion(DetectionFusion):
+    """Reference: the original all-pairs check against every fused name."""
+
+    def _is_indexed_duplicate(self, name, name_tokens, index):
+        return self._is_duplicate(name, set(index.tokens))
+
+
+def _items(rng, count, source):
+    return [
+        {
+            "name": " ".join(rng.sample(VOCAB, rng.randint(1, 3))).title() if rng.random() < 0.5
+            else " ".join(rng.sample(VOCAB, rng.randint(1, 3))),
+            "confidence": round(rng.random(), 3),
+            "source": source,
+        }
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("threshold", [0.3, 0.5, 0.8, 1.0])
+def test_indexed_fusion_matches_pairwise_reference(threshold):
+    rng = random.Random(threshold)
+    for _ in range(50):
+        yolo = _items(rng, rng.randint(0, 8), "yolo")
+        llm = _items(rng, rng.randint(0, 40), "LLM")
+
+        expected = PairwiseFusion(similarity_threshold=threshold).fuse(yolo, llm)
+        actual = DetectionFusion(similarity_threshold=threshold).fuse(yolo, llm)
+
+        assert actual == expected
+
+
+def test_partial_duplicates_are_skipped_and_new_foods_added():
+    fusion = DetectionFusion(similarity_threshold=0.5)
+    fused = fusion.fuse(
+        [{"name": "Jollof Rice", "confidence": 0.7, "source": "yolo"}],
+        [
+            {"name": "rice", "confidence": 0.9, "source": "LLM"},           # 1/2 overlap -> duplicate
+            {"name": "fried plantain", "confidence": 0.6, "source": "LLM"},
+            {"name": "plantain", "confidence": 0.5, "source": "LLM"},       # duplicate of an LLM addition
+            {"name": "beans", "confidence": 0.2, "source": "LLM"},          # below llm threshold
+        ]
+    )
+
+    assert [item["name"] for item in fused] == ["Jollof Rice", "fried plantain"]
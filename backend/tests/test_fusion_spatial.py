@@ -0,0 +1,128 @@
+"""
+Tests for IoU-based (spatial) fusion of YOLO boxes in DetectionFusion.
+"""
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+
+from app.core.fusion import DetectionFusion, pairwise_iou
+
+
+def _box(name, confidence, bbox):
+    return {"name": name, "confidence": confidence, "bbox": bbox, "source": "yolo"}
+
+
+def _reference_reduce(fusion, detections):
+    """Per-pair Python loop version of reduce_instances."""
+    def iou(a, b):
+        iw = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+        ih = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+        inter = iw * ih
+        union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+        return inter / (union + 1e-9)
+
+    order = sorted(range(len(detections)), key=lambda i: -detections[i]["confidence"])
+    kept = []
+    for i in order:
+        item = detections[i]
+        if any(
+            iou(item["bbox"], k["bbox"]) >= (
+                fusion.same_class_iou if fusion._normalize_name(item["name"]) == fusion._normalize_name(k["name"])
+                else fusion.cross_class_iou
+            )
+            for k in kept
+        ):
+            continue
+        kept.append(item)
+    return kept
+
+
+def test_pairwise_iou_matches_hand_computed_values():
+    boxes = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=float)
+    iou = pairwise_iou(boxes)
+    assert iou.shape == (3, 3)
+    assert np.allclose(np.diag(iou), 1.0)
+    assert iou[0, 1] == pytest.approx(50 / 150)
+    assert iou[0, 2] == 0
+    assert np.allclose(iou, iou.T)
+
+
+def test_separate_servings_of_the_same_food_stay_separate():
+    fusion = DetectionFusion(spatial=True)
+    eggs = [
+        _box("boiled egg", 0.9, [0, 0, 50, 50]),
+        _box("boiled egg", 0.8, [100, 0, 150, 50]),
+        _box("boiled egg", 0.7, [200, 0, 250, 50]),
+    ]
+    fused = fusion.fuse(eggs, [])
+    assert len(fused) == 3
+    assert fusion.get_statistics(fused)["instance_counts"] == {"boiled egg": 3}
+
+
+def test_overlapping_same_class_boxes_merge_into_one_instance():
+    fusion = DetectionFusion(spatial=True)
+    fused = fusion.fuse([
+        _box("rice", 0.6, [0, 0, 100, 100]),
+        _box("rice", 0.9, [5, 5, 100, 100]),
+    ], [])
+    assert [item["confidence"] for item in fused] == [0.9]
+
+
+def test_overlapping_different_classes_keep_the_more_confident_label():
+    fusion = DetectionFusion(spatial=True, cross_class_iou=0.7)
+    fused = fusion.fuse([
+        _box("fried plantain", 0.55, [0, 0, 100, 100]),
+        _box("yam", 0.8, [2, 2, 100, 100]),
+        _box("beans", 0.5, [40, 40, 140, 140]),  # partial overlap: a different food
+    ], [])
+    assert [item["name"] for item in fused] == ["yam", "beans"]
+
+
+def test_llm_adds_new_foods_but_does_not_collapse_instances():
+    fusion = DetectionFusion(spatial=True)
+    yolo = [
+        _box("moi moi", 0.7, [0, 0, 40, 40]),
+        _box("moi moi", 0.6, [60, 0, 100, 40]),
+    ]
+    llm = [
+        {"name": "Moi Moi", "confidence": 0.95, "source": "LLM"},
+        {"name": "pap", "confidence": 0.5, "source": "LLM"},
+        {"name": "stew", "confidence": 0.1, "source": "LLM"},  # below threshold
+    ]
+    fused = fusion.fuse(yolo, llm)
+    assert [item["name"] for item in fused] == ["moi moi", "moi moi", "pap"]
+    stats = fusion.get_statistics(fused)
+    assert stats["instance_counts"] == {"moi moi": 2, "pap": 1}
+    assert stats["yolo_items"] == 2 and stats["llm_items"] == 1
+
+
+def test_name_mode_is_unchanged():
+    yolo = [_box("egg", 0.9, [0, 0, 10, 10]), _box("egg", 0.8, [50, 50, 60, 60])]
+    fusion = DetectionFusion()
+    fused = fusion.fuse(yolo, [])
+    assert len(fused) == 1
+    assert "instance_counts" not in fusion.get_statistics(fused)
+
+
+def test_yolo_items_without_boxes_pass_through():
+    fusion = DetectionFusion(spatial=True)
+    fused = fusion.fuse([{"name": "tea", "confidence": 0.4, "source": "yolo"}], [])
+    assert [item["name"] for item in fused] == ["tea"]
+
+
+@pytest.mark.parametrize("same_iou,cross_iou", [(0.5, 0.7), (0.3, 0.3), (0.8, 0.95)])
+def test_vectorized_reduce_matches_per_pair_reference(same_iou, cross_iou):
+    rng = random.Random(same_iou + cross_iou)
+    fusion = DetectionFusion(spatial=True, same_class_iou=same_iou, cross_class_iou=cross_iou)
+    for _ in range(30):
+        detections = []
+        for _ in range(rng.randint(0, 40)):
+            x, y = rng.uniform(0, 300), rng.uniform(0, 300)
+            w, h = rng.uniform(10, 120), rng.uniform(10, 120)
+            detections.append(_box(rng.choice(["egg", "Egg", "rice", "beans"]), rng.random(), [x, y, x + w, y + h]))
+        assert fusion.reduce_instances(detections) == _reference_reduce(fusion, detections)
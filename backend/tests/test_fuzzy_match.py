@@ -0,0 +1,127 @@
+"""
+Tests for the character-trigram food name matcher.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from app.core.fuzzy_match import TrigramMatcher, build_catalog_matcher, trigrams
+from app.core.heuristics import FoodHeuristics
+from app.core.knowledge_base import FoodKnowledgeBase, get_knowledge_base, normalize_key
+
+NUTRITION = {
+    "Fried Chicken": {"calories": 320, "carbs": 10, "protein": 25, "fat": 20, "fiber": 0, "flags": ["fried"], "warnings": {}},
+    "Jollof Rice": {"calories": 250, "carbs": 45, "protein": 5, "fat": 6, "fiber": 2, "flags": [], "warnings": {}},
+}
+GI = {"jollof rice": 70}
+EXTENDED = [{"name": "pad thai", "calories": 400, "carbs": 50, "protein": 15, "fat": 14, "fiber": 3, "glycemic_index": 55}]
+
+
+def _reference_scores(names, query):
+    query_grams = trigrams(query)
+    scores = {}
+    for name in names:
+        grams = trigrams(name)
+        shared = len(query_grams & grams)
+        if shared:
+            scores[name] = shared / (len(query_grams) + len(grams) - shared)
+    return scores
+
+
+def test_trigrams_pad_each_word():
+    assert trigrams("rice") == {"  r", " ri", "ric", "ice", "ce "}
+    assert trigrams("rice rice") == trigrams("rice")
+
+
+def test_scores_match_set_jaccard_and_are_ranked():
+    names = ["fried chicken", "grilled chicken", "fried rice", "jollof rice", "beef stew"]
+    matcher = TrigramMatcher({name: name for name in names})
+    ranked = matcher.match("fried chiken", limit=5)
+    expected = _reference_scores(names, "fried chiken")
+
+    assert [name for name, _ in ranked] == sorted(expected, key=lambda n: (-expected[n], len(n), n))
+    for name, score in ranked:
+        assert score == round(expected[name], 4)
+
+
+def test_best_respects_min_score_and_caches():
+    matcher = TrigramMatcher({"jollof rice": "jollof rice", "beans": "beans"}, min_score=0.5)
+    assert matcher.best("jolof rice")[0] == "jollof rice"
+    assert matcher.best("hamburger") is None
+    assert matcher._ranked("jolof rice", 5) is matcher._ranked("jolof rice", 5)
+    assert matcher.match("") == []
+
+
+def test_synonym_variants_resolve_to_canonical_names():
+    matcher = build_catalog_matcher(["cheesecake"], {"cheese_cake": "cheesecake"}, normalize_key)
+    assert matcher.best("cheese cake") == ("cheesecake", 1.0)
+    assert [name for name, _ in matcher.match("cheese cak")] == ["cheesecake"]
+
+
+def test_synonyms_without_a_catalog_entry_are_not_indexed():
+    matcher = build_catalog_matcher(["fried chicken"], {"french_fries": "french fries"}, normalize_key)
+    assert len(matcher) == 1
+    assert matcher.best("french fries") is None
+
+
+def test_best_requires_the_same_words():
+    names = ["mint ice cream", "plantain fufu", "fried chicken", "fried plantain", "jollof rice"]
+    matcher = TrigramMatcher({name: name for name in names}, min_score=0.3)
+    assert matcher.best("ice cream") is None
+    assert matcher.best("plantains") is None
+    assert matcher.best("fried rice and chicken") is None
+    assert matcher.best("jollof rices") == ("jollof rice", matcher.match("jollof rices", 1)[0][1])
+    assert matcher.best("frid plantain")[0] == "fried plantain"
+
+
+def test_best_skips_candidates_rejected_by_accept():
+    matcher = TrigramMatcher({"jollof rice": "jollof rice", "jollof rica": "jollof rica"})
+    assert matcher.best("jollof ricz", accept=lambda target: target != "jollof rice")[0] == "jollof rica"
+    assert matcher.best("jollof ricz", accept=lambda target: False) is None
+
+
+@pytest.mark.parametrize("name", [
+    "french fries", "chocolate cake", "fried rice", "cheesecake",
+    "plantains", "fried rice and chicken", "bitter leaf soup", "ice cream",
+])
+def test_real_catalog_does_not_guess_a_different_food(name):
+    kb = get_knowledge_base()
+    assert kb.fuzzy_name(name) is None
+    assert kb.resolve_nutrition(name) is None
+
+
+@pytest.mark.parametrize("name,expected", [
+    ("jolof rice", "jollof rice"),
+    ("fried chiken", "fried chicken"),
+    ("frid plantain", "fried plantain"),
+])
+def test_real_catalog_resolves_typos(name, expected):
+    kb = get_knowledge_base()
+    assert kb.fuzzy_name(name) == expected
+    assert kb.resolve_nutrition(name) is not None
+
+
+def test_knowledge_base_falls_back_to_fuzzy_match():
+    kb = FoodKnowledgeBase(NUTRITION, GI, EXTENDED)
+    heuristics = FoodHeuristics(knowledge_base=kb)
+
+    # Exact and partial lookups are unchanged
+    assert kb.resolve_nutrition("jollof rice") is kb.nutrition_db["Jollof Rice"]
+    # Misspellings resolve to the closest curated or extended food instead of the defaults
+    assert kb.resolve_nutrition("jolof rice") is kb.nutrition_db["Jollof Rice"]
+    assert kb.resolve_glycemic_index("jolof rice") == 70
+    assert kb.resolve_nutrition("pad thaii")["calories"] == 400
+    assert kb.resolve_glycemic_index("pad thaii") == 55
+    assert heuristics.enrich_food_item({"name": "frid chicken", "confidence": 0.6, "source": "LLM"})["calories"] == 320
+    # Too far from anything: still unknown
+    assert kb.resolve_nutrition("hamburger") is None
+    assert "unknown" in heuristics.enrich_food_item({"name": "hamburger", "confidence": 0.6, "source": "LLM"})["flags"]
+
+
+def test_fuzzy_match_can_be_disabled():
+    kb = FoodKnowledgeBase(NUTRITION, GI, EXTENDED, fuzzy_match=False)
+    assert kb.resolve_nutrition("jolof rice") is None
+    assert kb.resolve_glycemic_index("jolof rice") is None
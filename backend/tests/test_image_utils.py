@@ -0,0 +1,61 @@
+"""
+Tests for reduced-resolution upload decoding.
+"""
+import sys
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from PIL import Image
+
+from app.services.image_utils import decode_for_inference, rescale_detections, size_scale
+
+
+def _encode(size, fmt, mode="RGB"):
+    buffer = BytesIO()
+    Image.new(mode, size, 128).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def test_jpeg_is_dct_scaled_near_target():
+    decoded = decode_for_inference(_encode((4000, 3000), "JPEG"), target_size=640)
+
+    assert decoded.original_size == (4000, 3000)
+    assert decoded.image.size == (1000, 750)
+    assert decoded.image.mode == "RGB"
+    assert decoded.scale == (4.0, 4.0)
+
+
+def test_non_jpeg_is_reduced_but_covers_target():
+    decoded = decode_for_inference(_encode((2000, 1500), "PNG", mode="L"), target_size=640)
+
+    assert decoded.image.size == (1000, 750)
+    assert decoded.image.mode == "RGB"
+    assert min(decoded.image.size) >= 640
+
+
+def test_small_and_full_size_decodes_are_untouched():
+    small = decode_for_inference(_encode((800, 600), "JPEG"), target_size=640)
+    full = decode_for_inference(_encode((4000, 3000), "JPEG"), target_size=None)
+
+    assert small.image.size == (800, 600) and small.scale == (1.0, 1.0)
+    assert full.image.size == (4000, 3000)
+
+
+def test_rescale_detections_maps_bboxes_to_original():
+    detections = [{"name": "rice", "bbox": [10, 20, 30, 40]}, {"name": "egg", "bbox": None}]
+
+    rescaled = rescale_detections(detections, (4.0, 2.0))
+
+    assert rescaled[0]["bbox"] == [40.0, 40.0, 120.0, 80.0]
+    assert rescaled[1] == {"name": "egg", "bbox": None}
+    assert detections[0]["bbox"] == [10, 20, 30, 40]
+
+
+def test_size_scale_maps_a_near_duplicate_onto_a_resized_copy():
+    # Detections from a 4000x3000 scan reused for a 1600x1200 re-upload of it
+    detections = [{"name": "rice", "bbox": [1000, 750, 3000, 2250]}]
+
+    assert size_scale((4000, 3000), (4000, 3000)) == (1.0, 1.0)
+    assert rescale_detections(detections, size_scale((4000, 3000), (1600, 1200)))[0]["bbox"] == [400.0, 300.0, 1200.0, 900.0]
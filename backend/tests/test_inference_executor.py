@@ -0,0 +1,87 @@
+"""
+Tests for the bounded blocking-work executor.
+"""
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from app.services.inference_executor import BoundedExecutor, ExecutorSaturatedError
+
+
+def test_runs_blocking_work_off_the_event_loop():
+    executor = BoundedExecutor(max_workers=2, max_queue=2)
+    loop_thread = threading.get_ident()
+
+    async def run():
+        return await executor.run(threading.get_ident)
+
+    assert asyncio.run(run()) != loop_thread
+    stats = executor.get_statistics()
+    assert stats["completed_total"] == 1
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+
+def test_rejects_when_workers_and_queue_are_full():
+    executor = BoundedExecutor(max_workers=1, max_queue=1, retry_after=3)
+    release = threading.Event()
+
+    async def run():
+        first = asyncio.ensure_future(executor.run(release.wait, 5))
+        second = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        stats = executor.get_statistics()
+        with pytest.raises(ExecutorSaturatedError) as exc_info:
+            await executor.run(release.wait, 5)
+        release.set()
+        await asyncio.gather(first, second)
+        return stats, exc_info.value
+
+    stats, error = asyncio.run(run())
+
+    assert stats["active"] == 1 and stats["queued"] == 1
+    assert stats["utilization"] == 1.0
+    assert error.retry_after == 3
+    assert executor.get_statistics()["rejected_total"] == 1
+
+
+def test_exceptions_propagate_and_are_counted():
+    executor = BoundedExecutor(max_workers=1, max_queue=0)
+
+    def boom():
+        raise ValueError("bad image")
+
+    with pytest.raises(ValueError):
+        asyncio.run(executor.run(boom))
+    assert executor.get_statistics()["failed_total"] == 1
+
+
+def test_cancelled_queued_call_releases_its_slot():
+    executor = BoundedExecutor(max_workers=1, max_queue=2)
+    release = threading.Event()
+    ran = []
+
+    async def run():
+        running = asyncio.ensure_future(executor.run(release.wait, 5))
+        queued = asyncio.ensure_future(executor.run(ran.append, "queued"))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        during = executor.get_statistics()
+        release.set()
+        await running
+        # The freed slot admits new work
+        await executor.run(ran.append, "after")
+        return during
+
+    during = asyncio.run(run())
+
+    assert during["active"] == 1 and during["queued"] == 0
+    assert ran == ["after"]
+    stats = executor.get_statistics()
+    assert stats["active"] == 0 and stats["queued"] == 0
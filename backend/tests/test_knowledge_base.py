@@ -0,0 +1,65 @@
+"""
+Tests for the shared food knowledge base.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from app.core.heuristics import FoodHeuristics
+from app.core.knowledge_base import FoodKnowledgeBase, get_knowledge_base
+
+
+def _kb() -> FoodKnowledgeBase:
+    return FoodKnowledgeBase(
+        nutrition_db={
+            "Jollof Rice": {"calories": 180, "carbs": 35, "flags": ["carb-heavy"], "warnings": {}},
+        },
+        glycemic_index_db={"Jollof Rice": 72},
+        foods_extended=[
+            {"name": "Jollof Rice", "calories": 200, "glycemic_index": 70, "GI_category": "high",
+             "suitable_for": [], "incompatible_with": [], "common_pairings": ["plantain"]},
+            {"name": "Brown Rice", "calories": 111, "carbs": 23, "protein": 2.6, "fat": 0.9, "fiber": 1.8,
+             "glycemic_index": 50, "GI_category": "low", "suitable_for": ["type2"],
+             "incompatible_with": [], "common_pairings": []},
+        ],
+    )
+
+
+def test_process_wide_instance_is_shared():
+    assert get_knowledge_base() is get_knowledge_base()
+    assert FoodHeuristics().knowledge_base is get_knowledge_base()
+
+
+def test_tables_are_read_only():
+    kb = _kb()
+    with pytest.raises(TypeError):
+        kb.nutrition_db["Pizza"] = {}
+
+
+def test_get_food_data_prefers_curated_and_falls_back_to_extended():
+    kb = _kb()
+
+    nutrition, gi, gi_category, suitable, _, pairings = kb.get_food_data("Jollof Rice")
+    assert nutrition["calories"] == 180
+    assert gi == 72
+    assert gi_category is None
+    assert pairings == []
+
+    nutrition, gi, gi_category, suitable, _, _ = kb.get_food_data("brown rice")
+    assert nutrition["calories"] == 111
+    assert gi == 50
+    assert gi_category == "low"
+    assert suitable == ["type2"]
+
+    assert kb.get_food_data("unknown") == ({}, None, None, [], [], [])
+
+
+def test_resolve_uses_partial_then_extended():
+    kb = _kb()
+    assert kb.resolve_nutrition("rice")["calories"] == 180
+    assert kb.resolve_glycemic_index("JOLLOF") == 72
+    assert kb.resolve_nutrition("pizza") is None
+    assert kb.resolve_glycemic_index("pizza") is None
@@ -0,0 +1,63 @@
+"""
+Tests for the size-bounded LLM image encoder.
+"""
+import sys
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from PIL import Image
+
+from app.services.llm_image_encoder import LLMImageEncoder
+
+
+def _photo(size):
+    # Noise defeats JPEG compression, so byte budgets actually bind
+    rng = np.random.default_rng(0)
+    return Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+
+
+def _jpeg(image, quality=90):
+    buffered = BytesIO()
+    image.save(buffered, format="JPEG", quality=quality)
+    return buffered.getvalue()
+
+
+def test_small_jpeg_is_forwarded_untouched():
+    image = Image.new("RGB", (800, 600), (200, 120, 40))
+    original = _jpeg(image)
+    encoder = LLMImageEncoder(max_side=1024, max_bytes=500_000)
+
+    encoded = encoder.encode(image, original)
+
+    assert encoded.passthrough and encoded.data is original
+    assert (encoded.width, encoded.height) == (800, 600)
+    assert encoder.get_statistics()["passthrough"] == 1
+
+
+def test_oversized_or_non_jpeg_originals_are_reencoded():
+    image = Image.new("RGB", (2000, 1500), (200, 120, 40))
+    encoder = LLMImageEncoder(max_side=1024, max_bytes=500_000)
+    png = BytesIO()
+    image.save(png, format="PNG")
+
+    too_large = encoder.encode(image, _jpeg(image))
+    not_jpeg = encoder.encode(image.resize((400, 300)), png.getvalue())
+
+    assert not too_large.passthrough and max(too_large.width, too_large.height) == 1024
+    assert Image.open(BytesIO(too_large.data)).format == "JPEG"
+    assert not not_jpeg.passthrough and (not_jpeg.width, not_jpeg.height) == (400, 300)
+
+
+def test_byte_budget_lowers_quality_then_size():
+    encoder = LLMImageEncoder(max_side=1024, quality=90, max_bytes=60_000)
+
+    encoded = encoder.encode(_photo((1024, 768)))
+
+    assert len(encoded.data) <= 60_000
+    assert encoded.quality < 90 and encoded.width < 1024
+    stats = encoder.get_statistics()
+    assert stats["calls"] == 1 and stats["over_budget"] == 0
+    assert stats["bytes_total"] == len(encoded.data) and stats["avg_encode_ms"] > 0
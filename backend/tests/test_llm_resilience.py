@@ -0,0 +1,163 @@
+"""
+Tests for the LLM circuit breaker, concurrency limit and retry policy.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+import pytest
+from PIL import Image
+
+from app.ml.mistral import MistralFoodValidator
+from app.services.llm_resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ConcurrencyLimitError,
+    LLMResilience,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _status_error(status, headers=None):
+    request = httpx.Request("POST", "http://llm.test/v1/chat/completions")
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError(f"{status}", request=request, response=response)
+
+
+def _flaky(*outcomes):
+    """Async callable raising/returning the given outcomes in order."""
+    calls = []
+
+    async def call():
+        outcome = outcomes[len(calls)]
+        calls.append(outcome)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return call, calls
+
+
+def test_breaker_opens_on_failure_ratio_then_half_opens():
+    clock = FakeClock()
+    breaker = CircuitBreaker(window_seconds=60, min_calls=4, failure_ratio=0.5, open_seconds=30, clock=clock)
+
+    breaker.record_success()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now = 31
+    assert breaker.state == "half_open"
+    assert breaker.allow() and not breaker.allow()  # a single trial call
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 62
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.get_statistics()["opened_total"] == 2
+
+
+def test_old_failures_leave_the_window():
+    clock = FakeClock()
+    breaker = CircuitBreaker(window_seconds=10, min_calls=3, failure_ratio=0.5, clock=clock)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now = 20
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == "closed"
+    assert breaker.get_statistics()["window_calls"] == 2
+
+
+def test_retries_429_and_5xx_only():
+    resilience = LLMResilience(max_retries=2, backoff_base=0.0)
+
+    call, calls = _flaky(_status_error(429), _status_error(503), {"ok": True})
+    assert asyncio.run(resilience.call(call)) == {"ok": True}
+    assert len(calls) == 3
+
+    call, calls = _flaky(_status_error(400))
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(resilience.call(call))
+    assert len(calls) == 1
+
+    stats = resilience.get_statistics()
+    assert stats["retries"] == 2 and stats["failures"] == 0
+
+
+def test_retry_after_is_honored_but_capped():
+    resilience = LLMResilience(backoff_max=1.5)
+    assert resilience._backoff(0, _status_error(429, {"Retry-After": "0.2"}).response) == 0.2
+    assert resilience._backoff(0, _status_error(429, {"Retry-After": "120"}).response) == 1.5
+
+
+def test_open_circuit_rejects_without_calling():
+    clock = FakeClock()
+    resilience = LLMResilience(
+        breaker=CircuitBreaker(min_calls=2, failure_ratio=0.5, clock=clock),
+        max_retries=0
+    )
+    call, calls = _flaky(_status_error(502), httpx.ConnectError("refused"), {"ok": True})
+
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPError):
+            asyncio.run(resilience.call(call))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(resilience.call(call))
+
+    assert len(calls) == 2
+    stats = resilience.get_statistics()
+    assert stats["breaker"]["state"] == "open" and stats["rejected_open"] == 1 and stats["failures"] == 2
+
+
+def test_concurrency_limit_sheds_after_bounded_wait():
+    resilience = LLMResilience(max_concurrency=1, acquire_timeout=0.05)
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        return "done"
+
+    async def burst():
+        return await asyncio.gather(resilience.call(slow), resilience.call(slow), return_exceptions=True)
+
+    results = asyncio.run(burst())
+
+    assert results.count("done") == 1
+    assert sum(isinstance(r, ConcurrencyLimitError) for r in results) == 1
+    assert resilience.get_statistics()["rejected_busy"] == 1
+
+
+def test_validator_skips_open_circuit_at_once():
+    breaker = CircuitBreaker(min_calls=1)
+    breaker.record_failure()
+    validator = MistralFoodValidator(api_key="test-key", resilience=LLMResilience(breaker=breaker))
+    posts = []
+
+    async def post(image_base64, prompt):
+        posts.append(prompt)
+        return {}
+
+    validator._post_chat_completion = post
+    detections = [{"name": "rice", "confidence": 0.6, "source": "yolo"}]
+
+    assert validator.validate_detections(Image.new("RGB", (64, 64)), detections) == []
+    assert posts == [] and validator.image_encoder.get_statistics()["calls"] == 0
+    assert validator.resilience.get_statistics()["rejected_open"] == 1
+    validator.close()
@@ -0,0 +1,117 @@
+"""
+Tests for the persistent Mistral validation response cache.
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from PIL import Image
+
+from app.ml.mistral import MistralFoodValidator
+from app.services.inference_executor import BoundedExecutor
+from app.services.scan_cache import ScanResultCache, SqliteCacheBackend
+
+FOODS = [
+    {"name": "rice", "confidence": 0.9, "source": "LLM"},
+    {"name": "plantain", "confidence": 0.4, "source": "LLM"},
+]
+
+
+def _api_response(content):
+    return {"choices": [{"message": {"content": content}}]}
+
+
+def _validator(path, responses):
+    cache = ScanResultCache(SqliteCacheBackend(path, table="mistral_responses"))
+    validator = MistralFoodValidator(api_key="test-key", response_cache=cache)
+    calls = []
+
+    async def fake_call(image_base64, prompt):
+        calls.append(prompt)
+        return responses.pop(0)
+
+    validator._call_mistral_api_async = fake_call
+    return validator, calls
+
+
+def _detections(*names):
+    return [{"name": name, "confidence": 0.5, "source": "yolo"} for name in names]
+
+
+def test_repeat_validation_is_served_from_disk(tmp_path):
+    image = Image.new("RGB", (32, 32), (120, 80, 40))
+    path = tmp_path / "mistral.sqlite3"
+    validator, calls = _validator(path, [_api_response(json.dumps({"validated_foods": FOODS}))])
+
+    first = validator.validate_detections(image, _detections("rice", "plantain"), confidence_threshold=0.3)
+    # Same names in another order, stricter threshold, fresh process on the same file
+    restarted, restarted_calls = _validator(path, [])
+    second = restarted.validate_detections(image, _detections("plantain", "rice"), confidence_threshold=0.5)
+
+    assert len(calls) == 1 and not restarted_calls
+    assert [f["name"] for f in first] == ["rice", "plantain"]
+    assert [f["name"] for f in second] == ["rice"]
+    assert restarted.response_cache.get_statistics()["hits"] == 1
+
+
+def test_cache_key_depends_on_image_and_names(tmp_path):
+    validator, calls = _validator(tmp_path / "mistral.sqlite3", [
+        _api_response(json.dumps({"validated_foods": FOODS})) for _ in range(3)
+    ])
+
+    validator.validate_detections(Image.new("RGB", (32, 32), 10), _detections("rice"))
+    validator.validate_detections(Image.new("RGB", (32, 32), 11), _detections("rice"))
+    validator.validate_detections(Image.new("RGB", (32, 32), 10), _detections("rice", "beans"))
+
+    assert len(calls) == 3
+
+
+def test_malformed_responses_are_not_cached(tmp_path):
+    image = Image.new("RGB", (32, 32))
+    validator, calls = _validator(tmp_path / "mistral.sqlite3", [
+        _api_response("sorry, I cannot help"),
+        _api_response(json.dumps({"validated_foods": FOODS})),
+    ])
+
+    assert validator.validate_detections(image, _detections("rice")) == []
+    assert len(validator.validate_detections(image, _detections("rice"))) == 2
+    assert len(calls) == 2
+
+
+def test_detection_and_validation_are_cached_separately(tmp_path):
+    import asyncio
+
+    image = Image.new("RGB", (32, 32), 10)
+    validator, calls = _validator(tmp_path / "mistral.sqlite3", [
+        _api_response(json.dumps({"validated_foods": FOODS})) for _ in range(2)
+    ])
+
+    detected = asyncio.run(validator.detect_foods_async(image))
+    again = asyncio.run(validator.detect_foods_async(image, confidence_threshold=0.5))
+    validator.validate_detections(image, _detections("rice"))
+
+    assert len(calls) == 2
+    assert calls[0] == MistralFoodValidator.DETECTION_PROMPT
+    assert [f["name"] for f in detected] == ["rice", "plantain"]
+    assert [f["name"] for f in again] == ["rice"]
+
+
+def test_blocking_steps_run_on_the_injected_executor(tmp_path):
+    executor = BoundedExecutor(max_workers=1, max_queue=4)
+    validator, calls = _validator(tmp_path / "mistral.sqlite3", [_api_response(json.dumps({"validated_foods": FOODS}))])
+    validator._run_blocking = executor.run
+    image = Image.new("RGB", (32, 32), (10, 20, 30))
+
+    async def run():
+        first = await validator.validate_detections_async(image, _detections("rice"))
+        second = await validator.validate_detections_async(image, _detections("rice"))
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == second and len(calls) == 1
+    # Miss: lookup + encode + store; hit: lookup
+    assert executor.get_statistics()["completed_total"] == 4
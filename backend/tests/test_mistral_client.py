@@ -0,0 +1,97 @@
+"""
+Tests for the pooled async Mistral client against a local stand-in server.
+"""
+import asyncio
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from PIL import Image
+
+from app.ml.mistral import MistralFoodValidator
+
+CONTENT = json.dumps({"validated_foods": [{"name": "rice", "confidence": 0.9, "source": "LLM"}]})
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((self.client_address, self.headers["Authorization"], body["model"]))
+        payload = json.dumps({"choices": [{"message": {"content": CONTENT}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _validator(server):
+    validator = MistralFoodValidator(api_key="test-key")
+    validator.api_url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    return validator
+
+
+DETECTIONS = [{"name": "rice", "confidence": 0.6, "source": "yolo"}]
+
+
+def test_async_calls_reuse_one_connection(server):
+    validator = _validator(server)
+    image = Image.new("RGB", (16, 16))
+
+    async def run():
+        results = [await validator.validate_detections_async(image, DETECTIONS) for _ in range(3)]
+        await validator.aclose()
+        return results
+
+    results = asyncio.run(run())
+
+    assert all(r[0]["name"] == "rice" for r in results)
+    assert len(server.requests) == 3
+    assert len({client for client, _, _ in server.requests}) == 1
+    assert server.requests[0][1:] == ("Bearer test-key", validator.model)
+
+
+def test_sync_wrapper_shares_background_client(server):
+    validator = _validator(server)
+    image = Image.new("RGB", (16, 16))
+
+    results = [validator.validate_detections(image, DETECTIONS) for _ in range(3)]
+    validator.close()
+
+    assert all(r[0]["name"] == "rice" for r in results)
+    assert len({client for client, _, _ in server.requests}) == 1
+
+
+def test_http_errors_degrade_to_empty_result(server):
+    validator = _validator(server)
+
+    async def failing_post(*args, **kwargs):
+        raise RuntimeError("connection reset")
+
+    async def run():
+        validator._get_client().post = failing_post
+        return await validator.validate_detections_async(Image.new("RGB", (16, 16)), DETECTIONS)
+
+    assert asyncio.run(run()) == []
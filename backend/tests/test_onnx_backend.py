@@ -0,0 +1,110 @@
+"""
+Tests for the native ONNX Runtime YOLO backend (letterbox, decode, NMS).
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+
+from app.ml.onnx_backend import (
+    LetterboxBuffers,
+    OnnxYOLOSession,
+    decode_predictions,
+    letterbox_into,
+    nms,
+    scale_boxes,
+)
+
+
+def _prediction(rows):
+    """Build a (4 + 2 classes, anchors) raw output from (cx, cy, w, h, score0, score1) rows."""
+    return np.asarray(rows, dtype=np.float32).T
+
+
+def test_letterbox_pads_and_centers():
+    image = np.full((100, 200, 3), 7, dtype=np.uint8)
+    canvas = LetterboxBuffers().canvas(64)
+
+    gain, (left, top) = letterbox_into(image, canvas)
+
+    assert gain == pytest.approx(0.32)
+    assert (left, top) == (0, 16)
+    assert (canvas[16:48] == 7).all()
+    assert (canvas[:16] == 114).all() and (canvas[48:] == 114).all()
+
+
+def test_buffers_are_reused_per_shape():
+    buffers = LetterboxBuffers()
+
+    assert buffers.canvas(64) is buffers.canvas(64)
+    assert buffers.blob(2, 64) is buffers.blob(2, 64)
+    assert buffers.blob(2, 64).shape == (2, 3, 64, 64)
+
+
+def test_nms_suppresses_overlaps():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [20, 20, 30, 30]], dtype=np.float32)
+    scores = np.array([0.9, 0.8, 0.7], dtype=np.float32)
+
+    assert nms(boxes, scores, 0.45).tolist() == [0, 2]
+
+
+def test_decode_filters_and_keeps_overlapping_boxes_of_other_classes():
+    prediction = _prediction([
+        (20, 20, 10, 10, 0.90, 0.05),
+        (20, 20, 10, 10, 0.10, 0.80),  # same box, different class: kept
+        (21, 21, 10, 10, 0.70, 0.00),  # overlaps the first, same class: suppressed
+        (50, 50, 10, 10, 0.10, 0.10),  # below threshold
+    ])
+
+    class_ids, confidences, boxes = decode_predictions(prediction, 0.25, 0.45)
+
+    assert class_ids.tolist() == [0, 1]
+    assert confidences.tolist() == pytest.approx([0.9, 0.8])
+    assert boxes[0].tolist() == [15, 15, 25, 25]
+
+
+def test_decode_with_no_candidates():
+    class_ids, confidences, boxes = decode_predictions(_prediction([(5, 5, 2, 2, 0.1, 0.1)]), 0.25, 0.45)
+
+    assert class_ids.size == confidences.size == 0
+    assert boxes.shape == (0, 4)
+
+
+def test_scale_boxes_maps_back_and_clips():
+    boxes = np.array([[0, 16, 64, 48], [-5, 10, 70, 60]], dtype=np.float32)
+
+    scaled = scale_boxes(boxes, 0.32, (0, 16), (100, 200))
+
+    assert scaled[0].tolist() == pytest.approx([0, 0, 200, 100])
+    assert scaled[1].tolist() == pytest.approx([0, 0, 200, 100])
+
+
+def test_session_end_to_end(tmp_path):
+    onnx = pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    from onnx import TensorProto, helper, numpy_helper
+
+    # Model ignores pixel values and always emits one box at the canvas center
+    raw = _prediction([(32, 32, 16, 16, 0.1, 0.9)])[None]
+    graph = helper.make_graph(
+        [helper.make_node("Constant", [], ["output0"], value=numpy_helper.from_array(raw))],
+        "fake_yolo",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, ["batch", 3, 64, 64])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, [1, 6, 1])],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 8
+    helper.set_model_props(model, {"names": "{0: 'rice', 1: 'beans'}"})
+    path = tmp_path / "fake.onnx"
+    onnx.save(model, str(path))
+
+    session = OnnxYOLOSession(path, intra_op_threads=1, graph_optimization="basic")
+    class_ids, confidences, boxes = session.detect([np.zeros((100, 200, 3), dtype=np.uint8)], 0.25, 0.45)[0]
+
+    assert session.names == {0: "rice", 1: "beans"}
+    assert session.static_size == 64 and session.supports_batching
+    assert class_ids.tolist() == [1]
+    assert boxes[0].tolist() == pytest.approx([75, 25, 125, 75])
@@ -0,0 +1,30 @@
+"""
+The API must start without the legacy ML stack (ultralytics, torch,
+transformers) so the onnxruntime deployment stays lightweight.
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+SCRIPT = """
+import importlib.abc, os, sys
+
+class Block(importlib.abc.MetaPathFinder):
+    def find_spec(self, name, path, target=None):
+        if name.split(".")[0] in ("ultralytics", "torch", "transformers"):
+            raise ImportError(f"blocked: {name}")
+
+sys.meta_path.insert(0, Block())
+os.environ["YOLO_BACKEND"] = "onnxruntime"
+import app.main
+assert not any(m.split(".")[0] in ("ultralytics", "torch", "transformers") for m in sys.modules)
+"""
+
+
+def test_api_imports_without_ultralytics_torch_or_transformers():
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
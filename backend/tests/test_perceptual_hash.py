@@ -0,0 +1,82 @@
+"""
+Tests for dHash near-duplicate detection.
+"""
+import sys
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from app.services.perceptual_hash import PerceptualHashIndex, dhash
+
+
+def _photo(seed):
+    rng = np.random.default_rng(seed)
+    small = Image.fromarray(rng.integers(0, 255, (60, 80, 3), dtype=np.uint8))
+    return small.resize((1000, 750), Image.BICUBIC).filter(ImageFilter.GaussianBlur(8))
+
+
+def _reencode(image, quality=60):
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return Image.open(buffer)
+
+
+def _distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def test_dhash_survives_reencode_resize_and_small_crop():
+    photo = _photo(1)
+    original = dhash(photo)
+
+    assert _distance(original, dhash(_reencode(photo))) <= 2
+    assert _distance(original, dhash(photo.resize((640, 480)))) <= 2
+    assert _distance(original, dhash(photo.crop((15, 11, 985, 739)))) <= 6
+    assert _distance(original, dhash(_photo(2))) > 16
+
+
+def test_index_returns_closest_match_within_threshold():
+    index = PerceptualHashIndex(max_entries=4, max_distance=3, min_hash_bits=0)
+    index.add(0b1111, "a")
+    index.add(0b1111 << 20, "b")
+
+    assert index.find(0b0111) == (1, "a")
+    assert index.find(0b1111 << 20 | 0b11) == (2, "b")
+    assert index.find((1 << 64) - 1) is None
+
+    stats = index.get_statistics()
+    assert (stats["lookups"], stats["reuses"], stats["reuse_rate"]) == (3, 2, 0.667)
+
+
+def test_index_overwrites_oldest_when_full():
+    index = PerceptualHashIndex(max_entries=2, max_distance=0, min_hash_bits=0)
+    index.add(1, "first")
+    index.add(2, "second")
+    index.add(4, "third")
+
+    assert index.find(1) is None
+    assert index.find(4) == (0, "third")
+    assert index.get_statistics()["entries"] == 2
+
+
+def test_featureless_hashes_are_never_stored_or_matched():
+    index = PerceptualHashIndex(max_entries=4, max_distance=6, min_hash_bits=8)
+    flat = dhash(Image.new("RGB", (640, 480), (200, 200, 200)))
+    gradient = dhash(Image.fromarray(np.tile(np.linspace(0, 255, 480).astype(np.uint8), (100, 1))))
+    photo = dhash(_photo(1))
+
+    assert flat == 0 and gradient == (1 << 64) - 1
+    assert not index.is_distinctive(flat) and not index.is_distinctive(gradient)
+    assert index.is_distinctive(photo)
+
+    index.add(flat, "blank plate")
+    index.add(photo, "meal")
+    assert index.find(flat) is None
+    assert index.find(0b111) is None
+    assert index.find(photo) == (0, "meal")
+    stats = index.get_statistics()
+    assert (stats["entries"], stats["skipped_featureless"]) == (1, 2)
@@ -0,0 +1,122 @@
+"""
+Tests for the detector process pool (shared-memory hand-off and restarts).
+Uses a lightweight fake detector so no model weights are needed.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.services.inference_executor import ExecutorSaturatedError
+from app.services.process_pool import DetectionPoolUnavailableError, DetectionProcessPool, WorkerCrashedError
+
+
+class FakeDetector:
+    """Reports the mean pixel value so results prove the image arrived intact."""
+
+    def detect_foods(self, image, confidence_threshold=0.25, iou_threshold=0.45, imgsz=320):
+        mean = float(np.asarray(image).mean())
+        if mean == 13.0:
+            os._exit(1)  # simulate a native crash inside inference
+        if mean == 77.0:
+            time.sleep(1.0)
+        height, width = image.shape[:2]
+        return [{"name": "rice", "confidence": mean / 255.0, "bbox": [0, 0, width, height], "source": "yolo"}]
+
+
+def make_fake_detector():
+    return FakeDetector()
+
+
+def make_broken_detector():
+    raise RuntimeError("model file not found")
+
+
+def _image(value, size=(32, 24)):
+    return Image.new("RGB", size, (value, value, value))
+
+
+@pytest.fixture
+def pool():
+    pool = DetectionProcessPool(num_workers=2, job_timeout=30, detector_factory=make_fake_detector)
+    yield pool
+    pool.shutdown()
+
+
+def test_detect_foods_round_trips_through_shared_memory(pool):
+    detections = pool.detect_foods(_image(51))
+
+    assert detections == [{"name": "rice", "confidence": 0.2, "bbox": [0.0, 0.0, 32.0, 24.0], "source": "yolo"}]
+
+
+def test_detect_foods_batch_preserves_order(pool):
+    values = [10, 60, 110, 160, 210]
+    results = pool.detect_foods_batch([_image(v) for v in values])
+
+    assert [round(r[0]["confidence"] * 255) for r in results] == values
+    stats = pool.get_statistics()
+    assert stats["completed_total"] == len(values)
+    assert stats["in_flight"] == 0
+
+
+def test_crashed_worker_fails_job_and_is_restarted(pool):
+    future = pool.submit(_image(13))
+    with pytest.raises(WorkerCrashedError):
+        future.result(30)
+
+    deadline = time.time() + 30
+    while pool.get_statistics()["workers_alive"] < 2 and time.time() < deadline:
+        time.sleep(0.1)
+
+    stats = pool.get_statistics()
+    assert stats["restarts_total"] == 1
+    assert stats["workers_alive"] == 2
+    assert pool.detect_foods(_image(51))[0]["name"] == "rice"
+    # Each worker has its own result pipe: both still deliver after the crash
+    assert len(pool.detect_foods_batch([_image(v) for v in (20, 40, 60, 80)])) == 4
+    assert pool.get_statistics()["completed_total"] == 5
+
+
+def test_submit_rejects_past_max_pending():
+    pool = DetectionProcessPool(num_workers=1, job_timeout=30, detector_factory=make_fake_detector, max_pending=1, retry_after=2)
+    try:
+        slow = pool.submit(_image(77))
+        with pytest.raises(ExecutorSaturatedError) as exc_info:
+            pool.submit(_image(51))
+        assert exc_info.value.retry_after == 2
+        assert slow.result(30)[0]["name"] == "rice"
+        assert pool.submit(_image(51)).result(30)[0]["name"] == "rice"
+        assert pool.get_statistics()["rejected_total"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_init_failures_back_off_then_mark_pool_failed():
+    pool = DetectionProcessPool(
+        num_workers=1, job_timeout=30, detector_factory=make_broken_detector,
+        restart_backoff=0.2, max_init_failures=3
+    )
+    try:
+        start = time.monotonic()
+        deadline = start + 60
+        while not pool.failed and time.monotonic() < deadline:
+            time.sleep(0.05)
+        elapsed = time.monotonic() - start
+
+        stats = pool.get_statistics()
+        assert stats["failed"] and stats["workers_failed"] == 1
+        # Three starts: the first plus two restarts, 0.2 s then 0.4 s apart
+        assert stats["restarts_total"] == 2
+        assert elapsed >= 0.6
+        with pytest.raises(DetectionPoolUnavailableError):
+            pool.submit(_image(51))
+        time.sleep(1.0)
+        assert pool.get_statistics()["restarts_total"] == 2
+    finally:
+        pool.shutdown()
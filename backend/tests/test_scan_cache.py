@@ -0,0 +1,86 @@
+"""
+Tests for the content-addressed scan result cache and its backends.
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+
+from app.services.scan_cache import MemoryCacheBackend, ScanResultCache, SqliteCacheBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCacheBackend(max_entries=3, ttl_seconds=60)
+    return SqliteCacheBackend(tmp_path / "cache.sqlite3", max_entries=3, ttl_seconds=60)
+
+
+def test_round_trip_and_statistics(backend):
+    cache = ScanResultCache(backend, version="v1")
+    key = cache.make_key("abc", "scan-food", imgsz=640, diabetes=True)
+
+    assert cache.get(key) is None
+    cache.set(key, {"detected_items": [{"name": "rice", "confidence": np.float32(0.5)}], "status": "success"})
+    assert cache.get(key) == {"detected_items": [{"name": "rice", "confidence": 0.5}], "status": "success"}
+
+    stats = cache.get_statistics()
+    assert (stats["hits"], stats["misses"], stats["writes"], stats["entries"]) == (1, 1, 1, 1)
+    assert stats["bytes_served"] == stats["bytes_written"] == stats["stored_bytes"] > 0
+
+
+def test_key_covers_parameters_and_version(backend):
+    cache = ScanResultCache(backend, version="v1")
+    base = cache.make_key("abc", "scan-food", imgsz=640, diabetes=True)
+
+    assert base == cache.make_key("abc", "scan-food", diabetes=True, imgsz=640)
+    assert base != cache.make_key("abc", "scan-food", imgsz=640, diabetes=False)
+    assert base != cache.make_key("abd", "scan-food", imgsz=640, diabetes=True)
+    assert base != cache.make_key("abc", "analyze-meal", imgsz=640, diabetes=True)
+    assert base != ScanResultCache(backend, version="v2").make_key("abc", "scan-food", imgsz=640, diabetes=True)
+
+
+def test_memory_backend_evicts_lru_and_expires():
+    backend = MemoryCacheBackend(max_entries=2, ttl_seconds=60)
+    backend.set("a", b"1")
+    backend.set("b", b"2")
+    backend.get("a")
+    backend.set("c", b"3")
+
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1"
+
+    backend.ttl = -1
+    backend.set("d", b"4")
+    assert backend.get("d") is None
+
+
+def test_sqlite_backend_is_shared_and_bounded(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    writer = SqliteCacheBackend(path, max_entries=2, ttl_seconds=60)
+    reader = SqliteCacheBackend(path, max_entries=2, ttl_seconds=60)
+
+    for i in range(4):
+        writer.set(f"k{i}", b"x" * i)
+        time.sleep(0.01)
+    writer.prune()
+
+    assert reader.get("k3") == b"xxx"
+    assert reader.get("k0") is None
+    assert reader.size() == (2, 5)
+
+
+def test_pipeline_version_tracks_the_food_catalog(tmp_path, monkeypatch):
+    import app.main as main
+
+    for name in main.CATALOG_FILES:
+        (tmp_path / name).write_text("{}")
+    monkeypatch.setattr(main, "DATA_DIR", tmp_path)
+    before = main._pipeline_version()
+
+    (tmp_path / "foods_extended.json").write_text('[{"name": "ogi"}]')
+    assert main._pipeline_version() != before
@@ -0,0 +1,157 @@
+"""
+Tests for the sequential and parallel YOLO + Mistral pipeline modes.
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from PIL import Image
+
+from app.services import scan_pipeline
+from app.services.scan_pipeline import drain_late_llm_tasks, run_detection_stages
+
+YOLO = [{"name": "rice", "confidence": 0.8, "source": "yolo"}]
+LLM = [{"name": "beans", "confidence": 0.7, "source": "LLM"}]
+
+
+class FakeValidator:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.cancelled = False
+        self.finished = 0
+
+    async def validate_detections_async(self, image, yolo_detections, confidence_threshold=0.3, source_bytes=None):
+        self.calls.append(("validate", [d["name"] for d in yolo_detections]))
+        await asyncio.sleep(self.delay)
+        self.finished += 1
+        return list(LLM)
+
+    async def detect_foods_async(self, image, confidence_threshold=0.3, source_bytes=None):
+        self.calls.append(("detect", None))
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        self.finished += 1
+        return list(LLM)
+
+
+def _yolo(delay=0.0, error=None):
+    async def run():
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return list(YOLO)
+    return run
+
+
+def _run(**kwargs):
+    return asyncio.run(run_detection_stages(Image.new("RGB", (8, 8)), **kwargs))
+
+
+def test_sequential_validates_yolo_names():
+    validator = FakeValidator()
+    yolo, llm, _ = _run(run_yolo=_yolo(), mistral_validator=validator, mode="sequential")
+
+    assert yolo == YOLO and llm == LLM
+    assert validator.calls == [("validate", ["rice"])]
+
+
+def test_parallel_overlaps_yolo_and_llm():
+    validator = FakeValidator(delay=0.2)
+    start = time.perf_counter()
+    yolo, llm, _ = _run(run_yolo=_yolo(delay=0.2), mistral_validator=validator, mode="parallel")
+    elapsed = time.perf_counter() - start
+
+    assert yolo == YOLO and llm == LLM
+    assert validator.calls == [("detect", None)]
+    assert elapsed < 0.35
+
+
+def test_parallel_cancels_llm_when_yolo_fails():
+    validator = FakeValidator(delay=1.0)
+    with pytest.raises(RuntimeError):
+        _run(run_yolo=_yolo(delay=0.05, error=RuntimeError("boom")), mistral_validator=validator, mode="parallel")
+    assert validator.cancelled
+
+
+def test_without_validator_runs_yolo_only():
+    assert _run(run_yolo=_yolo(), mistral_validator=None, mode="parallel") == (YOLO, [], False)
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        _run(run_yolo=_yolo(), mistral_validator=FakeValidator(), mode="both")
+
+
+@pytest.mark.parametrize("mode", ["sequential", "parallel"])
+def test_late_llm_returns_partial_and_finishes_in_background(mode):
+    validator = FakeValidator(delay=0.3)
+
+    async def scan():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await run_detection_stages(
+            Image.new("RGB", (8, 8)), _yolo(delay=0.05), validator, mode=mode, deadline=start + 0.1
+        )
+        elapsed = loop.time() - start
+        in_flight = scan_pipeline.get_statistics()["late_llm_in_flight"]
+        await drain_late_llm_tasks()
+        return results, elapsed, in_flight
+
+    (yolo, llm, timed_out), elapsed, in_flight = asyncio.run(scan())
+
+    assert yolo == YOLO and llm == [] and timed_out
+    assert elapsed < 0.2
+    assert in_flight == 1
+    # The shielded request kept running, so the validator could cache its answer
+    assert validator.finished == 1 and not validator.cancelled
+
+
+def test_llm_within_deadline_is_not_partial():
+    validator = FakeValidator(delay=0.05)
+
+    async def scan():
+        deadline = asyncio.get_running_loop().time() + 1.0
+        return await run_detection_stages(Image.new("RGB", (8, 8)), _yolo(), validator, mode="parallel", deadline=deadline)
+
+    assert asyncio.run(scan()) == (YOLO, LLM, False)
+
+
+def test_late_llm_answer_reaches_the_response_cache(tmp_path):
+    import json
+
+    from app.ml.mistral import MistralFoodValidator
+    from app.services.scan_cache import ScanResultCache, SqliteCacheBackend
+
+    cache = ScanResultCache(SqliteCacheBackend(tmp_path / "mistral.sqlite3", table="mistral_responses"))
+    validator = MistralFoodValidator(api_key="test-key", response_cache=cache)
+    calls = []
+
+    async def slow_call(image_base64, prompt):
+        calls.append(prompt)
+        await asyncio.sleep(0.3)
+        return {"choices": [{"message": {"content": json.dumps({"validated_foods": LLM})}}]}
+
+    validator._call_mistral_api_async = slow_call
+    image = Image.new("RGB", (16, 16), 40)
+
+    async def scans():
+        deadline = asyncio.get_running_loop().time() + 0.05
+        first = await run_detection_stages(image, _yolo(), validator, mode="parallel", deadline=deadline)
+        await drain_late_llm_tasks()
+        deadline = asyncio.get_running_loop().time() + 0.05
+        second = await run_detection_stages(image, _yolo(), validator, mode="parallel", deadline=deadline)
+        return first, second
+
+    first, second = asyncio.run(scans())
+
+    assert first.llm_timed_out and first.llm == []
+    assert not second.llm_timed_out and [f["name"] for f in second.llm] == ["beans"]
+    assert len(calls) == 1
@@ -0,0 +1,72 @@
+"""
+Tests for streaming, size-bounded upload ingestion.
+"""
+import asyncio
+import hashlib
+import sys
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+
+from app.services.upload_ingest import ingest_upload, sniff_format
+
+
+def _encode(size=(64, 48), fmt="JPEG"):
+    buffer = BytesIO()
+    Image.new("RGB", size, (200, 100, 50)).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def _ingest(data, max_bytes=1024 * 1024, max_pixels=10_000_000, declared_size=None):
+    upload = UploadFile(file=BytesIO(data), size=declared_size)
+    return asyncio.run(ingest_upload(upload, max_bytes=max_bytes, max_pixels=max_pixels, chunk_size=256))
+
+
+def test_accepts_valid_upload_and_hands_back_rewound_file():
+    data = _encode()
+
+    result = _ingest(data)
+
+    assert (result.format, result.width, result.height, result.size) == ("JPEG", 64, 48, len(data))
+    assert result.sha256 == hashlib.sha256(data).hexdigest()
+    assert result.file.tell() == 0
+    assert Image.open(result.file).size == (64, 48)
+
+
+def test_rejects_oversized_stream_and_declared_size():
+    data = _encode((256, 256), "PNG")
+
+    with pytest.raises(HTTPException) as streamed:
+        _ingest(data, max_bytes=len(data) - 1)
+    with pytest.raises(HTTPException) as declared:
+        _ingest(data, declared_size=10 * 1024 * 1024)
+
+    assert streamed.value.status_code == declared.value.status_code == 413
+
+
+def test_rejects_unsupported_and_mismatched_content():
+    with pytest.raises(HTTPException) as text:
+        _ingest(b"%PDF-1.4 not an image")
+    with pytest.raises(HTTPException) as truncated:
+        _ingest(b"\x89PNG\r\n\x1a\n" + b"\x00" * 32)
+
+    assert text.value.status_code == 415
+    assert truncated.value.status_code == 400
+
+
+def test_rejects_decompression_bomb_from_header_alone():
+    with pytest.raises(HTTPException) as exc:
+        _ingest(_encode((4000, 3000)), max_pixels=1_000_000)
+
+    assert exc.value.status_code == 413
+
+
+def test_sniff_format():
+    assert sniff_format(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "WEBP"
+    assert sniff_format(b"GIF89a") == "GIF"
+    assert sniff_format(b"\x00\x00\x00\x18ftypheic") is None
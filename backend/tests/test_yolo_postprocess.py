@@ -0,0 +1,115 @@
+"""
+Tests for vectorized YOLO result parsing, class-name lookup and the batched
+inference fallback.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import threading
+
+import numpy as np
+from PIL import Image
+
+from app.ml.yolo import YOLOFoodDetector, build_class_name_table, is_batch_shape_error, lookup_class_names
+
+
+class FakeBoxes:
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=np.float32)
+        self.xyxy, self.conf, self.cls = self.data[:, :4], self.data[:, 4], self.data[:, 5]
+
+    def __len__(self):
+        return len(self.data)
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.boxes = FakeBoxes(data)
+
+
+def _detector(class_names):
+    detector = YOLOFoodDetector.__new__(YOLOFoodDetector)
+    detector.class_names = class_names
+    detector._name_table = build_class_name_table(class_names)
+    return detector
+
+
+def test_class_name_table_handles_gaps_and_lists():
+    table = build_class_name_table({0: "Jollof Rice", 2: "Beans"})
+
+    assert table.tolist() == ["jollof rice", "class_1", "beans"]
+    assert build_class_name_table(["Rice", "Egg"]).tolist() == ["rice", "egg"]
+    assert lookup_class_names(table, np.array([2, 0, 7])) == ["beans", "jollof rice", "class_7"]
+
+
+def test_parse_result_matches_per_box_output():
+    detector = _detector({0: "Rice", 1: "Plantain"})
+    result = FakeResult([
+        [10, 20, 110, 220, 0.875, 1],
+        [0, 0, 50, 50, 0.25, 0],
+    ])
+
+    assert detector._parse_result(result) == [
+        {"name": "plantain", "confidence": 0.875, "bbox": [10.0, 20.0, 110.0, 220.0], "source": "yolo"},
+        {"name": "rice", "confidence": 0.25, "bbox": [0.0, 0.0, 50.0, 50.0], "source": "yolo"},
+    ]
+
+
+def test_parse_result_without_boxes():
+    detector = _detector({0: "Rice"})
+
+    assert detector._parse_result(FakeResult(np.empty((0, 6)))) == []
+
+
+class FailingBatchModel:
+    """Ultralytics-style model whose batched predict raises, single-image predict works."""
+
+    def __init__(self, error):
+        self.error = error
+        self.batched_calls = 0
+
+    def predict(self, images, **kwargs):
+        if isinstance(images, list):
+            self.batched_calls += 1
+            raise self.error
+        return [FakeResult([[0, 0, 10, 10, 0.5, 0]])]
+
+
+def _batch_detector(error):
+    detector = _detector({0: "Rice"})
+    detector.backend = "ultralytics"
+    detector.model = FailingBatchModel(error)
+    detector._batch_supported = True
+    detector._predict_lock = threading.Lock()
+    return detector
+
+
+def test_fixed_batch_model_disables_batching():
+    error = RuntimeError(
+        "[ONNXRuntimeError] : 2 : INVALID_ARGUMENT : Got invalid dimensions for input: images "
+        "for the following indices\n index: 0 Got: 2 Expected: 1"
+    )
+    detector = _batch_detector(error)
+    images = [Image.new("RGB", (16, 16)), Image.new("RGB", (16, 16))]
+
+    for _ in range(2):
+        results = detector.detect_foods_batch(images)
+        assert [[d["name"] for d in r] for r in results] == [["rice"], ["rice"]]
+    assert is_batch_shape_error(error)
+    assert detector._batch_supported is False
+    assert detector.model.batched_calls == 1
+
+
+def test_other_batch_errors_fall_back_without_disabling_batching():
+    error = RuntimeError("CUDA out of memory")
+    detector = _batch_detector(error)
+    images = [Image.new("RGB", (16, 16)), Image.new("RGB", (16, 16))]
+
+    for _ in range(2):
+        results = detector.detect_foods_batch(images)
+        assert [[d["name"] for d in r] for r in results] == [["rice"], ["rice"]]
+    assert not is_batch_shape_error(error)
+    assert detector._batch_supported is True
+    assert detector.model.batched_calls == 2
@@ -0,0 +1,74 @@
+"""
+Batch Enrichment
+Offline nutrition enrichment of stored detections through
+FoodHeuristics.enrich_many.
+
+Reads JSON Lines where each line is either a list of detections or an
+object with a "detections" (or "detected_items") list; each detection needs
+"name", "confidence" and "source". Writes one line per input with the
+enriched items and their meal summary. All items of the file are enriched in
+one enrich_many call, so each distinct food is resolved once.
+
+Usage (from backend/):
+    python -m tools.enrich_batch scans.jsonl -o enriched.jsonl
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.heuristics import FoodHeuristics
+
+
+def _detections(record: Any) -> List[Dict[str, Any]]:
+    if isinstance(record, list):
+        return record
+    return record.get("detections") or record.get("detected_items") or []
+
+
+def enrich_records(heuristics: FoodHeuristics, records: List[Any]) -> List[Dict[str, Any]]:
+    """Enriched items and meal summary per record, from a single enrich_many pass."""
+    batches = [_detections(record) for record in records]
+    enriched = heuristics.enrich_many(item for batch in batches for item in batch)
+
+    results, start = [], 0
+    for batch in batches:
+        items = enriched[start:start + len(batch)]
+        start += len(batch)
+        results.append({"detected_items": items, "meal_summary": heuristics.calculate_meal_summary(items)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("input", type=Path, help="JSON Lines file of detections")
+    parser.add_argument("-o", "--output", type=Path, default=None, help="output file (default: stdout)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with args.input.open() as f:
+        records = [json.loads(line) for line in f if line.strip()]
+
+    heuristics = FoodHeuristics()
+    start = time.perf_counter()
+    results = enrich_records(heuristics, records)
+    elapsed = time.perf_counter() - start
+
+    out = args.output.open("w") if args.output else sys.stdout
+    try:
+        for result in results:
+            out.write(json.dumps(result) + "\n")
+    finally:
+        if args.output:
+            out.close()
+    items = sum(len(result["detected_items"]) for result in results)
+    print(f"Enriched {items} items in {len(results)} records in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
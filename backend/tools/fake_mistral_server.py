@@ -0,0 +1,301 @@
+"""
+Fake Mistral API
+Local stand-in for the Mistral chat completions endpoint, for offline
+latency and load testing of the YOLO + Mistral pipeline.
+
+Answers POST /v1/chat/completions in the shape MistralFoodValidator parses
+(choices[0].message.content holding a {"validated_foods": [...]} JSON
+string). Foods named in a validation prompt's "YOLO DETECTED:" line are
+confirmed, plus the configured extra foods. Provider behavior is
+configurable:
+
+- latency: fixed, uniform, exponential or lognormal around --latency-ms
+- errors: random 500/502/503 at --error-rate
+- rate limiting: 429 bursts of --burst-seconds every --burst-every seconds
+- malformed answers: prose, truncated JSON or a missing "choices" key at
+  --malformed-rate
+
+GET /stats returns request and outcome counters.
+
+Usage (from backend/):
+    python -m tools.fake_mistral_server --port 8089 --latency-ms 900 --error-rate 0.05
+    MISTRAL_API_URL=http://127.0.0.1:8089/v1/chat/completions MISTRAL_API_KEY=fake \\
+        uvicorn app.main:app
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+MALFORMED_KINDS = ("prose", "truncated", "no_choices")
+
+DEFAULT_FOODS = [
+    {"name": "jollof rice", "confidence": 0.86, "source": "LLM", "notes": "clearly visible"},
+    {"name": "fried plantain", "confidence": 0.64, "source": "LLM", "notes": "side portion"},
+]
+
+_YOLO_LINE = re.compile(r"YOLO DETECTED:\s*(.*)")
+
+
+class FakeProviderProfile:
+    """
+    Simulated provider behavior (latency, failures, answer content).
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 800.0,
+        latency_dist: str = "lognormal",
+        latency_spread: float = 0.4,
+        error_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        burst_every: float = 0.0,
+        burst_seconds: float = 0.0,
+        retry_after: float = 1.0,
+        foods: Optional[List[Dict[str, Any]]] = None,
+        markdown: bool = False,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            latency_ms: Median (lognormal), mean (exponential, uniform) or exact response delay
+            latency_dist: fixed | uniform | exponential | lognormal
+            latency_spread: Lognormal sigma, or +/- fraction for uniform
+            error_rate: Share of requests answered with a random 5xx
+            malformed_rate: Share of 200 answers the validator can't parse
+            burst_every: Seconds between 429 bursts (0 disables)
+            burst_seconds: Length of each 429 burst
+            retry_after: Retry-After header sent with 429s
+            foods: Extra foods reported in every answer
+            markdown: Wrap the JSON in a ```json fence like the real model often does
+            seed: RNG seed for reproducible runs
+        """
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_dist must be one of {LATENCY_DISTRIBUTIONS}")
+        self.latency_ms = max(0.0, latency_ms)
+        self.latency_dist = latency_dist
+        self.latency_spread = max(0.0, latency_spread)
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.burst_every = burst_every
+        self.burst_seconds = burst_seconds
+        self.retry_after = retry_after
+        self.foods = DEFAULT_FOODS if foods is None else foods
+        self.markdown = markdown
+        self.rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        """Seconds to wait before answering."""
+        with self._rng_lock:
+            if self.latency_dist == "fixed" or self.latency_ms == 0:
+                ms = self.latency_ms
+            elif self.latency_dist == "uniform":
+                ms = self.latency_ms * self.rng.uniform(1 - self.latency_spread, 1 + self.latency_spread)
+            elif self.latency_dist == "exponential":
+                ms = self.rng.expovariate(1 / self.latency_ms)
+            else:
+                ms = self.latency_ms * self.rng.lognormvariate(0, self.latency_spread)
+        return max(0.0, ms) / 1000
+
+    def roll(self, rate: float) -> bool:
+        with self._rng_lock:
+            return self.rng.random() < rate
+
+    def choice(self, options):
+        with self._rng_lock:
+            return self.rng.choice(options)
+
+    def in_burst(self, elapsed: float) -> bool:
+        return self.burst_every > 0 and elapsed % self.burst_every < self.burst_seconds
+
+
+def build_content(prompt: str, foods: List[Dict[str, Any]], markdown: bool = False) -> str:
+    """Model answer: YOLO names from the prompt confirmed, plus `foods`."""
+    answer = []
+    match = _YOLO_LINE.search(prompt)
+    if match:
+        for name in filter(None, (n.strip().lower() for n in match.group(1).split(","))):
+            answer.append({"name": name, "confidence": 0.8, "source": "LLM", "notes": "confirmed present"})
+    known = {food["name"] for food in answer}
+    answer.extend(food for food in foods if food["name"] not in known)
+    content = json.dumps({"validated_foods": answer})
+    return f"```json\n{content}\n```" if markdown else content
+
+
+def _prompt_text(body: Dict[str, Any]) -> str:
+    try:
+        parts = body["messages"][0]["content"]
+        return " ".join(part.get("text", "") for part in parts if part.get("type") == "text")
+    except (KeyError, IndexError, TypeError, AttributeError):
+        return ""
+
+
+class FakeMistralServer:
+    """
+    Threaded HTTP server running the fake provider (usable as a context manager).
+    """
+
+    def __init__(self, profile: Optional[FakeProviderProfile] = None, host: str = "127.0.0.1", port: int = 0):
+        self.profile = profile or FakeProviderProfile()
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0, "malformed": 0, "bad_requests": 0}
+        self._started_at = time.monotonic()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def get_statistics(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _count(self, outcome: str):
+        with self._stats_lock:
+            self._stats["requests"] += 1
+            self._stats[outcome] += 1
+
+    def start(self) -> "FakeMistralServer":
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-mistral", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        # Only a background start() needs shutdown(); a foreground serve_forever() has already returned
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread = None
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _respond(self, body: Dict[str, Any]):
+        profile = self.profile
+        if profile.in_burst(time.monotonic() - self._started_at):
+            self._count("rate_limited")
+            return 429, {"message": "Requests rate limit exceeded"}, {"Retry-After": f"{profile.retry_after:g}"}
+
+        time.sleep(profile.sample_latency())
+
+        if profile.roll(profile.error_rate):
+            self._count("errors")
+            return profile.choice((500, 502, 503)), {"message": "Internal server error"}, {}
+
+        content = build_content(_prompt_text(body), profile.foods, profile.markdown)
+        if profile.roll(profile.malformed_rate):
+            self._count("malformed")
+            kind = profile.choice(MALFORMED_KINDS)
+            if kind == "prose":
+                content = "I can see a plate of food with rice and what looks like plantain."
+            elif kind == "truncated":
+                content = content[: max(1, len(content) // 2)]
+            else:
+                return 200, {"id": "fake", "object": "chat.completion"}, {}
+        else:
+            self._count("ok")
+
+        return 200, {
+            "id": "fake-chatcmpl",
+            "object": "chat.completion",
+            "model": body.get("model", "pixtral-12b-2409"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        }, {}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                try:
+                    body = json.loads(raw)
+                except ValueError:
+                    server._count("bad_requests")
+                    self._send(400, {"message": "Invalid JSON body"})
+                    return
+                status, payload, headers = server._respond(body)
+                self._send(status, payload, headers)
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/stats":
+                    self._send(200, server.get_statistics())
+                else:
+                    self._send(404, {"message": "Not found"})
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-spread", type=float, default=0.4)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--burst-every", type=float, default=0.0, help="seconds between 429 bursts (0 = off)")
+    parser.add_argument("--burst-seconds", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--markdown", action="store_true", help="wrap answers in ```json fences")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    profile = FakeProviderProfile(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        latency_spread=args.latency_spread,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        burst_every=args.burst_every,
+        burst_seconds=args.burst_seconds,
+        retry_after=args.retry_after,
+        markdown=args.markdown,
+        seed=args.seed
+    )
+    server = FakeMistralServer(profile, args.host, args.port)
+    print(f"Fake Mistral API listening on {server.url} (stats: GET /stats)")
+    print(f"  MISTRAL_API_URL={server.url} MISTRAL_API_KEY=fake uvicorn app.main:app")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()